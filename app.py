@@ -1,12 +1,20 @@
-import streamlit as st  
+import time
+_t0 = time.perf_counter()
 import pandas as pd
-import plotly.express as px
-from typing import List, Tuple
-import plotly as py
+import streamlit as st  
+from db.ingest import SOURCE
+from db.queries import PAGE_COLUMNS, PAGE_SIZE
+from merchan_sales import (Dataset, FilterSpec, breakdown, charts, compare_windows, date_bounds, geo, kpis,
+                           percentiles, profile, raw_page, rollup, startup, time_series, timeseries)
+from merchan_sales.figures import cached_figure
+from merchan_sales.scheduler import run_charts
+
+# Copy-on-write lets every session share the cached frames as views
+pd.set_option("mode.copy_on_write", True)
 
-# Define constants for data column and data URL
-DATA_COLUMN = "Order Date"
-DATA_URL = "data/merchandise-sales.csv"
+# Time the cold start: imports, data load and first render
+startup.start(_t0)
+startup.mark("import")
 
 st.set_page_config(
     page_title="Sales Dashboard",
@@ -22,14 +30,15 @@ st.markdown("Welcome to the Sales Dashboard! Here you can find insights about th
 
 
 @st.cache_resource
-def load_data():
-    data = pd.read_csv(DATA_URL)
-    
-    return data
-
-# Load data
-data = load_data()
+def load_dataset():
+    # One dataset handle shared by all sessions
+    return Dataset(SOURCE)
 
+# Load data; advances incrementally when new deltas were appended
+ds = load_dataset()
+ds.refresh()
+data = ds.data
+startup.mark("data load")
 
 st.write(f"Data loaded: {data.shape[0]} rows")
 
@@ -38,16 +47,36 @@ st.subheader("Silver Data Sample")
 st.write(data.head())
 # Display subheader for profiling
 st.subheader("Profiling")
-# Display data description
-st.write(data.describe().iloc[2:])
+# Display the column profile, computed once per dataset version
+st.write(profile(ds))
+# Percentiles merged from the per-month sketches, with their rank error
+st.write(percentiles(ds, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)).style.format({"Rank Error": "±{:.2%}"}))
 
 
 
 if st.checkbox("Show raw data"):
    st.subheader("Bronze Data")    
-   st.dataframe(data.iloc[:, :-1],use_container_width=True)
-
-with st.expander("Dashboard"):
+   # Only the visible page is fetched, sorted and projected by DuckDB
+   v1, v2, v3, v4 = st.columns(4)
+   sort = v1.selectbox("Sort by", [None, *PAGE_COLUMNS])
+   descending = v2.checkbox("Descending")
+   include_review = v3.checkbox("Include reviews")
+   page_number = v4.number_input("Page", min_value=1, value=1)
+   raw, total = raw_page(ds, sort=sort, descending=descending, page_number=page_number - 1, include_review=include_review)
+   st.caption(f"{total:,} rows, page {page_number} of {max(-(-total // PAGE_SIZE), 1):,}")
+   st.dataframe(raw, width="stretch")
+
+# Review search through the inverted index, used as a row filter for the breakdowns
+review_query = st.text_input("Search reviews", placeholder="e.g. delay")
+if review_query.strip():
+   matches = FilterSpec.make(reviews=[review_query.strip()])
+   st.caption(f"{len(ds.rows(matches)):,} orders mention {review_query.strip()!r}")
+   r1, r2 = st.columns(2)
+   r1.dataframe(breakdown(ds, "product", matches), width="stretch")
+   r2.dataframe(breakdown(ds, "location", matches), width="stretch")
+
+# Charts are only computed while the dashboard is switched on
+if st.toggle("Dashboard"):
     st.subheader("Gold Data")  
     #st.write(data)
 
@@ -55,66 +84,36 @@ with st.expander("Dashboard"):
     kpi1, kpi2, kpi4, kpi5, kpi6, kpi7 = st.columns(6)
     #= st.columns(3)
 
-    with kpi1:
-        # Calculate the sum of total sales
-        total_sales = data['Total Sales'].sum()
-        # Calculate the total sales of the last month
-        last_month_sales = data[data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1))]['Total Sales'].sum()
-        # Calculate the percentage of the total sales of the last month
-        delta_percentage = (last_month_sales / total_sales) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Total Sales", value=f"${total_sales:,.0f}", delta=f"{delta_percentage:.2f}%")
+    # Answer every KPI and its last-month delta from the pre-aggregated cube
+    formats = {
+        "Total Sales": "${:,.0f}",
+        "Total International Sales": "${:,.0f}",
+        "Total Shipping Charges": "${:,.0f}",
+        "Total Order IDs": "{:,.0f}",
+        "Total Quantity": "{:,.0f}",
+        "Average Rating": "{:.2f}",
+    }
+    for col, (label, value, delta_percentage, error) in zip((kpi1, kpi2, kpi4, kpi5, kpi6, kpi7), kpis(ds)):
+        # Sketch estimates are marked with ≈ and carry their error bound in the tooltip
+        text = formats[label].format(value)
+        col.metric(label=label, value=f"≈{text}" if error else text, delta=f"{delta_percentage:.2f}%",
+                   help=f"HyperLogLog estimate, ±{error:.1%} standard error" if error else None)
+
+    # Any date window against the period before, or the same window a week, month or year earlier
+    first_day, last_day = date_bounds(ds)
+    w1, w2 = st.columns((2, 1))
+    picked = w1.date_input("Date range", (max(first_day, last_day - pd.Timedelta(days=29)).date(), last_day.date()),
+                           min_value=first_day.date(), max_value=last_day.date())
+    periods = {"Previous period": "previous", "Week over week": "wow", "Month over month": "mom",
+               "Year over year": "yoy"}
+    period = w2.selectbox("Compare with", list(periods))
+    if picked:
+        comparison = compare_windows(ds, picked[0], picked[-1], periods[period])
+        for col, (label, row) in zip(st.columns(len(comparison)), comparison.iterrows()):
+            text = (formats.get(label) or "{:,.0f}").format(row["Current"])
+            col.metric(label=label, value=text,
+                       delta=None if pd.isna(row["Change %"]) else f"{row['Change %']:.2f}%")
 
-    with kpi2:
-        # Calculate the sum of total international sales where international shipping is 'Yes'
-        total_international_sales = data[data['International Shipping'] == 'Yes']['Total Sales'].sum()
-        # Calculate the total international sales of the last month
-        last_month_international_sales = data[(data['International Shipping'] == 'Yes') & (data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1)))]['Total Sales'].sum()
-        # Calculate the percentage of the total international sales of the last month
-        delta_international_percentage = (last_month_international_sales / total_international_sales) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Total International Sales", value=f"${total_international_sales:,.0f}", delta=f"{delta_international_percentage:.2f}%")
-
-    with kpi4:
-        # Calculate the sum of total shipping charges
-        total_shipping_charges = data['Shipping Charges'].sum()
-        # Calculate the total shipping charges of the last month
-        last_month_shipping_charges = data[data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1))]['Shipping Charges'].sum()
-        # Calculate the percentage of the total shipping charges of the last month
-        delta_shipping_percentage = (last_month_shipping_charges / total_shipping_charges) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Total Shipping Charges", value=f"${total_shipping_charges:,.0f}", delta=f"{delta_shipping_percentage:.2f}%")
-
-    with kpi5:
-        # Calculate the sum of Order IDs
-        total_order_ids = data['Order ID'].nunique()
-        # Calculate the total Order IDs of the last month
-        last_month_order_ids = data[data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1))]['Order ID'].nunique()
-        # Calculate the percentage of the total Order IDs of the last month
-        delta_order_ids_percentage = (last_month_order_ids / total_order_ids) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Total Order IDs", value=f"{total_order_ids:,}", delta=f"{delta_order_ids_percentage:.2f}%")
-
-    with kpi6:
-        # Calculate the sum of total quantity
-        total_quantity = data['Quantity'].sum()
-        # Calculate the total quantity of the last month
-        last_month_quantity = data[data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1))]['Quantity'].sum()
-        # Calculate the percentage of the total quantity of the last month
-        delta_quantity_percentage = (last_month_quantity / total_quantity) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Total Quantity", value=f"{total_quantity:,}", delta=f"{delta_quantity_percentage:.2f}%")
-
-    with kpi7:
-        # Calculate the average rating
-        avg_rating = data['Rating'].mean()
-        # Calculate the average rating of the last month
-        last_month_avg_rating = data[data[DATA_COLUMN] >= (data[DATA_COLUMN].max() - pd.DateOffset(months=1))]['Rating'].mean()
-        # Calculate the percentage of the average rating of the last month
-        delta_rating_percentage = (last_month_avg_rating / avg_rating) * 100
-        # Display the KPI using st.metric
-        st.metric(label="Average Rating", value=f"{avg_rating:.2f}", delta=f"{delta_rating_percentage:.2f}%")
-    
 
 
     c1, c2 = st.columns((2,1))
@@ -122,165 +121,56 @@ with st.expander("Dashboard"):
     c6, c7, c8 = st.columns((1,1,1))
 
 
-    # Convert 'Order Date' to datetime
-    # Group by 'Order Date' to get the sum of 'Total Sales'
-    sales_over_time = data.resample('ME', on=DATA_COLUMN)['Total Sales'].sum().reset_index()
-
-    # Calculate month-over-month percentage change
-    sales_over_time['MoM Change'] = sales_over_time['Total Sales'].pct_change() * 100
-
-    # Format the percentage change for display
-    sales_over_time['MoM Change'] = sales_over_time['MoM Change'].apply(lambda x: f"{x:.2f}%" if pd.notnull(x) else "N/A")
-
-    # Define a function to color the percentage change
-    def color_mom_change(val):
-        if val == "N/A":
-            return val
-        elif float(val[:-1]) > 0:
-            return f"<span style='color:green'>{val}</span>"
+    # Choose the period length of the sales-over-time chart
+    granularity = c1.radio("Granularity", list(timeseries.GRANULARITIES), index=2, horizontal=True)
+    # Map detail: one point per location, or grid cells that get finer with the zoom level
+    map_detail = c4.select_slider("Map detail", ["Locations", *range(7)], value="Locations")
+    map_zoom = None if map_detail == "Locations" else map_detail
+
+    # Every chart computes its data and figure in the chart thread pool; each
+    # column placeholder fills in as soon as its own chart is ready
+    builders = {
+        # Period totals, change and colored change labels, cached per dataset version and granularity
+        "Total Sales Over Time": lambda: charts.sales_over_time_figure(time_series(ds, granularity=granularity)),
+        # Sum of 'Total Sales' by 'Product Category'
+        "Total Sales by Product Category": lambda: charts.category_figure(breakdown(ds, "category")),
+        # Sum of 'Shipping Charges' by shipping tier
+        "Shipping Charges": lambda: charts.shipping_figure(breakdown(ds, "shipping")),
+        # Sum of 'Total Sales' and 'Quantity' by 'Product ID' from the product rollup
+        "Total Sales by Products": lambda: charts.product_figure(rollup(ds, "product")),
+        # Sum of 'Total Sales' by 'Order Location' from the location rollup
+        "Total Sales by Location": lambda: charts.location_figure(rollup(ds, "location")),
+        # The product rollup already carries the average sales price, no merge needed
+        "Total Sales vs. Average Sales Price": lambda: charts.price_figure(rollup(ds, "product")),
+        # Group by 3-year 'Age Group' and 'Buyer Gender' and calculate the sum of 'Total Sales'
+        "Total Sales by Age and Gender": lambda: charts.age_gender_figure(breakdown(ds, "age_gender")),
+        # One point per location with summed sales instead of one marker per order
+        "Sales Map": lambda: charts.map_figure(geo(ds, zoom=map_zoom)),
+    }
+    # Built figures are shared by every session until the dataset version changes
+    signatures = {"Total Sales Over Time": granularity, "Sales Map": str(map_detail)}
+    jobs = {name: (lambda name=name, build=build: cached_figure(ds.version, name, build, signatures.get(name, "")))
+            for name, build in builders.items()}
+    columns = dict(zip(jobs, (c1, c3, c8, c2, c5, c7, c6, c4)))
+    placeholders = {name: column.empty() for name, column in columns.items()}
+    for name, placeholder in placeholders.items():
+        placeholder.caption(f"Loading {name}…")
+
+    for result in run_charts(jobs):
+        placeholder = placeholders[result.name]
+        if isinstance(result.error, TimeoutError):
+            # Fallback: the job keeps running and its cached data is ready on the next rerun
+            placeholder.info(f"{result.name} is still computing; it will appear on the next refresh.")
+        elif result.error is not None:
+            placeholder.error(f"{result.name} could not be drawn: {result.error}")
         else:
-            return f"<span style='color:red'>{val}</span>"
-
-    # Apply the color function to the 'MoM Change' column
-    sales_over_time['MoM Change'] = sales_over_time['MoM Change'].apply(color_mom_change)
-
-    # Calculate the average total sales
-    avg_total_sales = sales_over_time['Total Sales'].mean()
-
-    # Abbreviate the average total sales
-    avg_total_sales_abbr = f"{avg_total_sales / 1000:.1f}K"
-
-    # Format the 'Order Date' to use month abbreviation names and last 2 years digits
-    sales_over_time[DATA_COLUMN] = sales_over_time[DATA_COLUMN].dt.strftime('%b %y')
-
-    # Plot the bar chart with title
-    fig = px.bar(sales_over_time, x=DATA_COLUMN, y='Total Sales', title="Total Sales Over Time", text='Total Sales')
-    # Add a dotted line for the average total sales
-    fig.add_shape(
-        type="line",
-        x0=sales_over_time[DATA_COLUMN].min(),
-        x1=sales_over_time[DATA_COLUMN].max(),
-        y0=avg_total_sales,
-        y1=avg_total_sales,
-        line=dict(color="RoyalBlue", width=2, dash="dot"),
-    )
-    # Add annotation for the average total sales
-    fig.add_annotation(
-        x=sales_over_time[DATA_COLUMN].max(),
-        y=avg_total_sales,
-        text=f"Avg: ${avg_total_sales_abbr}",
-        showarrow=False,
-        font=dict(color="RoyalBlue", size=12),
-        align="right",
-        xanchor="right",
-        yanchor="bottom"
-    )
-
-    # Update the layout and traces to include the percentage change
-    fig.update_layout(xaxis_title='', yaxis_title='')
-    fig.update_traces(marker=dict(line=dict(width=0.5)), texttemplate='%{customdata[0]}', textposition='outside', customdata=sales_over_time[['MoM Change']])
-    # Render the chart with HTML formatting for the custom data
-    c1.plotly_chart(fig, use_container_width=True)
-
-
-
-    # Group by 'Product Category' and resample by month to get the sum of 'Total Sales'
-    #sales_by_location = data.groupby('Product Category').resample('ME', on=DATA_COLUMN)['Total Sales'].sum().reset_index()
-    # Plot the line chart
-    #c4.line_chart(sales_by_location.pivot(index=DATA_COLUMN, columns='Product Category', values='Total Sales'))
-
-
-    # Group by 'Product Category' and resample by month to get the sum of 'Total Sales'
-    # Sum of 'Total Sales' by 'Product Category'
-    total_sales_by_category = data.groupby('Product Category')['Total Sales'].sum()
-    # Plot the pie chart
-    #st.write("### Total Sales by Product Category")
-    fig = px.pie(total_sales_by_category, values='Total Sales', names=total_sales_by_category.index, title="Total Sales by Product Category")
-    c3.plotly_chart(fig)
-
-    # Plot the bar chart
-    # Sum of 'Total Sales' by 'Product ID' and sort by descending total
-    total_sales_by_product = data.groupby('Product ID')['Total Sales'].sum().reset_index().sort_values(by='Total Sales', ascending=True)
-
-# Sum of 'Total sales' by 'shipp' and sort by descending total
-# Sum of 'Total location' by 'Product ID' and sort by descending total
-    total_sales_locat = data.groupby('Order Location')['Total Sales'].sum().reset_index().sort_values(by='Total Sales', ascending=True) if 'Order Location' in data.columns else pd.DataFrame(columns=['Order Location', 'Total Sales'])
-
-    total_shipping_charges = data.groupby('Shipping Charges')['Shipping Charges'].sum().reset_index(name='Total Shipping Charges').sort_values(by='Total Shipping Charges', ascending=False)
-
-    # Plot the bar chart
-    #st.write("### How Shipping Charges Impact Sales")
-    total_shipping_charges = total_shipping_charges.sort_values(by='Shipping Charges', ascending=False)
-    fig = px.bar(total_shipping_charges, x='Total Shipping Charges', y='Shipping Charges', orientation='h', title="How Shipping Charges Impact Sales", text='Total Shipping Charges')
-    fig.update_layout(xaxis_title='', yaxis_title='', xaxis_showticklabels=False)
-    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside')
-    fig.update_yaxes(type='category')  # Ensure y-axis shows unique Shipping Charges values
-    c8.plotly_chart(fig)
-
-
-    # Sum of 'Total Sales' and 'Quantity' by 'Product ID' and sort by descending total sales
-    total_sales_by_product = data.groupby('Product ID').agg({'Total Sales': 'sum', 'Quantity': 'sum'}).reset_index().sort_values(by='Total Sales', ascending=True)
-    # Plot the bar chart
-    #st.write("### Total Sales by Product ID")
-    fig = px.bar(total_sales_by_product, x='Total Sales', y='Product ID', orientation='h', title="Total Sales by Products", text='Total Sales')
-    # Add quantity as text next to total sales
-    fig.update_traces(texttemplate='$ %{text:.0f} | ∑ %{customdata[0]}', textposition='outside', customdata=total_sales_by_product[['Quantity']])
-    # Add quantity to the hover information
-    fig.update_traces(hovertemplate='<b>%{y}</b><br>Total Sales: $%{x:.0f}<br>Quantity: %{customdata[0]}<extra></extra>')
-    # Adjust layout to give more space for better visualization and reduce bar lengths
-    fig.update_layout(xaxis_title='', yaxis_title='', margin=dict(l=50, r=50, t=50, b=50))
-    c2.plotly_chart(fig)
-
-
-    # Plot the bar chart
-    #st.write("### Total Sales by Locations")
-    fig = px.bar(total_sales_locat, x='Total Sales', y='Order Location', orientation='h', title="Total Sales by Location", text='Total Sales')
-    fig.update_layout(xaxis_title='', yaxis_title='', height=(fig.layout.height or 400) * 1.5)
-    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside', textfont_size=14)
-    c5.plotly_chart(fig)
-
-
-    # Calculate the average sales price by product
-    avg_sales_price_by_product = data.groupby('Product ID')['Sales Price'].mean().reset_index()
-    # Merge the total sales and average sales price dataframes
-    total_sales_with_avg_price = pd.merge(total_sales_by_product, avg_sales_price_by_product, on='Product ID')
-    # Plot the scatter plot
-    #st.write("### Total Sales vs. Average Sales Price by Product ID")
-    fig = px.scatter(total_sales_with_avg_price, x='Sales Price', y='Total Sales', text='Product ID', title="Total Sales vs. Average Sales Price by Product ID")
-    fig.update_traces(textposition='top center')
-    c7.plotly_chart(fig)
-
-
-    # Define age bins and labels
-    age_bins = [18, 21, 24, 27, 30, 33, 36]
-    age_labels = ['18-20', '21-23', '24-26', '27-29', '30-32', '33-35']
-    # Create a new column for age segmentation
-    data['Age Group'] = pd.cut(data['Buyer Age'], bins=age_bins, labels=age_labels, right=False)
-     # Group by 'Age Group' and calculate the sum of 'Total Sales'
-    total_sales_by_age_gender = data.groupby(['Age Group', 'Buyer Gender'])['Total Sales'].sum().reset_index()
-    # Sort the total_sales_by_age_gender by 'Age Group' in ascending order
-    total_sales_by_age_gender = total_sales_by_age_gender.sort_values(by='Age Group',ascending=False)
-    # Create a tornado bar chart
-    #st.write("### Sales by Buyer Age Group and Gender")
-    fig = px.bar(total_sales_by_age_gender, x='Total Sales', y='Age Group', color='Buyer Gender', orientation='h', barmode='relative', title="", text='Total Sales', color_discrete_map={'Female': 'pink', 'Male': 'blue'})
-    fig.update_layout(xaxis_title='', yaxis_title='', xaxis_showticklabels=False, legend=dict(title=None, orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.1))  # Move legend to the top
-    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside')
-    c6.plotly_chart(fig)
+            placeholder.plotly_chart(result.value, width="stretch" if result.name == "Total Sales Over Time" else "content")
 
 
 
     #info_sidebar.info("{} Data loaded.".format(filtered_df.shape[0], year_filter))
 
-#### MAP ###########
-    data['Latitude'] = data['Latitude'].astype(str).str.replace(',', '.').astype(float)
-    data['Longitude'] = data['Longitude'].astype(str).str.replace(',', '.').astype(float)
-
-    #st.subheader("Sales Map")  
-    fig = px.scatter_geo(data, lat="Latitude", lon="Longitude", color="Total Sales", 
-                         hover_name="Order Location", size="Total Sales", 
-                         projection="natural earth", title="Qty of Sales by Location")
-    fig.update_layout(height=650)  # Increase the map size to 600
-    c4.plotly_chart(fig)
-
-
-
+# Report the cold start once per process
+startup.mark("first render")
+with st.sidebar.expander("Startup time"):
+    st.write({phase: f"{seconds:.3f}s" for phase, seconds in startup.finish().items()})
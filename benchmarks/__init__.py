@@ -0,0 +1 @@
+"""Benchmarks for the load, aggregate and render paths (python -m benchmarks.run)."""
@@ -0,0 +1,192 @@
+"""Benchmark harness for the load, aggregate, filter and render paths.
+
+For every requested size a synthetic export is generated (and kept under
+``benchmarks/.data``), then each step is timed, every app.py chart is
+measured by its figure-JSON size and the loaded table by its bytes per row
+(the legacy layout from a sample of at most ``LEGACY_SAMPLE_ROWS`` rows).
+Results are compared with a JSON baseline; a metric that is slower or
+larger than the baseline by more than the tolerance fails the run.
+
+    python -m benchmarks.run --rows 10k,1M
+    python -m benchmarks.run --rows 10k,1M --update-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+from benchmarks.synthetic import generate_csv, parse_rows
+
+DATA_DIR = "benchmarks/.data"
+BASELINE = "benchmarks/baseline.json"
+DEFAULT_ROWS = "10k,1M"
+TOLERANCE = 0.5
+# Absolute slack on timings, so sub-millisecond steps do not fail on scheduler noise
+NOISE_S = 0.005
+
+# Filter used for the latency measurement: one product, two locations, one year
+FILTER = {"product": ["BF1548"], "location": ["Sydney", "Toronto"]}
+FILTER_YEAR = 2024
+
+# Rows parsed in the legacy layout for the memory report; a full legacy read
+# needs about 670 bytes per row and would not fit at the 10M and 50M sizes
+LEGACY_SAMPLE_ROWS = 1_000_000
+
+
+def timed(fn: Callable, repeat: int = 3, setup: Optional[Callable] = None) -> float:
+    """Best wall time of ``fn`` over ``repeat`` runs, with the derived cache cleared.
+
+    ``setup`` runs untimed before every run.
+    """
+    from merchan_sales.cache import get_cache
+
+    best = float("inf")
+    for _ in range(repeat):
+        get_cache().invalidate()
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def figure_sizes(data, version: str) -> Dict[str, int]:
+    """Serialized JSON size of every app.py chart, in bytes."""
+    from merchan_sales import charts, timeseries
+    from merchan_sales.transforms import breakdown, map_points
+
+    product = breakdown(version, "product")
+    figures = {
+        "sales_over_time": charts.sales_over_time_figure(timeseries.sales_over_time(data)),
+        "category": charts.category_figure(breakdown(version, "category")),
+        "shipping": charts.shipping_figure(breakdown(version, "shipping")),
+        "product": charts.product_figure(product),
+        "location": charts.location_figure(breakdown(version, "location")),
+        "price": charts.price_figure(product),
+        "age_gender": charts.age_gender_figure(breakdown(version, "age_gender")),
+        "map": charts.map_figure(map_points(data)),
+    }
+    return {f"figure_bytes.{name}": len(fig.to_json()) for name, fig in figures.items()}
+
+
+def run_size(rows: int, data_dir: str = DATA_DIR) -> Dict[str, float]:
+    """Time every path for one synthetic dataset of ``rows`` rows."""
+    from db import pool
+    from db.ingest import load_sales, read_sales_csv
+    from db.queries import DIMENSIONS, register_dataset, sales_by
+    from merchan_sales import timeseries
+    from merchan_sales.filters import FilterIndex
+    from merchan_sales.kpis import build_kpi_cube, headline_kpis
+    from merchan_sales.memory import memory_report
+
+    csv_path = os.path.join(data_dir, f"sales-{rows}.csv")
+    if not os.path.exists(csv_path):
+        generate_csv(csv_path, rows)
+    cache_dir = os.path.join(data_dir, f"cache-{rows}")
+
+    results = {"csv_parse_s": timed(lambda: read_sales_csv(csv_path), repeat=1)}
+    load_sales(csv_path, cache_dir)
+    results["parquet_load_s"] = timed(lambda: load_sales(csv_path, cache_dir))
+    report = memory_report(csv_path, cache_dir, legacy_rows=LEGACY_SAMPLE_ROWS)
+    results["memory.legacy_bytes_per_row"] = report.loc["per row", "legacy bytes"]
+    results["memory.compact_bytes_per_row"] = report.loc["per row", "compact bytes"]
+    data = load_sales(csv_path, cache_dir)
+    version = data.attrs["version"]
+
+    # pandas paths
+    results["pandas.kpi_cube_s"] = timed(lambda: headline_kpis(build_kpi_cube(data, version)))
+    results["pandas.sales_over_time_s"] = timed(lambda: timeseries.sales_over_time(data))
+    for name, column in [("category", "Product Category"), ("product", "Product ID"),
+                         ("location", "Order Location"), ("shipping", "Shipping Charges")]:
+        results[f"pandas.{name}_s"] = timed(
+            lambda column=column: data.groupby(column, observed=True)["Total Sales"].sum())
+
+    # DuckDB paths, in a database private to the benchmark
+    database = os.path.join(data_dir, f"bench-{rows}.duckdb")
+
+    def fresh_database():
+        # A database that already holds this version would skip the registration
+        pool.shutdown()
+        for path in (database, f"{database}.wal"):
+            if os.path.exists(path):
+                os.remove(path)
+        pool.configure(database=database)
+
+    results["duckdb.register_s"] = timed(lambda: register_dataset(csv_path, cache_dir), setup=fresh_database)
+    for dimension in DIMENSIONS:
+        results[f"duckdb.{dimension}_s"] = timed(lambda dimension=dimension: sales_by(dimension))
+
+    # Sidebar filter latency
+    lowered = data.rename(columns=str.lower).rename(columns={
+        "order location": "location", "product id": "product", "product category": "category",
+        "buyer gender": "gender", "buyer age": "age"})
+    results["filter.index_build_s"] = timed(
+        lambda: FilterIndex(lowered, ["product", "category", "gender", "location"], "order date", "age"))
+    index = FilterIndex(lowered, ["product", "category", "gender", "location"], "order date", "age")
+    results["filter.select_s"] = timed(lambda: index.select(FILTER, year=FILTER_YEAR, age=(20, 30)), repeat=10)
+
+    results.update(figure_sizes(data, version))
+    pool.shutdown()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = TOLERANCE) -> list:
+    """Return the metrics that regressed beyond ``tolerance`` against the baseline."""
+    regressions = []
+    for size, metrics in results.items():
+        for name, value in metrics.items():
+            expected = baseline.get(size, {}).get(name)
+            slack = NOISE_S if name.endswith("_s") else 0
+            if expected and value > expected * (1 + tolerance) + slack:
+                regressions.append(f"{size} {name}: {value:.4g} > baseline {expected:.4g}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the merchandise sales dashboards.")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="comma-separated sizes, e.g. 10k,1M,10M,50M")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--update-baseline", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.rows.split(","):
+        rows = parse_rows(size)
+        print(f"== {rows:,} rows", flush=True)
+        results[str(rows)] = run_size(rows)
+        for name, value in results[str(rows)].items():
+            print(f"  {name:<28} {value:.4g}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Synthetic merchandise sales exports with the production 17-column schema.
+
+Rows are sampled from the vocabulary of the bundled sample export, keeping
+the joint product/category/price, location/coordinates/shipping and
+buyer/rating/review combinations realistic. Output uses the export format:
+day-first dates and decimal-comma coordinates.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import COLUMNS, DATA_COLUMN, DATA_URL, read_sales_csv
+
+CHUNK_ROWS = 1_000_000
+
+# Columns sampled together from one seed row
+BLOCKS = [
+    ["Product ID", "Product Category", "Sales Price"],
+    ["Order Location", "Latitude", "Longitude", "International Shipping", "Shipping Charges"],
+    ["Buyer Gender", "Buyer Age"],
+    ["Rating", "Review"],
+    ["Quantity"],
+]
+
+
+def parse_rows(text: str) -> int:
+    """Parse a row count such as 10k, 1M or 50m."""
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def generate_chunk(seed: pd.DataFrame, rows: int, first_order_id: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Sample ``rows`` synthetic rows in the export format."""
+    chunk = {}
+    for block in BLOCKS:
+        picks = rng.integers(0, len(seed), rows)
+        for column in block:
+            chunk[column] = seed[column].to_numpy()[picks]
+    chunk = pd.DataFrame(chunk)
+    chunk["Order ID"] = np.arange(first_order_id, first_order_id + rows, dtype=np.int64)
+
+    start, end = seed[DATA_COLUMN].min(), seed[DATA_COLUMN].max()
+    days = rng.integers(0, (end - start).days + 1, rows)
+    dates = start + pd.to_timedelta(days, unit="D")
+    # Day-first without zero padding, like the export: 21/7/2024
+    chunk[DATA_COLUMN] = (dates.day.astype(str) + "/" + dates.month.astype(str) + "/" + dates.year.astype(str))
+
+    chunk["Sales per Unit"] = chunk["Sales Price"] + chunk["Shipping Charges"]
+    chunk["Total Sales"] = chunk["Sales per Unit"] * chunk["Quantity"]
+    return chunk[COLUMNS]
+
+
+def generate_csv(path: str, rows: int, seed_path: str = DATA_URL, random_state: int = 42) -> str:
+    """Write a synthetic export of ``rows`` rows to ``path`` in bounded chunks."""
+    seed = read_sales_csv(seed_path)
+    rng = np.random.default_rng(random_state)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    written = 0
+    while written < rows:
+        size = min(CHUNK_ROWS, rows - written)
+        chunk = generate_chunk(seed, size, 100000 + written, rng)
+        chunk.to_csv(tmp, mode="w" if written == 0 else "a", header=written == 0, index=False, decimal=",")
+        written += size
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic merchandise sales export.")
+    parser.add_argument("rows", help="row count, e.g. 10k, 1M, 50M")
+    parser.add_argument("path", help="output CSV path")
+    args = parser.parse_args()
+    print(generate_csv(args.path, parse_rows(args.rows)))
@@ -0,0 +1,9 @@
+"""Data access for the merchandise sales dashboards.
+
+- ``db.ingest``: typed CSV parsing and the Parquet cache
+- ``db.partitions``: parallel ingest into a date-partitioned Parquet store
+- ``db.pool``: the process-wide DuckDB connection pool
+- ``db.queries``: aggregations pushed down to DuckDB
+- ``db.reviews``: inverted index over the review text
+- ``db.snapshot``: memory-mapped Arrow snapshot shared by server processes
+"""
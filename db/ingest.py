@@ -0,0 +1,322 @@
+"""Shared ingest for the merchandise sales export.
+
+The CSV is parsed once with an explicit schema and written to a Parquet cache
+next to it; later loads read the columnar copy until the source changes.
+Delta exports are appended as extra Parquet parts (``python -m db.ingest``).
+A date-partitioned store written by ``db.partitions`` is a source too: its
+partition files stand in for the cached parts.
+"""
+import hashlib
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# Define constants for data column and data URL
+DATA_COLUMN = "Order Date"
+DATA_URL = "data/merchandise-sales.csv"
+CACHE_DIR = "data/.cache"
+
+# Manifest that marks a directory as a date-partitioned store (see db.partitions)
+STORE_MANIFEST = "_manifest.json"
+
+# Source the dashboards read: the CSV export, or a partitioned store directory
+SOURCE = os.environ.get("MERCHAN_SOURCE", DATA_URL)
+
+# Order dates are exported day-first, e.g. 21/7/2024
+DATE_FORMAT = "%d/%m/%Y"
+
+# Low-cardinality text columns, stored dictionary-encoded
+CATEGORY_COLUMNS = [
+    "Product ID",
+    "Product Category",
+    "Buyer Gender",
+    "Order Location",
+    "International Shipping",
+]
+
+# Explicit dtypes for every column except the order date
+SCHEMA = {
+    "Order ID": "int32",
+    "Product ID": "category",
+    "Product Category": "category",
+    "Buyer Gender": "category",
+    "Buyer Age": "int8",
+    "Order Location": "category",
+    # float32 keeps coordinates to about a metre, plenty for the maps
+    "Latitude": "float32",
+    "Longitude": "float32",
+    "International Shipping": "category",
+    "Sales Price": "int32",
+    "Shipping Charges": "int32",
+    "Sales per Unit": "int32",
+    "Quantity": "int16",
+    "Total Sales": "int32",
+    "Rating": "int8",
+    "Review": "object",
+}
+
+# Natural key of a sales row, used to dedupe appended deltas
+KEY_COLUMNS = ["Order ID", "Product ID"]
+
+COLUMNS = ["Order ID", DATA_COLUMN] + [c for c in SCHEMA if c != "Order ID"]
+
+# Free-text columns the dashboards load on demand (see db.reviews) instead of keeping resident
+LAZY_COLUMNS = ["Review"]
+RESIDENT_COLUMNS = [c for c in COLUMNS if c not in LAZY_COLUMNS]
+
+
+def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+    data[DATA_COLUMN] = pd.to_datetime(data[DATA_COLUMN], format=DATE_FORMAT)
+    return data[COLUMNS]
+
+
+def read_sales_csv(path: str = DATA_URL) -> pd.DataFrame:
+    """Parse the raw CSV export with the shared schema."""
+    # Coordinates use a decimal comma ("39,833851"); no other column has decimals
+    data = pd.read_csv(path, dtype={**SCHEMA, DATA_COLUMN: "string"}, decimal=",")
+    return _normalize(data)
+
+
+def iter_sales_csv(path: str = DATA_URL, chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Parse the raw CSV export in chunks of ``chunk_rows`` rows with the shared schema."""
+    with pd.read_csv(path, dtype={**SCHEMA, DATA_COLUMN: "string"}, decimal=",", chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield _normalize(chunk)
+
+
+def file_hash(path: str) -> str:
+    """Return the sha256 of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(path: str, cache_dir: str = CACHE_DIR) -> Tuple[str, str]:
+    """Return the Parquet and metadata paths used to cache ``path``."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return (os.path.join(cache_dir, f"{name}.parquet"),
+            os.path.join(cache_dir, f"{name}.json"))
+
+
+def _read_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, payload: dict):
+    # Per-process temp file, renamed so readers never see a partial file and workers never collide
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def is_store(path: str) -> bool:
+    """True when ``path`` is a date-partitioned store rather than a CSV export."""
+    return os.path.isfile(os.path.join(path, STORE_MANIFEST))
+
+
+def _chain_versions(meta: dict) -> List[str]:
+    # Version after the base file and after each appended part, in order
+    hashes = [meta["sha256"]]
+    versions = [meta["sha256"][:16]]
+    for part in meta.get("parts", []):
+        hashes.append(part["sha256"])
+        versions.append(hashlib.sha256(":".join(hashes).encode()).hexdigest()[:16])
+    return versions
+
+
+def refresh_cache(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> Tuple[str, str]:
+    """Make sure the Parquet cache for ``path`` is fresh.
+
+    The cache is reused while the source mtime and size are unchanged. When
+    they differ the source is hashed, and only a changed hash triggers a
+    re-parse, which also drops any appended delta parts. Returns the base
+    Parquet path and the dataset version.
+
+    A partitioned store is kept fresh by its own ingest
+    (``python -m db.partitions``); its manifest names the version.
+    """
+    if is_store(path):
+        paths = part_paths(path, cache_dir)
+        if not paths:
+            raise FileNotFoundError(f"Store {path!r} has no partitions; run python -m db.partitions first")
+        return paths[0], _read_meta(os.path.join(path, STORE_MANIFEST))["version"]
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    stat = os.stat(path)
+    meta = _read_meta(meta_path)
+
+    fresh = (os.path.exists(parquet_path)
+             and meta.get("mtime") == stat.st_mtime_ns
+             and meta.get("size") == stat.st_size)
+    if not fresh and os.path.exists(parquet_path) and meta.get("sha256"):
+        # Touched but possibly unchanged: compare content before re-parsing
+        if file_hash(path) == meta["sha256"]:
+            meta.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+            _write_json(meta_path, meta)
+            fresh = True
+
+    if not fresh:
+        data = read_sales_csv(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{parquet_path}.{os.getpid()}.tmp"
+        data.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet_path)
+        for part in meta.get("parts", []):
+            # A new full export supersedes every delta appended to the old one
+            try:
+                os.remove(os.path.join(cache_dir, part["file"]))
+            except OSError:
+                pass
+        meta = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_hash(path), "parts": []}
+        _write_json(meta_path, meta)
+
+    return parquet_path, _chain_versions(meta)[-1]
+
+
+def part_paths(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> List[str]:
+    """Return the base Parquet file followed by every appended delta part.
+
+    For a partitioned store these are its partition files, ordered by month.
+    """
+    if is_store(path):
+        from db.partitions import partitions
+
+        return [os.path.join(path, partition["file"]) for partition in partitions(path)]
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    meta = _read_meta(meta_path)
+    return [parquet_path] + [os.path.join(cache_dir, part["file"]) for part in meta.get("parts", [])]
+
+
+def dataset_version(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> str:
+    """Return the current dataset version, refreshing the cache if needed."""
+    return refresh_cache(path, cache_dir)[1]
+
+
+def concat_sales(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate sales frames, keeping the categorical columns categorical."""
+    if len(frames) == 1:
+        return frames[0]
+    data = pd.concat(frames, ignore_index=True)
+    # Frames carry their own dictionaries; re-encode the union once
+    categories = [c for c in CATEGORY_COLUMNS if c in data.columns]
+    return data.astype({c: "category" for c in categories})
+
+
+def _read_parts(paths: List[str], columns=None) -> pd.DataFrame:
+    data = concat_sales([pd.read_parquet(p, columns=columns) for p in paths])
+    # Parts written under an older schema may hold wider numbers; narrow them on read
+    widened = {c: t for c, t in SCHEMA.items()
+               if c in data.columns and t not in ("category", "object") and data[c].dtype != t}
+    return data.astype(widened) if widened else data
+
+
+def load_sales(path: str = DATA_URL, cache_dir: str = CACHE_DIR,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load the sales data (base export plus appended deltas) through the Parquet cache.
+
+    Only ``columns`` are read when given, e.g. ``RESIDENT_COLUMNS``. The
+    dataset version is exposed as ``data.attrs["version"]``.
+    """
+    _, version = refresh_cache(path, cache_dir)
+    data = _read_parts(part_paths(path, cache_dir), columns)
+    data.attrs["version"] = version
+    return data
+
+
+def new_part_paths(since_version: str, path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> Optional[List[str]]:
+    """Return the delta parts appended after ``since_version``.
+
+    Returns None when ``since_version`` is not an ancestor of the current
+    version (e.g. the base export was replaced) and a full reload is needed.
+    A re-ingested store may rewrite any partition, so it always reloads.
+    """
+    if is_store(path):
+        return [] if since_version == dataset_version(path, cache_dir) else None
+    _, meta_path = cache_paths(path, cache_dir)
+    versions = _chain_versions(_read_meta(meta_path))
+    if since_version not in versions:
+        return None
+    return part_paths(path, cache_dir)[versions.index(since_version) + 1:]
+
+
+def load_delta(since_version: str, path: str = DATA_URL, cache_dir: str = CACHE_DIR,
+               columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """Return the rows appended after ``since_version``, or None if a full reload is needed."""
+    _, version = refresh_cache(path, cache_dir)
+    paths = new_part_paths(since_version, path, cache_dir)
+    if paths is None:
+        return None
+    if paths:
+        data = _read_parts(paths, columns)
+    else:
+        data = pd.DataFrame({c: pd.Series(dtype=SCHEMA.get(c, "datetime64[ns]")) for c in columns or COLUMNS})
+    data.attrs["version"] = version
+    return data
+
+
+def append_delta(delta_path: str, path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> Tuple[pd.DataFrame, str]:
+    """Append the new rows of a delta CSV export to the columnar store.
+
+    Rows are deduplicated on Order ID + Product ID against the stored data
+    and within the delta itself, then written as a new Parquet part. Only
+    one ingest process may append at a time. Returns the appended rows and
+    the new dataset version.
+    """
+    if is_store(path):
+        raise ValueError(f"{path} is a partitioned store; ingest new exports with python -m db.partitions")
+    _, meta_path = cache_paths(path, cache_dir)
+    refresh_cache(path, cache_dir)
+    delta = read_sales_csv(delta_path).drop_duplicates(subset=KEY_COLUMNS)
+
+    stored = _read_parts(part_paths(path, cache_dir), columns=KEY_COLUMNS)
+    seen = pd.MultiIndex.from_frame(stored.astype({"Product ID": str}))
+    keys = pd.MultiIndex.from_frame(delta[KEY_COLUMNS].astype({"Product ID": str}))
+    delta = delta[~keys.isin(seen)].reset_index(drop=True)
+
+    meta = _read_meta(meta_path)
+    meta.setdefault("parts", [])
+    if len(delta):
+        name = os.path.splitext(os.path.basename(path))[0]
+        part_file = f"{name}.part-{len(meta['parts']) + 1:05d}.parquet"
+        part_path = os.path.join(cache_dir, part_file)
+        tmp = f"{part_path}.tmp"
+        delta.to_parquet(tmp, index=False)
+        os.replace(tmp, part_path)
+        meta["parts"].append({"file": part_file, "sha256": file_hash(part_path), "rows": len(delta)})
+        _write_json(meta_path, meta)
+
+    version = _chain_versions(meta)[-1]
+    delta.attrs["version"] = version
+    return delta, version
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Append delta CSV exports to the sales store.")
+    parser.add_argument("deltas", nargs="+", help="delta CSV files, in arrival order")
+    parser.add_argument("--source", default=DATA_URL, help="base CSV export")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    for delta_path in args.deltas:
+        rows, version = append_delta(delta_path, args.source, args.cache_dir)
+        print(f"{delta_path}: {len(rows)} new rows, version {version}")
+
+    # Index the reviews of the new parts while the ingest process is at it
+    from db.reviews import build_review_index
+
+    build_review_index(args.source, args.cache_dir)
+
+    # Swap the server processes over to the new version's shared snapshot
+    from db.snapshot import publish
+
+    publish(args.source, args.cache_dir)
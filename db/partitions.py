@@ -0,0 +1,211 @@
+"""Parallel ingest of many CSV exports into a date-partitioned Parquet store.
+
+Production exports arrive as many daily or regional CSV files. Each file is
+parsed in a worker process with the shared schema and split by order month
+into ``<store>/month=YYYY-MM/<file>-<content hash>.parquet``, with the review
+index sidecar of each partition built alongside. A manifest records the
+min/max statistics of every partition file, so date-range reads open only
+the partitions that can match, both for pandas loads and DuckDB scans.
+The store directory can be passed wherever a CSV source is expected, e.g.
+``MERCHAN_SOURCE=data/.store streamlit run app.py``.
+
+    python -m db.partitions "exports/*.csv" --store data/.store --workers 8
+"""
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from db.ingest import (DATA_COLUMN, STORE_MANIFEST, _read_meta, _write_json, concat_sales, file_hash,
+                       read_sales_csv)
+from db.queries import DIMENSIONS, MEASURES, Filters, sales_by
+from db.reviews import part_index
+
+STORE_DIR = "data/.store"
+MANIFEST = STORE_MANIFEST
+
+# Numeric columns whose min/max are kept per partition file, next to the order date
+STAT_COLUMNS = ["Buyer Age", "Sales Price", "Quantity", "Total Sales", "Rating"]
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+
+def source_files(source: str) -> List[str]:
+    """Expand a directory, glob pattern or single file into sorted CSV paths."""
+    if os.path.isdir(source):
+        source = os.path.join(source, "**", "*.csv")
+    return sorted(p for p in glob.glob(source, recursive=True) if os.path.isfile(p))
+
+
+def _source_id(path: str) -> str:
+    # Partition file name of a source: readable stem plus a path hash against clashes
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]}"
+
+
+def _stats(part: pd.DataFrame) -> Dict[str, list]:
+    stats = {DATA_COLUMN: [part[DATA_COLUMN].min().isoformat(), part[DATA_COLUMN].max().isoformat()]}
+    for column in STAT_COLUMNS:
+        stats[column] = [part[column].min().item(), part[column].max().item()]
+    return stats
+
+
+def ingest_file(path: str, store_dir: str = STORE_DIR) -> dict:
+    """Parse one CSV and write its rows as one Parquet file per order month.
+
+    Runs in a worker process; returns the manifest entry of the source.
+    File names carry the content hash, so the partitions of the previous
+    version stay readable until the new manifest replaces it.
+    """
+    sha256 = file_hash(path)
+    data = read_sales_csv(path)
+    source_id = f"{_source_id(path)}-{sha256[:8]}"
+    months = data[DATA_COLUMN].dt.to_period("M")
+    partitions = []
+    for month, part in data.groupby(months, sort=True):
+        directory = os.path.join(store_dir, f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        part_path = os.path.join(directory, f"{source_id}.parquet")
+        tmp = f"{part_path}.tmp"
+        part.to_parquet(tmp, index=False)
+        os.replace(tmp, part_path)
+        part_index(part_path)
+        partitions.append({"file": os.path.relpath(part_path, store_dir), "month": str(month),
+                           "rows": len(part), "stats": _stats(part)})
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256,
+            "partitions": partitions}
+
+
+def _store_version(sources: dict) -> str:
+    # Hash of the content of every source, independent of ingest order
+    digest = hashlib.sha256(":".join(sorted(s["sha256"] for s in sources.values())).encode())
+    return digest.hexdigest()[:16]
+
+
+def ingest(source: str, store_dir: str = STORE_DIR, workers: Optional[int] = None) -> Tuple[dict, str]:
+    """Bring the store up to date with every CSV matched by ``source``.
+
+    Unchanged files (same mtime and size) are skipped, changed and new files
+    are parsed in parallel by ``workers`` processes (all cores by default),
+    and partitions of files that disappeared are removed once the new
+    manifest is in place. Returns the manifest and the store version.
+    """
+    paths = source_files(source)
+    if not paths:
+        raise FileNotFoundError(f"No CSV files match {source!r}")
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    manifest = _read_meta(manifest_path)
+    sources = manifest.get("sources", {})
+
+    stale = []
+    for path in paths:
+        entry = sources.get(path)
+        stat = os.stat(path)
+        if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            stale.append(path)
+    removed = [path for path in sources if path not in paths]
+
+    os.makedirs(store_dir, exist_ok=True)
+    old = [partition["file"] for path in stale + removed
+           for partition in sources.pop(path, {}).get("partitions", [])]
+
+    if stale:
+        workers = min(workers or os.cpu_count() or 1, len(stale))
+        if workers == 1:
+            entries = [ingest_file(path, store_dir) for path in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                entries = list(executor.map(ingest_file, stale, [store_dir] * len(stale)))
+        sources.update(zip(stale, entries))
+
+    manifest = {"sources": sources, "version": _store_version(sources)}
+    _write_json(manifest_path, manifest)
+    current = {partition["file"] for source in sources.values() for partition in source["partitions"]}
+    for file in old:
+        # Readers of the previous manifest are done once the new one is in place
+        if file in current:
+            continue
+        for stale_path in [os.path.join(store_dir, file), *glob.glob(os.path.join(store_dir, f"{file}.*"))]:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return manifest, manifest["version"]
+
+
+def partitions(store_dir: str = STORE_DIR) -> List[dict]:
+    """Every partition file of the store, ordered by month."""
+    manifest = _read_meta(os.path.join(store_dir, MANIFEST))
+    entries = [p for s in manifest.get("sources", {}).values() for p in s["partitions"]]
+    return sorted(entries, key=lambda p: (p["month"], p["file"]))
+
+
+def prune(store_dir: str = STORE_DIR, start: Optional[DateLike] = None,
+          end: Optional[DateLike] = None) -> List[str]:
+    """Paths of the partition files whose order dates can fall in [start, end]."""
+    low = pd.Timestamp(start) if start is not None else None
+    high = pd.Timestamp(end) if end is not None else None
+    selected = []
+    for partition in partitions(store_dir):
+        first, last = (pd.Timestamp(v) for v in partition["stats"][DATA_COLUMN])
+        if (low is not None and last < low) or (high is not None and first > high):
+            continue
+        selected.append(os.path.join(store_dir, partition["file"]))
+    return selected
+
+
+def load_range(store_dir: str = STORE_DIR, start: Optional[DateLike] = None,
+               end: Optional[DateLike] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load the rows ordered in [start, end], reading only the matching partitions."""
+    paths = prune(store_dir, start, end)
+    read = columns if columns is None or DATA_COLUMN in columns else [DATA_COLUMN, *columns]
+    if not paths:
+        return pd.DataFrame(columns=read)
+    data = concat_sales([pd.read_parquet(p, columns=read) for p in paths])
+    if start is not None or end is not None:
+        # Partitions at the edges of the range also hold rows outside it
+        dates = data[DATA_COLUMN]
+        mask = pd.Series(True, index=data.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        data = data[mask].reset_index(drop=True)
+    data.attrs["version"] = _read_meta(os.path.join(store_dir, MANIFEST)).get("version")
+    return data if columns is None else data[columns]
+
+
+def sales_by_range(dimension: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                   filters: Optional[Filters] = None, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """``db.queries.sales_by`` over the partitions of [start, end] only."""
+    paths = prune(store_dir, start, end)
+    if not paths:
+        names = [name for name, _ in DIMENSIONS[dimension] + MEASURES]
+        return pd.DataFrame(columns=names)
+    filters = dict(filters or {})
+    if start is not None or end is not None:
+        filters[DATA_COLUMN] = (pd.Timestamp(start) if start is not None else pd.Timestamp.min,
+                                pd.Timestamp(end) if end is not None else pd.Timestamp.max)
+    return sales_by(dimension, filters, files=paths)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Ingest CSV exports into the date-partitioned store.")
+    parser.add_argument("source", help="directory, glob pattern or CSV file")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--workers", type=int, help="parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest, version = ingest(args.source, args.store, args.workers)
+    rows = sum(p["rows"] for p in partitions(args.store))
+    print(f"{len(manifest['sources'])} files, {len(partitions(args.store))} partitions, "
+          f"{rows:,} rows, version {version} in {time.perf_counter() - started:.1f}s")
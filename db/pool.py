@@ -0,0 +1,136 @@
+"""Process-wide DuckDB connection pool.
+
+Every dashboard session in a server process shares one database handle,
+in memory by default: each server process holds its own database with
+views over the shared Parquet files, so processes never contend for a
+file lock. Every query runs on a cursor of its own that is closed when
+the query is done, registration goes through a single locked writer, and
+the handle is closed once at interpreter exit.
+"""
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    import duckdb
+
+# Private to the process; DUCKDB_DATABASE may name a file for single-process use
+DATABASE = ":memory:"
+
+
+class ConnectionPool:
+    """One DuckDB connection per process handing out per-query cursors."""
+
+    def __init__(self, database: str = DATABASE, threads: Optional[int] = None,
+                 memory_limit: Optional[str] = None, read_only: bool = False):
+        self.database = database
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.read_only = read_only
+        self._connection = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def connection(self) -> "duckdb.DuckDBPyConnection":
+        """The shared connection, opened on first use."""
+        with self._lock:
+            if self._connection is None:
+                # DuckDB is only imported once a query actually runs
+                import duckdb
+
+                config = {}
+                if self.threads:
+                    config["threads"] = self.threads
+                if self.memory_limit:
+                    config["memory_limit"] = self.memory_limit
+                self._connection = duckdb.connect(database=self.database, read_only=self.read_only, config=config)
+            return self._connection
+
+    @contextmanager
+    def reader(self) -> Iterator["duckdb.DuckDBPyConnection"]:
+        """A cursor owned by the calling query, closed when the block exits.
+
+        Cursors are cheap and never shared, so sessions and chart threads
+        cannot close each other's cursors mid-query.
+        """
+        cursor = self.connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def writer(self):
+        """Serialize writes (ingest, registration) through one cursor."""
+        if self.read_only:
+            raise PermissionError(f"Connection pool for {self.database!r} is read-only")
+        with self._write_lock:
+            cursor = self.connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def set_pragmas(self, threads: Optional[int] = None, memory_limit: Optional[str] = None):
+        """Change the thread count or memory limit of the open database."""
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+            self.threads = threads
+        if memory_limit:
+            self.connection.execute("SET memory_limit = ?", [memory_limit])
+            self.memory_limit = memory_limit
+
+    def close(self):
+        """Close the shared connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure(**kwargs) -> ConnectionPool:
+    """Replace the process-wide pool with one built from ``kwargs``."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(**kwargs)
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, configured from the environment on first use.
+
+    DUCKDB_DATABASE, DUCKDB_THREADS, DUCKDB_MEMORY_LIMIT and DUCKDB_READ_ONLY
+    override the defaults.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            threads = os.environ.get("DUCKDB_THREADS")
+            _pool = ConnectionPool(
+                database=os.environ.get("DUCKDB_DATABASE", DATABASE),
+                threads=int(threads) if threads else None,
+                memory_limit=os.environ.get("DUCKDB_MEMORY_LIMIT"),
+                read_only=os.environ.get("DUCKDB_READ_ONLY", "") in ("1", "true", "yes"),
+            )
+        return _pool
+
+
+def shutdown():
+    """Close the process-wide pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(shutdown)
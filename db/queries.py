@@ -0,0 +1,194 @@
+"""DuckDB query layer for the dashboard aggregations.
+
+The dataset is registered in each process's DuckDB as a view over the
+Parquet parts, so server processes share the files instead of competing
+for a database lock. Every breakdown is pushed down to DuckDB and only the
+small aggregated result is materialized in pandas.
+"""
+import os
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import CACHE_DIR, COLUMNS, DATA_COLUMN, DATA_URL, SCHEMA, part_paths, refresh_cache
+from db.pool import get_pool
+
+if TYPE_CHECKING:
+    import duckdb
+    import pyarrow as pa
+
+TABLE = "sales"
+
+# Position of a row in the loaded Dataset frame (parts in order), exposed by the sales view
+ROW_ID = "row_id"
+
+# Per-cursor relation holding a row selection filter (see ``cursor``)
+ROW_SELECTION = "row_selection"
+
+# Age groups used by the age/gender tornado chart: 18-20, 21-23, ... 33-35
+AGE_GROUP = ("CASE WHEN \"Buyer Age\" BETWEEN 18 AND 35 THEN "
+             "printf('%d-%d', 18 + 3 * ((\"Buyer Age\" - 18) // 3), 20 + 3 * ((\"Buyer Age\" - 18) // 3)) END")
+
+# Dimension name -> list of (output column, SQL expression)
+DIMENSIONS = {
+    "category": [("Product Category", '"Product Category"')],
+    "product": [("Product ID", '"Product ID"')],
+    "location": [("Order Location", '"Order Location"')],
+    "shipping": [("Shipping Charges", '"Shipping Charges"')],
+    "age_gender": [("Age Group", AGE_GROUP), ("Buyer Gender", '"Buyer Gender"')],
+    "month": [(DATA_COLUMN, f"date_trunc('month', \"{DATA_COLUMN}\")")],
+}
+
+# Measures returned by every breakdown
+MEASURES = [
+    ("Total Sales", 'sum("Total Sales")'),
+    ("Quantity", 'sum("Quantity")'),
+    ("Total Shipping Charges", 'sum("Shipping Charges")'),
+    ("Sales Price", 'avg("Sales Price")'),
+    ("Orders", 'count(DISTINCT "Order ID")'),
+]
+
+# Filters map a column to a list of allowed values or an inclusive (low, high) range.
+# "Year" and "Month" filter on the year and month of the order date; ROW_ID takes an
+# array of row ids (e.g. review search hits), joined in DuckDB instead of bound one by one.
+Filters = Dict[str, Union[Sequence, Tuple]]
+FILTER_COLUMNS = {name: f'"{name}"' for name in [DATA_COLUMN, *SCHEMA]}
+FILTER_COLUMNS["Year"] = f'year("{DATA_COLUMN}")'
+FILTER_COLUMNS["Month"] = f'month("{DATA_COLUMN}")'
+
+# Raw-data pages leave out the free-text review unless it is asked for
+PAGE_COLUMNS = [c for c in COLUMNS if c != "Review"]
+PAGE_SIZE = 100
+
+
+@contextmanager
+def cursor(filters: Optional[Filters] = None) -> Iterator["duckdb.DuckDBPyConnection"]:
+    """A read cursor for one query, closed when the ``with`` block exits.
+
+    A ROW_ID selection in ``filters`` is registered on the cursor as an
+    Arrow table, without a copy, for ``where_clause`` to join against.
+    """
+    with get_pool().reader() as cur:
+        if filters and ROW_ID in filters:
+            import pyarrow as pa
+
+            rows = np.asarray(filters[ROW_ID], dtype=np.int64)
+            cur.register(ROW_SELECTION, pa.table({ROW_ID: rows}))
+        yield cur
+
+
+def _literal(text: str) -> str:
+    # View definitions cannot take bound parameters
+    return "'" + text.replace("'", "''") + "'"
+
+
+def register_dataset(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> str:
+    """Point the sales view at the Parquet parts of the current version.
+
+    Nothing is copied into DuckDB: the view scans the parts and numbers
+    their rows in Dataset order as ``row_id``. Returns the registered
+    dataset version.
+    """
+    _, version = refresh_cache(path, cache_dir)
+    pool = get_pool()
+    if pool.read_only:
+        # A read-only database file relies on whoever wrote it having registered the view
+        return version
+    with pool.writer() as con:
+        con.execute("CREATE TABLE IF NOT EXISTS dataset_meta (version VARCHAR)")
+        current = con.execute("SELECT version FROM dataset_meta").fetchone()
+        if current is not None and current[0] == version:
+            return version
+        selects, offset = [], 0
+        for part in part_paths(path, cache_dir):
+            source = _literal(os.path.abspath(part))
+            selects.append(f"SELECT * EXCLUDE (file_row_number), {offset} + file_row_number AS {ROW_ID} "
+                           f"FROM read_parquet({source}, file_row_number = true)")
+            offset += con.execute(f"SELECT count(*) FROM read_parquet({source})").fetchone()[0]
+        con.execute(f"CREATE OR REPLACE VIEW {TABLE} AS {' UNION ALL BY NAME '.join(selects)}")
+        con.execute("DELETE FROM dataset_meta")
+        con.execute("INSERT INTO dataset_meta VALUES (?)", [version])
+    return version
+
+
+def where_clause(filters: Optional[Filters]) -> Tuple[str, list]:
+    """Translate a filter mapping into a parameterized WHERE clause.
+
+    A ROW_ID filter needs the cursor opened with the same ``filters``.
+    """
+    if not filters:
+        return "", []
+    conditions, params = [], []
+    for column, value in filters.items():
+        if column == ROW_ID:
+            conditions.append(f"{ROW_ID} IN (SELECT {ROW_ID} FROM {ROW_SELECTION})")
+            continue
+        if column not in FILTER_COLUMNS:
+            raise KeyError(f"Unknown filter column: {column!r}")
+        expr = FILTER_COLUMNS[column]
+        if isinstance(value, tuple):
+            low, high = value
+            conditions.append(f"{expr} BETWEEN ? AND ?")
+            params.extend([low, high])
+        elif len(value) == 0:
+            # An empty multiselect selects nothing
+            conditions.append("FALSE")
+        else:
+            conditions.append(f"{expr} IN ({', '.join('?' * len(value))})")
+            params.extend(value)
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def sales_by(dimension: str, filters: Optional[Filters] = None,
+             files: Optional[List[str]] = None) -> pd.DataFrame:
+    """Aggregate the sales measures by ``dimension`` under ``filters``.
+
+    With ``files`` the Parquet files are scanned instead of the sales table,
+    e.g. the partitions ``db.partitions.prune`` kept for a date range.
+    """
+    if dimension not in DIMENSIONS:
+        raise KeyError(f"Unknown dimension: {dimension!r}")
+    keys = DIMENSIONS[dimension]
+    select = ", ".join([f'{expr} AS "{name}"' for name, expr in keys]
+                       + [f'{expr} AS "{name}"' for name, expr in MEASURES])
+    group = ", ".join(str(i + 1) for i in range(len(keys)))
+    where, params = where_clause(filters)
+    source = TABLE
+    if files is not None:
+        if filters and ROW_ID in filters:
+            raise ValueError("Row id filters need the sales view; Parquet files carry no row ids")
+        source, params = "read_parquet(?, union_by_name = true)", [files, *params]
+    sql = f"SELECT {select} FROM {source} {where} GROUP BY {group} ORDER BY {group}"
+    with cursor(filters) as cur:
+        return cur.execute(sql, params).df()
+
+
+def count_rows(filters: Optional[Filters] = None) -> int:
+    """Number of sales rows matching ``filters``."""
+    where, params = where_clause(filters)
+    with cursor(filters) as cur:
+        return cur.execute(f"SELECT count(*) FROM {TABLE} {where}", params).fetchone()[0]
+
+
+def page(filters: Optional[Filters] = None, columns: Optional[Sequence[str]] = None,
+         sort: Optional[str] = None, descending: bool = False, offset: int = 0,
+         limit: int = PAGE_SIZE) -> "pa.Table":
+    """One page of raw rows, filtered, sorted and projected inside DuckDB.
+
+    Only ``limit`` rows of the requested ``columns`` are materialized, as an
+    Arrow table that Streamlit renders without a pandas copy.
+    """
+    columns = list(columns or PAGE_COLUMNS)
+    for column in [*columns, *([sort] if sort else [])]:
+        if column not in COLUMNS:
+            raise KeyError(f"Unknown column: {column!r}")
+    select = ", ".join(f'"{c}"' for c in columns)
+    where, params = where_clause(filters)
+    # The row id keeps the order stable between pages when sort values tie
+    order = (f'ORDER BY "{sort}" {"DESC" if descending else "ASC"}, {ROW_ID}' if sort
+             else f"ORDER BY {ROW_ID}")
+    sql = f"SELECT {select} FROM {TABLE} {where} {order} LIMIT ? OFFSET ?"
+    with cursor(filters) as cur:
+        return cur.sql(sql, params=[*params, int(limit), int(offset)]).to_arrow_table()
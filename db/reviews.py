@@ -0,0 +1,136 @@
+"""Inverted index over the free-text Review column.
+
+Reviews are largely templated, so every distinct text is interned once and
+rows only keep an int32 code into that table. Posting lists map each term
+to the texts containing it; a query is answered on the interned texts and
+then expanded to row positions in one vectorized pass. The interned table
+is stored next to every Parquet part and merged across parts.
+"""
+import os
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import CACHE_DIR, DATA_URL, part_paths
+
+REVIEW_COLUMN = "Review"
+
+# Bumped when the sidecar layout changes, so older sidecars are rebuilt
+REVIEWS_FORMAT = 2
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of ``text``."""
+    return _TOKEN.findall(str(text).lower())
+
+
+class ReviewIndex:
+    """Interned review texts, per-row codes and term postings."""
+
+    def __init__(self, texts: np.ndarray, codes: np.ndarray):
+        self.texts = texts
+        # Row -> position in ``texts``; -1 for rows without a review
+        self.codes = codes
+        postings: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            for term in set(tokenize(text)):
+                postings.setdefault(term, []).append(i)
+        self.postings = {term: np.array(ids, dtype=np.int32) for term, ids in postings.items()}
+        self.terms = np.array(sorted(self.postings), dtype=str)
+
+    @classmethod
+    def build(cls, reviews: pd.Series) -> "ReviewIndex":
+        """Index a Review column; duplicate strings are stored once."""
+        codes, texts = pd.factorize(reviews)
+        return cls(np.asarray(texts, dtype=object), codes.astype(np.int32))
+
+    def _term_texts(self, term: str) -> np.ndarray:
+        # A query word matches every indexed term it prefixes: "delay" finds "delays", "delayed"
+        start = np.searchsorted(self.terms, term)
+        ids = []
+        for indexed in self.terms[start:]:
+            if not indexed.startswith(term):
+                break
+            ids.append(self.postings[indexed])
+        return np.unique(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int32)
+
+    def text_ids(self, query: str) -> np.ndarray:
+        """Positions of the interned texts containing every word of ``query``."""
+        words = tokenize(query)
+        if not words:
+            return np.arange(len(self.texts), dtype=np.int32)
+        ids = self._term_texts(words[0])
+        for word in words[1:]:
+            ids = np.intersect1d(ids, self._term_texts(word), assume_unique=True)
+        return ids
+
+    def matching_texts(self, query: str) -> List[str]:
+        """Distinct review texts matching ``query``."""
+        return [str(t) for t in self.texts[self.text_ids(query)]]
+
+    def select(self, queries: Sequence[str]) -> np.ndarray:
+        """Row positions whose review matches all ``queries``, ascending."""
+        ids = np.arange(len(self.texts), dtype=np.int32)
+        for query in queries:
+            ids = np.intersect1d(ids, self.text_ids(query), assume_unique=True)
+        hits = np.zeros(len(self.texts) + 1, dtype=bool)
+        hits[ids] = True
+        # Code -1 (no review) lands on the trailing False slot
+        return np.flatnonzero(hits[self.codes])
+
+    def search(self, query: str) -> np.ndarray:
+        """Row positions whose review contains every word of ``query``, ascending."""
+        return self.select([query])
+
+
+def merge_indexes(indexes: Sequence[ReviewIndex]) -> ReviewIndex:
+    """Concatenate per-part indexes in row order, re-interning their texts."""
+    if len(indexes) == 1:
+        return indexes[0]
+    codes, texts = pd.factorize(pd.Series(np.concatenate([i.texts for i in indexes]), dtype=object))
+    codes = codes.astype(np.int32)
+    parts, offset = [], 0
+    for index in indexes:
+        local = codes[offset:offset + len(index.texts)]
+        # Map part-local codes to the merged table, keeping -1 for missing reviews
+        parts.append(np.where(index.codes >= 0, local[np.maximum(index.codes, 0)], -1).astype(np.int32))
+        offset += len(index.texts)
+    return ReviewIndex(np.asarray(texts, dtype=object), np.concatenate(parts))
+
+
+def _split_texts(text_bytes: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # Interned texts stored as concatenated UTF-8 with the end offset of each text
+    data = text_bytes.tobytes()
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    return np.array([data[start:end].decode("utf-8") for start, end in zip(starts, ends)], dtype=object)
+
+
+def part_index(part_path: str) -> ReviewIndex:
+    """Review index of one Parquet part, from its ``.reviews.npz`` sidecar when current."""
+    sidecar = f"{part_path}.reviews.npz"
+    stat = os.stat(part_path)
+    stamp = np.array([REVIEWS_FORMAT, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+    try:
+        # Numeric arrays only: the sidecar sits in a writable cache dir and is never unpickled
+        with np.load(sidecar, allow_pickle=False) as saved:
+            if np.array_equal(saved["stamp"], stamp):
+                return ReviewIndex(_split_texts(saved["text_bytes"], saved["text_ends"]), saved["codes"])
+    except (OSError, KeyError, ValueError):
+        pass
+    index = ReviewIndex.build(pd.read_parquet(part_path, columns=[REVIEW_COLUMN])[REVIEW_COLUMN])
+    encoded = [str(text).encode("utf-8") for text in index.texts]
+    tmp = f"{sidecar}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, stamp=stamp, codes=index.codes,
+             text_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+             text_ends=np.cumsum([len(text) for text in encoded], dtype=np.int64))
+    os.replace(tmp, sidecar)
+    return index
+
+
+def build_review_index(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> ReviewIndex:
+    """Index of every stored part (base export plus deltas), in row order."""
+    return merge_indexes([part_index(p) for p in part_paths(path, cache_dir)])
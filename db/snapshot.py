@@ -0,0 +1,114 @@
+"""Memory-mapped snapshots of the sales table shared across server processes.
+
+The resident columns of one dataset version are written once as an
+uncompressed Arrow IPC file next to the Parquet cache. Every Streamlit
+process maps that file instead of parsing its own copy, so the pages live
+once in the OS page cache and attaching takes milliseconds. A pointer file
+names the current snapshot and is swapped atomically after a new version is
+fully written; processes still mapping the previous file keep its pages
+until they re-attach.
+
+    python -m db.snapshot   # publish the current version
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Optional
+
+import pandas as pd
+
+from db.ingest import CACHE_DIR, DATA_URL, RESIDENT_COLUMNS, SOURCE, _read_meta, dataset_version, load_sales
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def snapshot_path(version: str, path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> str:
+    """Arrow IPC file holding ``version`` of the resident columns."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}.{version}.arrow")
+
+
+def pointer_path(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> str:
+    """JSON file naming the current snapshot."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}.snapshot.json")
+
+
+def _write_table(table: "pa.Table", target: str):
+    import pyarrow as pa
+
+    # Per-process temp name: several workers may publish the same version at once
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, target)
+
+
+def publish(path: str = DATA_URL, cache_dir: str = CACHE_DIR, data: Optional[pd.DataFrame] = None) -> str:
+    """Write the snapshot of the current version if missing and make it current.
+
+    ``data`` is used when it already holds the current version's resident
+    columns, saving a reload. Returns the published version.
+    """
+    import pyarrow as pa
+
+    version = dataset_version(path, cache_dir)
+    target = snapshot_path(version, path, cache_dir)
+    if not os.path.exists(target):
+        if data is None or data.attrs.get("version") != version:
+            data = load_sales(path, cache_dir, RESIDENT_COLUMNS)
+        # A partitioned store is never parsed into the cache, so the directory may not exist yet
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_table(pa.Table.from_pandas(data[RESIDENT_COLUMNS], preserve_index=False), target)
+
+    pointer = pointer_path(path, cache_dir)
+    previous = _read_meta(pointer).get("file")
+    if dataset_version(path, cache_dir) != version:
+        # A newer version was ingested meanwhile; its publisher owns the pointer
+        return version
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": version, "file": os.path.basename(target)}, f)
+    os.replace(tmp, pointer)
+    if previous and previous != os.path.basename(target):
+        # Mapped pages stay valid after unlink, so attached readers are unaffected
+        try:
+            os.remove(os.path.join(cache_dir, previous))
+        except OSError:
+            pass
+    return version
+
+
+def attach(path: str = DATA_URL, cache_dir: str = CACHE_DIR, version: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Map the current snapshot, or None if there is none (for ``version``).
+
+    Numeric and date columns are backed by the mapped file without a copy;
+    only the small categorical codes are materialized per process.
+    """
+    import pyarrow as pa
+
+    pointer = _read_meta(pointer_path(path, cache_dir))
+    if not pointer or (version is not None and pointer.get("version") != version):
+        return None
+    try:
+        source = pa.memory_map(os.path.join(cache_dir, pointer["file"]))
+    except FileNotFoundError:
+        # Swapped out between reading the pointer and mapping the file
+        return None
+    table = pa.ipc.open_file(source).read_all()
+    # One block per column keeps pandas from consolidating (copying) the mapped buffers
+    data = table.to_pandas(split_blocks=True)
+    data.attrs["version"] = pointer["version"]
+    return data
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish the memory-mapped snapshot of the sales table.")
+    parser.add_argument("--source", default=SOURCE, help="base CSV export or partitioned store")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    version = publish(args.source, args.cache_dir)
+    print(f"Published version {version} to {snapshot_path(version, args.source, args.cache_dir)}")
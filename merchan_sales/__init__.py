@@ -0,0 +1,9 @@
+"""Compute layer for the merchandise sales dashboards.
+
+Pure-Python and Streamlit-free: open a ``Dataset``, describe a selection
+with a ``FilterSpec`` and call the compute functions for small results.
+"""
+from merchan_sales.compute import (Kpi, Totals, breakdown, compare_windows, daily_values, date_bounds, geo, kpis,
+                                   month_histogram, percentiles, profile, raw_page, rollup, streamed_totals,
+                                   time_series, totals, window)
+from merchan_sales.dataset import Dataset, FilterSpec
@@ -0,0 +1,166 @@
+"""Versioned, memory-bounded cache for derived frames.
+
+Entries are keyed by (dataset version, transform name, parameters) and are
+evicted least-recently-used once the configured memory budget is exceeded.
+Frames are handed out as copy-on-write views when pandas copy-on-write is
+enabled (the dashboards turn it on at startup) and as deep copies otherwise,
+so a caller that modifies its result never touches the shared cached frame.
+"""
+import dataclasses
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Default budget in MiB; override with MERCHAN_CACHE_MB
+DEFAULT_BUDGET_MB = 256
+
+
+def freeze(value) -> Hashable:
+    """Turn parameters (dicts, lists, sets, arrays) into a hashable cache key part."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(v) for v in value))
+    if isinstance(value, np.ndarray):
+        # Row selections can be large; key them by content
+        return value.dtype.str, value.shape, hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+    return value
+
+
+def size_of(value, _seen: Optional[set] = None) -> int:
+    """Approximate memory footprint of a cached value in bytes.
+
+    Frames and containers are measured deeply, objects exposing ``nbytes``
+    (arrays, sketches) by that, and dataclasses (e.g. ``KpiCube``) through
+    their fields. Objects reachable twice are counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return value.nbytes + sum(size_of(v, seen) for v in value.flat)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(k, seen) + size_of(v, seen) for k, v in value.items())
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(size_of(v, seen) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(size_of(getattr(value, f.name), seen) for f in dataclasses.fields(value))
+    return sys.getsizeof(value)
+
+
+def share(value):
+    """Return a view of ``value`` that callers may modify without affecting the cache."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # Shallow copies are only safe to hand out while copy-on-write is on
+        return value.copy(deep=pd.get_option("mode.copy_on_write") is not True)
+    return value
+
+
+def selection_version(data: pd.DataFrame) -> Optional[str]:
+    """Cache version of a row selection of a versioned frame, e.g. ``df.iloc[rows]``.
+
+    Selections keep the attrs of their parent, so the row labels are hashed
+    in to tell them apart; None for unversioned frames.
+    """
+    version = data.attrs.get("version")
+    if version is None:
+        return None
+    rows = hashlib.sha256(np.ascontiguousarray(data.index.to_numpy()).tobytes()).hexdigest()[:12]
+    return f"{version}/{rows}"
+
+
+class DerivedCache:
+    """LRU cache of derived artifacts under a memory budget."""
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_MB << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, version: str, name: str, params: Optional[dict],
+                       compute: Callable[[], Any]) -> Any:
+        """Return the cached artifact, computing and storing it on a miss."""
+        key = (version, name, freeze(params or {}))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return share(self._entries[key][0])
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return share(value)
+
+    def put(self, key: Hashable, value):
+        """Store ``value`` and evict the oldest entries beyond the budget."""
+        size = size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Larger than the whole budget: serve it uncached
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop every entry, or only those of ``version`` and its filtered subsets."""
+        with self._lock:
+            for key in [k for k in self._entries
+                        if version is None or k[0] == version or str(k[0]).startswith(f"{version}/")]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.nbytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DerivedCache:
+    """Return the process-wide derived cache, shared by every session."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            budget = int(os.environ.get("MERCHAN_CACHE_MB", DEFAULT_BUDGET_MB))
+            _cache = DerivedCache(max_bytes=budget << 20)
+        return _cache
+
+
+def cached_transform(name: str):
+    """Cache ``fn(data, **params)`` per dataset version (``data.attrs["version"]``)."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(data: pd.DataFrame, **params):
+            version = data.attrs.get("version")
+            if version is None:
+                # Unversioned frames (e.g. ad hoc filters) are not cached
+                return fn(data, **params)
+            return get_cache().get_or_compute(version, name, params, lambda: fn(data, **params))
+        return wrapper
+    return decorator
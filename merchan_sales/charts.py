@@ -0,0 +1,120 @@
+"""Plotly figures of the app.py dashboard.
+
+Each builder takes the small aggregated frame of its chart and returns the
+figure, so the same charts can be rendered by Streamlit, measured by the
+benchmarks or exported without a running app.
+"""
+import pandas as pd
+
+
+def _px():
+    # Plotly is only imported when a chart is actually built
+    import plotly.express as px
+    return px
+
+
+def sales_over_time_figure(sales_over_time: pd.DataFrame):
+    """Bar chart of period totals with the change label and an average line."""
+    px = _px()
+    # Calculate the average total sales
+    avg_total_sales = sales_over_time['Total Sales'].mean()
+    # Abbreviate the average total sales
+    avg_total_sales_abbr = f"{avg_total_sales / 1000:.1f}K"
+
+    # Plot the bar chart with title
+    fig = px.bar(sales_over_time, x='Label', y='Total Sales', title="Total Sales Over Time", text='Total Sales')
+    # Add a dotted line for the average total sales
+    fig.add_shape(
+        type="line",
+        x0=sales_over_time['Label'].iloc[0],
+        x1=sales_over_time['Label'].iloc[-1],
+        y0=avg_total_sales,
+        y1=avg_total_sales,
+        line=dict(color="RoyalBlue", width=2, dash="dot"),
+    )
+    # Add annotation for the average total sales
+    fig.add_annotation(
+        x=sales_over_time['Label'].iloc[-1],
+        y=avg_total_sales,
+        text=f"Avg: ${avg_total_sales_abbr}",
+        showarrow=False,
+        font=dict(color="RoyalBlue", size=12),
+        align="right",
+        xanchor="right",
+        yanchor="bottom"
+    )
+    # Update the layout and traces to include the percentage change
+    fig.update_layout(xaxis_title='', yaxis_title='')
+    fig.update_traces(marker=dict(line=dict(width=0.5)), texttemplate='%{customdata[0]}', textposition='outside', customdata=sales_over_time[['Change Text']])
+    return fig
+
+
+def category_figure(total_sales_by_category: pd.DataFrame):
+    """Pie chart of Total Sales by Product Category."""
+    px = _px()
+    return px.pie(total_sales_by_category, values='Total Sales', names='Product Category', title="Total Sales by Product Category")
+
+
+def shipping_figure(total_shipping_charges: pd.DataFrame):
+    """Horizontal bars of the summed charges per Shipping Charges tier."""
+    px = _px()
+    total_shipping_charges = total_shipping_charges.sort_values(by='Shipping Charges', ascending=False)
+    fig = px.bar(total_shipping_charges, x='Total Shipping Charges', y='Shipping Charges', orientation='h', title="How Shipping Charges Impact Sales", text='Total Shipping Charges')
+    fig.update_layout(xaxis_title='', yaxis_title='', xaxis_showticklabels=False)
+    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside')
+    fig.update_yaxes(type='category')  # Ensure y-axis shows unique Shipping Charges values
+    return fig
+
+
+def product_figure(total_sales_by_product: pd.DataFrame):
+    """Horizontal bars of Total Sales and Quantity by Product ID."""
+    px = _px()
+    total_sales_by_product = total_sales_by_product.sort_values(by='Total Sales', ascending=True)
+    fig = px.bar(total_sales_by_product, x='Total Sales', y='Product ID', orientation='h', title="Total Sales by Products", text='Total Sales')
+    # Add quantity as text next to total sales
+    fig.update_traces(texttemplate='$ %{text:.0f} | ∑ %{customdata[0]}', textposition='outside', customdata=total_sales_by_product[['Quantity']])
+    # Add quantity to the hover information
+    fig.update_traces(hovertemplate='<b>%{y}</b><br>Total Sales: $%{x:.0f}<br>Quantity: %{customdata[0]}<extra></extra>')
+    # Adjust layout to give more space for better visualization and reduce bar lengths
+    fig.update_layout(xaxis_title='', yaxis_title='', margin=dict(l=50, r=50, t=50, b=50))
+    return fig
+
+
+def location_figure(total_sales_locat: pd.DataFrame):
+    """Horizontal bars of Total Sales by Order Location."""
+    px = _px()
+    total_sales_locat = total_sales_locat.sort_values(by='Total Sales', ascending=True)
+    fig = px.bar(total_sales_locat, x='Total Sales', y='Order Location', orientation='h', title="Total Sales by Location", text='Total Sales')
+    fig.update_layout(xaxis_title='', yaxis_title='', height=(fig.layout.height or 400) * 1.5)
+    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside', textfont_size=14)
+    return fig
+
+
+def price_figure(total_sales_by_product: pd.DataFrame):
+    """Scatter of Total Sales against the average Sales Price per product."""
+    px = _px()
+    fig = px.scatter(total_sales_by_product, x='Sales Price', y='Total Sales', text='Product ID', title="Total Sales vs. Average Sales Price by Product ID")
+    fig.update_traces(textposition='top center')
+    return fig
+
+
+def age_gender_figure(total_sales_by_age_gender: pd.DataFrame):
+    """Tornado chart of Total Sales by Age Group and Buyer Gender."""
+    px = _px()
+    total_sales_by_age_gender = total_sales_by_age_gender.dropna(subset=['Age Group'])
+    # Sort the total_sales_by_age_gender by 'Age Group' in ascending order
+    total_sales_by_age_gender = total_sales_by_age_gender.sort_values(by='Age Group', ascending=False)
+    fig = px.bar(total_sales_by_age_gender, x='Total Sales', y='Age Group', color='Buyer Gender', orientation='h', barmode='relative', title="", text='Total Sales', color_discrete_map={'Female': 'pink', 'Male': 'blue'})
+    fig.update_layout(xaxis_title='', yaxis_title='', xaxis_showticklabels=False, legend=dict(title=None, orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.1))  # Move legend to the top
+    fig.update_traces(texttemplate='$ %{text:.0f}', textposition='outside')
+    return fig
+
+
+def map_figure(points: pd.DataFrame):
+    """Geo scatter of the aggregated map points."""
+    px = _px()
+    fig = px.scatter_geo(points, lat="Latitude", lon="Longitude", color="Total Sales",
+                         hover_name="Order Location", size="Total Sales", hover_data=["Orders"],
+                         projection="natural earth", title="Qty of Sales by Location")
+    fig.update_layout(height=650)  # Increase the map size to 600
+    return fig
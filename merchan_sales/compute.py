@@ -0,0 +1,250 @@
+"""Headless compute functions behind the dashboards.
+
+Every function takes a ``Dataset`` and an optional ``FilterSpec`` and
+returns a small result, cached per dataset version and filter signature.
+Nothing here imports Streamlit, so batch jobs and workers can use the same
+engine as the pages.
+"""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import DATA_COLUMN
+from db.queries import PAGE_COLUMNS, PAGE_SIZE, count_rows, page
+from merchan_sales import timeseries
+from merchan_sales.cache import cached_transform, get_cache
+from merchan_sales.dataset import Dataset, FilterSpec
+from merchan_sales.kpis import QUANTILE_COLUMNS, KpiCube, build_kpi_cube, headline_kpis
+from merchan_sales.profile import dataset_profile, profile_summary
+from merchan_sales.rollups import ROLLUPS, build_rollup, rollup_table
+from merchan_sales.streaming import SalesAccumulator
+from merchan_sales.transforms import breakdown as _breakdown, breakdown_range, map_points
+from merchan_sales.windows import DailyRollup, build_daily_rollup, compare
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+class Kpi(NamedTuple):
+    label: str
+    value: float
+    # Share of the last complete month in percent
+    delta: float
+    # Relative standard error; 0 for exact values, > 0 for sketch estimates
+    error: float = 0.0
+
+
+@dataclass(frozen=True)
+class Totals:
+    """Overall, international and national totals of a selection."""
+    sales: int
+    shipping: int
+    quantity: int
+    orders: int
+    rating_mean: float
+    rating_count: int
+    international_sales: int
+    international_orders: int
+    national_sales: int
+    national_orders: int
+
+
+def _version(ds: Dataset, spec: Optional[FilterSpec]) -> str:
+    if spec is None or spec.is_empty():
+        return ds.version
+    return f"{ds.version}/{spec.signature()}"
+
+
+def _cube(ds: Dataset, spec: Optional[FilterSpec]) -> KpiCube:
+    if spec is None or spec.is_empty():
+        return ds.cube
+    frame = ds.frame(spec)
+    return get_cache().get_or_compute(_version(ds, spec), "kpi_cube", None,
+                                      lambda: build_kpi_cube(frame, frame.attrs["version"]))
+
+
+def _daily(ds: Dataset, spec: Optional[FilterSpec]) -> DailyRollup:
+    if spec is None or spec.is_empty():
+        if ds.version is None:
+            ds.refresh()
+        return ds.daily
+    frame = ds.frame(spec)
+    return get_cache().get_or_compute(_version(ds, spec), "daily_rollup", None,
+                                      lambda: build_daily_rollup(frame, frame.attrs["version"]))
+
+
+def kpis(ds: Dataset, spec: Optional[FilterSpec] = None) -> List[Kpi]:
+    """Headline KPIs and last-month deltas, from the cube of the selection."""
+    # A selection's months are complete or not by the dataset's last order day, or its picked end day
+    end = _daily(ds, None).end
+    if spec is not None and spec.dates is not None:
+        end = min(end, pd.Timestamp(spec.dates[1]))
+    return [Kpi(*row) for row in headline_kpis(_cube(ds, spec), end)]
+
+
+def percentiles(ds: Dataset, spec: Optional[FilterSpec] = None,
+                quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> pd.DataFrame:
+    """Approximate percentiles per sketched column, merged from the cube cell digests.
+
+    The "Rank Error" column is the largest rank uncertainty of the row, as a
+    fraction of the count.
+    """
+    cube = _cube(ds, spec)
+    rows = {}
+    for column in QUANTILE_COLUMNS:
+        digest = cube.digest(column)
+        rows[column] = [*digest.quantile(quantiles), float(np.max(digest.rank_error(quantiles)))]
+    return pd.DataFrame.from_dict(rows, orient="index",
+                                  columns=[f"{q:.0%}" for q in quantiles] + ["Rank Error"])
+
+
+def profile(ds: Dataset, spec: Optional[FilterSpec] = None) -> pd.DataFrame:
+    """Column profile of the selection: nulls, min/max, mean/std, percentiles, top values.
+
+    The full dataset is merged from the per-part profiles persisted next to
+    the Parquet cache; a selection is profiled once per filter signature.
+    """
+    if spec is None or spec.is_empty():
+        return dataset_profile(ds.path, ds.cache_dir)
+    return profile_summary(ds.frame(spec))
+
+
+@cached_transform("totals")
+def _totals(data: pd.DataFrame) -> Totals:
+    international = (data["International Shipping"] == "Yes").to_numpy()
+    sales = data["Total Sales"].to_numpy(dtype=np.int64)
+    return Totals(
+        sales=int(sales.sum()),
+        shipping=int(data["Shipping Charges"].sum()),
+        quantity=int(data["Quantity"].sum()),
+        orders=len(data),
+        rating_mean=float(data["Rating"].mean()),
+        rating_count=int(data["Rating"].count()),
+        international_sales=int(sales[international].sum()),
+        international_orders=int(international.sum()),
+        national_sales=int(sales[~international].sum()),
+        national_orders=int((~international).sum()),
+    )
+
+
+def totals(ds: Dataset, spec: Optional[FilterSpec] = None) -> Totals:
+    """Overall, international and national totals of the selection."""
+    return _totals(ds.frame(spec))
+
+
+def streamed_totals(result: SalesAccumulator) -> Totals:
+    """``totals`` of the full export from a streamed pass (``merchan_sales.streaming.aggregate``)."""
+    shipping = result.totals.get("shipping", pd.DataFrame(columns=["Total Sales", "Rows"]))
+    international = shipping.reindex(["Yes", "No"], fill_value=0)
+    return Totals(
+        sales=int(result.sums["Total Sales"]),
+        shipping=int(result.sums["Shipping Charges"]),
+        quantity=int(result.sums["Quantity"]),
+        orders=result.rows,
+        rating_mean=float(result.means["Rating"]),
+        rating_count=int(result.counts["Rating"]),
+        international_sales=int(international.loc["Yes", "Total Sales"]),
+        international_orders=int(international.loc["Yes", "Rows"]),
+        national_sales=int(international.loc["No", "Total Sales"]),
+        national_orders=int(international.loc["No", "Rows"]),
+    )
+
+
+def breakdown(ds: Dataset, dimension: str, spec: Optional[FilterSpec] = None) -> pd.DataFrame:
+    """Sales measures by ``dimension`` (see ``db.queries.DIMENSIONS``), pushed down to DuckDB."""
+    filters = ds.query_filters(spec)
+    if spec is not None and spec.dates is not None and spec.reviews is None and ds.partitioned:
+        # A partitioned store scans only the months the date range touches; review hits need the view's row ids
+        return breakdown_range(ds.version, dimension, *spec.dates, ds.path, filters)
+    return _breakdown(ds.version, dimension, filters)
+
+
+def raw_page(ds: Dataset, spec: Optional[FilterSpec] = None, columns: Optional[Sequence[str]] = None,
+             sort: Optional[str] = None, descending: bool = False, page_number: int = 0,
+             page_size: int = PAGE_SIZE, include_review: bool = False) -> Tuple["pa.Table", int]:
+    """One page of raw rows from DuckDB and the number of rows in the selection.
+
+    Filtering, sorting and projection run in the query layer, so only the
+    visible page is transferred; the review text is left out unless asked for.
+    """
+    filters = ds.query_filters(spec)
+    if columns is None:
+        columns = PAGE_COLUMNS + (["Review"] if include_review else [])
+    total = get_cache().get_or_compute(_version(ds, spec), "row_count", None, lambda: count_rows(filters))
+    table = page(filters, columns, sort, descending, offset=max(page_number, 0) * page_size, limit=page_size)
+    return table, total
+
+
+def rollup(ds: Dataset, name: str, spec: Optional[FilterSpec] = None) -> pd.DataFrame:
+    """Wide per-product or per-location table (see ``merchan_sales.rollups.ROLLUPS``).
+
+    Holds total sales, quantity and shipping, mean/min/max price, orders and
+    average rating, so charts read one table instead of merging breakdowns.
+    """
+    if name not in ROLLUPS:
+        raise KeyError(f"Unknown rollup: {name!r}")
+    if spec is None or spec.is_empty():
+        if ds.version is None:
+            ds.refresh()
+        return get_cache().get_or_compute(ds.version, "rollup", {"name": name},
+                                          lambda: rollup_table(ds.rollups[name], name))
+    frame = ds.frame(spec)
+    return get_cache().get_or_compute(_version(ds, spec), "rollup", {"name": name},
+                                      lambda: rollup_table(build_rollup(frame, ROLLUPS[name]), name))
+
+
+def time_series(ds: Dataset, granularity: str = "month", spec: Optional[FilterSpec] = None,
+                value: str = "Total Sales") -> pd.DataFrame:
+    """Period totals of ``value`` with period-over-period change."""
+    return timeseries.sales_over_time(ds.frame(spec), granularity=granularity, value=value)
+
+
+def geo(ds: Dataset, spec: Optional[FilterSpec] = None, zoom: Optional[float] = None) -> pd.DataFrame:
+    """Aggregated map points per location, or per grid cell at ``zoom``."""
+    return map_points(ds.frame(spec), zoom=zoom)
+
+
+def date_bounds(ds: Dataset) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """First and last order day, the range offered by the date pickers."""
+    daily = _daily(ds, None)
+    return daily.start, daily.end
+
+
+def window(ds: Dataset, start, end, spec: Optional[FilterSpec] = None,
+           dimension: Optional[str] = None) -> pd.DataFrame:
+    """Measure sums over the days ``start`` to ``end``, from two prefix-sum lookups.
+
+    With ``dimension`` (see ``merchan_sales.windows.DIMENSIONS``) one row per
+    value is returned, otherwise a single row.
+    """
+    daily = _daily(ds, spec)
+    if dimension is None:
+        return daily.window(start, end).to_frame().T
+    return daily.breakdown(start, end, dimension)
+
+
+def daily_values(ds: Dataset, start, end, measure: str = "sales",
+                 spec: Optional[FilterSpec] = None) -> pd.Series:
+    """Per-day values of a window measure between ``start`` and ``end``."""
+    return _daily(ds, spec).daily(start, end, measure)
+
+
+def compare_windows(ds: Dataset, start, end, period: str = "previous",
+                    spec: Optional[FilterSpec] = None) -> pd.DataFrame:
+    """Window KPIs against the previous period, or week, month or year before.
+
+    ``period`` is one of ``merchan_sales.windows.PERIODS``.
+    """
+    return compare(_daily(ds, spec), start, end, period)
+
+
+@cached_transform("month_histogram")
+def _month_histogram(data: pd.DataFrame) -> np.ndarray:
+    return np.bincount(data[DATA_COLUMN].dt.month.to_numpy(), minlength=13)[1:]
+
+
+def month_histogram(ds: Dataset, spec: Optional[FilterSpec] = None) -> np.ndarray:
+    """Number of order rows per calendar month (January first)."""
+    return _month_histogram(ds.frame(spec))
@@ -0,0 +1,239 @@
+"""Dataset handle and filter spec used by the compute functions.
+
+A ``Dataset`` owns one loaded version of the sales data together with its
+KPI cube, rollup tables, daily prefix sums, DuckDB registration, filter
+index and review index, and advances to newer versions incrementally. The
+frame holds the compact resident columns, mapped from the shared snapshot
+(``db.snapshot``) when one is published; review text is served from the
+interned review index. A ``FilterSpec`` describes a row selection and
+carries a stable signature used to key cached results.
+"""
+import hashlib
+import threading
+from dataclasses import dataclass, fields
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import (CACHE_DIR, DATA_COLUMN, RESIDENT_COLUMNS, SOURCE, concat_sales, dataset_version, is_store,
+                       load_delta, load_sales)
+from db.queries import ROW_ID, Filters, register_dataset
+from db.reviews import ReviewIndex, build_review_index
+from db.snapshot import attach, publish
+from merchan_sales.cache import get_cache, share
+from merchan_sales.figures import get_figure_cache
+from merchan_sales.filters import FilterIndex
+from merchan_sales.kpis import KpiCube, build_kpi_cube, update_kpi_cube
+from merchan_sales.rollups import build_rollups, update_rollups
+from merchan_sales.windows import DailyRollup, build_daily_rollup, update_daily_rollup
+
+# FilterSpec field -> dataset column
+SPEC_COLUMNS = {
+    "products": "Product ID",
+    "categories": "Product Category",
+    "genders": "Buyer Gender",
+    "locations": "Order Location",
+    "shipping": "International Shipping",
+}
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """Row selection; ``None`` leaves a field unconstrained."""
+    products: Optional[Tuple[str, ...]] = None
+    categories: Optional[Tuple[str, ...]] = None
+    genders: Optional[Tuple[str, ...]] = None
+    locations: Optional[Tuple[str, ...]] = None
+    # International Shipping values, "Yes" and/or "No"
+    shipping: Optional[Tuple[str, ...]] = None
+    years: Optional[Tuple[int, ...]] = None
+    months: Optional[Tuple[int, ...]] = None
+    ages: Optional[Tuple[int, int]] = None
+    # Inclusive (first day, last day) of the order date, as ISO dates
+    dates: Optional[Tuple[str, str]] = None
+    # Review search queries; a row must match all of them (see db.reviews)
+    reviews: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def make(cls, **values) -> "FilterSpec":
+        """Build a spec from lists or scalars, normalizing them to sorted tuples."""
+        normalized = {}
+        for name, value in values.items():
+            if value is None:
+                continue
+            if name == "ages":
+                normalized[name] = (int(value[0]), int(value[1]))
+            elif name == "dates":
+                normalized[name] = (pd.Timestamp(value[0]).date().isoformat(),
+                                    pd.Timestamp(value[-1]).date().isoformat())
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                normalized[name] = tuple(sorted(value))
+            else:
+                normalized[name] = (value,)
+        return cls(**normalized)
+
+    def is_empty(self) -> bool:
+        return all(getattr(self, f.name) is None for f in fields(self))
+
+    def signature(self) -> str:
+        """Short stable hash of the selection, for cache keys."""
+        return hashlib.sha256(repr(self).encode()).hexdigest()[:12]
+
+    def query_filters(self) -> Filters:
+        """The selection as DuckDB query filters (see ``db.queries.where_clause``).
+
+        Review queries are not included; ``Dataset.query_filters`` resolves them.
+        """
+        filters = {column: list(getattr(self, name)) for name, column in SPEC_COLUMNS.items()
+                   if getattr(self, name) is not None}
+        if self.years is not None:
+            filters["Year"] = list(self.years)
+        if self.months is not None:
+            filters["Month"] = list(self.months)
+        if self.ages is not None:
+            filters["Buyer Age"] = tuple(self.ages)
+        if self.dates is not None:
+            filters[DATA_COLUMN] = tuple(self.dates)
+        return filters
+
+
+class Dataset:
+    """One process-wide handle on the sales data, shared by every session.
+
+    With ``shared`` the frame is mapped from the published snapshot, and a
+    process that loads a version no one has published yet publishes it.
+    """
+
+    def __init__(self, path: str = SOURCE, cache_dir: str = CACHE_DIR, shared: bool = True):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.shared = shared
+        self.version: Optional[str] = None
+        self.cube: Optional[KpiCube] = None
+        # Rollup name -> additive state (see merchan_sales.rollups)
+        self.rollups: Dict[str, pd.DataFrame] = {}
+        self.daily: Optional[DailyRollup] = None
+        self._data: Optional[pd.DataFrame] = None
+        self._index: Optional[FilterIndex] = None
+        self._reviews: Optional[Tuple[str, ReviewIndex]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Advance to the current dataset version; returns True if it changed.
+
+        Appended deltas extend the KPI cube, the rollups and the daily
+        prefix sums in place of a full rebuild, the frame is attached from
+        the shared snapshot or extended, and the DuckDB table is brought to
+        the same version.
+        """
+        version = dataset_version(self.path, self.cache_dir)
+        with self._lock:
+            if version == self.version:
+                return False
+            delta = load_delta(self.version, self.path, self.cache_dir, RESIDENT_COLUMNS) if self.version else None
+            data = attach(self.path, self.cache_dir, version) if self.shared else None
+            published = data is not None
+            if data is None:
+                data = (load_sales(self.path, self.cache_dir, RESIDENT_COLUMNS) if delta is None
+                        else concat_sales([self._data, delta]))
+            data.attrs["version"] = version
+            if delta is None:
+                cube = build_kpi_cube(data, version)
+                rollups = build_rollups(data)
+                daily = build_daily_rollup(data, version)
+            else:
+                cube = update_kpi_cube(self.cube, delta, version)
+                rollups = update_rollups(self.rollups, delta)
+                daily = update_daily_rollup(self.daily, delta, version)
+            if self.shared and not published:
+                publish(self.path, self.cache_dir, data)
+            register_dataset(self.path, self.cache_dir)
+            if self.version:
+                # Derived results of the previous version are no longer reachable
+                get_cache().invalidate(self.version)
+                get_figure_cache().invalidate(self.version)
+            self._data, self.cube, self.rollups, self.daily = data, cube, rollups, daily
+            self._index, self.version = None, version
+            return True
+
+    @property
+    def partitioned(self) -> bool:
+        """True when the source is a date-partitioned store (see db.partitions)."""
+        return is_store(self.path)
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """A copy-on-write view of the full frame, without the lazily served Review column."""
+        if self._data is None:
+            self.refresh()
+        return share(self._data)
+
+    @property
+    def index(self) -> FilterIndex:
+        """Filter bitmaps of the current version, built on first use."""
+        with self._lock:
+            if self._index is None or self._index.version != self.version:
+                self._index = FilterIndex(self._data, list(SPEC_COLUMNS.values()), DATA_COLUMN, "Buyer Age")
+            return self._index
+
+    @property
+    def reviews(self) -> ReviewIndex:
+        """Review index of the current version, loaded from the part sidecars on first use."""
+        if self._data is None:
+            self.refresh()
+        with self._lock:
+            if self._reviews is None or self._reviews[0] != self.version:
+                self._reviews = (self.version, build_review_index(self.path, self.cache_dir))
+            return self._reviews[1]
+
+    def query_filters(self, spec: Optional[FilterSpec] = None) -> Optional[Filters]:
+        """DuckDB filters of ``spec``, with review queries resolved to the matching row ids."""
+        if spec is None or spec.is_empty():
+            return None
+        filters = spec.query_filters()
+        if spec.reviews is not None:
+            # Review hits come from the interned index and are joined on the view's row ids
+            filters[ROW_ID] = self.reviews.select(spec.reviews)
+        return filters
+
+    def rows(self, spec: Optional[FilterSpec] = None) -> np.ndarray:
+        """Row positions selected by ``spec``."""
+        data = self.data
+        if spec is None or spec.is_empty():
+            return np.arange(len(data))
+        index = self.index
+        filters = {column: getattr(spec, name) for name, column in SPEC_COLUMNS.items()
+                   if getattr(spec, name) is not None}
+        if spec.years is not None:
+            filters["year"] = spec.years
+        if spec.months is not None:
+            filters["month"] = spec.months
+        rows = index.select(filters, age=spec.ages, dates=spec.dates)
+        if spec.reviews is not None:
+            rows = np.intersect1d(rows, self.reviews.select(spec.reviews), assume_unique=True)
+        return rows
+
+    def review(self, spec: Optional[FilterSpec] = None) -> pd.Series:
+        """Review text of the rows selected by ``spec``, dictionary-encoded over the interned texts."""
+        index = self.reviews
+        codes = index.codes if spec is None or spec.is_empty() else index.codes[self.rows(spec)]
+        return pd.Series(pd.Categorical.from_codes(codes, index.texts), name="Review")
+
+    def frame(self, spec: Optional[FilterSpec] = None) -> pd.DataFrame:
+        """The rows selected by ``spec``, versioned so derived results cache per filter.
+
+        The selection is copied once per version and filter signature and then
+        shared from the derived cache, so reruns with the same filters copy nothing.
+        """
+        data = self.data
+        if spec is None or spec.is_empty():
+            return data
+        version = f"{self.version}/{spec.signature()}"
+
+        def select():
+            selected = data.iloc[self.rows(spec)]
+            selected.attrs = {**data.attrs, "version": version}
+            return selected
+
+        return get_cache().get_or_compute(version, "frame", None, select)
@@ -0,0 +1,101 @@
+"""Cache of built Plotly figures.
+
+Figures are keyed by (dataset version, chart id, filter signature, theme)
+and kept in a memory-bounded LRU as their serialized JSON spec, whose
+length is what counts against the budget. Every caller gets its own figure
+rebuilt from the spec without re-validation, so sessions never share a
+mutable figure. With a figure directory configured the specs are also
+written to disk, so another process or a restarted server serves them
+without rebuilding.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Optional
+
+from merchan_sales.cache import DerivedCache
+
+# Default budget in MiB; override with MERCHAN_FIGURE_CACHE_MB
+DEFAULT_BUDGET_MB = 64
+
+
+def figure_from_spec(spec: str):
+    """A new figure from a JSON spec produced by ``Figure.to_json``."""
+    import plotly.graph_objects as go
+
+    # The spec was validated when the figure was built; skip the costly second pass
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+class FigureCache:
+    """LRU of serialized figure specs with optional on-disk copies."""
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_MB << 20, directory: Optional[str] = None):
+        self.directory = directory
+        self._memory = DerivedCache(max_bytes=max_bytes)
+
+    def _path(self, version: str, chart: str, signature: str, theme: str) -> str:
+        # Filtered versions ("version/signature") nest under their dataset version
+        return os.path.join(self.directory, *version.split("/"), f"{chart}-{signature or 'all'}-{theme}.json")
+
+    def _load_or_build(self, version: str, chart: str, signature: str, theme: str, build: Callable) -> str:
+        path = self._path(version, chart, signature, theme) if self.directory else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return f.read()
+        spec = build().to_json()
+        if path:
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            # Unique per writer, also across server processes sharing the directory
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(spec)
+            os.replace(tmp, path)
+        return spec
+
+    def get_spec(self, version: str, chart: str, build: Callable, signature: str = "",
+                 theme: str = "streamlit") -> str:
+        """Return the cached JSON spec, building (or loading) it on a miss."""
+        return self._memory.get_or_compute(
+            version, "figure", {"chart": chart, "signature": signature, "theme": theme},
+            lambda: self._load_or_build(version, chart, signature, theme, build))
+
+    def get_or_build(self, version: str, chart: str, build: Callable, signature: str = "",
+                     theme: str = "streamlit"):
+        """Return a new figure from the cached spec, building (or loading) it on a miss."""
+        return figure_from_spec(self.get_spec(version, chart, build, signature, theme))
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop the figures of ``version`` (and its filtered subsets), or every figure."""
+        self._memory.invalidate(version)
+        if self.directory:
+            shutil.rmtree(os.path.join(self.directory, *version.split("/")) if version else self.directory,
+                          ignore_errors=True)
+
+    def stats(self) -> dict:
+        return self._memory.stats()
+
+
+_figures = None
+_figures_lock = threading.Lock()
+
+
+def get_figure_cache() -> FigureCache:
+    """Return the process-wide figure cache; MERCHAN_FIGURE_DIR enables disk persistence."""
+    global _figures
+    with _figures_lock:
+        if _figures is None:
+            budget = int(os.environ.get("MERCHAN_FIGURE_CACHE_MB", DEFAULT_BUDGET_MB))
+            _figures = FigureCache(max_bytes=budget << 20, directory=os.environ.get("MERCHAN_FIGURE_DIR"))
+        return _figures
+
+
+def cached_figure(version: Optional[str], chart: str, build: Callable, signature: str = "",
+                  theme: str = "streamlit"):
+    """Build ``chart`` once per version, signature and theme; unversioned figures are not cached."""
+    if version is None:
+        return build()
+    return get_figure_cache().get_or_build(version, chart, build, signature, theme)
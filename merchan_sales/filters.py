@@ -0,0 +1,118 @@
+"""Bitmap index for the sidebar multiselect filters.
+
+Every value of an indexed column gets a packed row bitmap, built once per
+dataset version. A filter combination is answered by OR-ing the bitmaps of
+the selected values per column and AND-ing the columns, and comes back as
+row positions instead of a filtered copy of the frame. Buyer age and order
+date are served from sorted indexes so range pickers cost two binary searches.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+YEAR = "year"
+MONTH = "month"
+
+
+class _ColumnIndex:
+    """Packed bitmaps of one categorical column."""
+
+    def __init__(self, values: pd.Series, nbytes: int):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, labels = pd.factorize(values, sort=True)
+        bitmaps = np.stack([np.packbits(codes == i) for i in range(len(labels))]) if len(labels) \
+            else np.empty((0, nbytes), dtype=np.uint8)
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        # Only values present in the rows are offered as filter options
+        present = np.flatnonzero(counts)
+        self.labels = [labels[i] for i in present]
+        self.counts = counts[present]
+        self.bitmaps = bitmaps[present]
+        self.position = {label: i for i, label in enumerate(self.labels)}
+
+    def select(self, selected: Sequence) -> Optional[np.ndarray]:
+        """Bitmap of rows matching any selected value; None when all values are selected."""
+        positions = sorted({self.position[v] for v in selected if v in self.position})
+        if len(positions) == len(self.labels):
+            return None
+        if not positions:
+            return np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        if len(positions) > len(self.labels) // 2:
+            # Fewer bitmaps to combine through the complement
+            chosen = set(positions)
+            rest = [i for i in range(len(self.labels)) if i not in chosen]
+            return ~np.bitwise_or.reduce(self.bitmaps[rest], axis=0)
+        return np.bitwise_or.reduce(self.bitmaps[positions], axis=0)
+
+
+class FilterIndex:
+    """Per-value row bitmaps for categorical filters plus a sorted age index."""
+
+    def __init__(self, data: pd.DataFrame, columns: Sequence[str], date_column: str, age_column: str):
+        self.n = len(data)
+        self.version = data.attrs.get("version")
+        nbytes = (self.n + 7) // 8
+        self._columns: Dict[str, _ColumnIndex] = {c: _ColumnIndex(data[c], nbytes) for c in columns}
+        self._columns[YEAR] = _ColumnIndex(data[date_column].dt.year, nbytes)
+        self._columns[MONTH] = _ColumnIndex(data[date_column].dt.month, nbytes)
+        ages = data[age_column].to_numpy()
+        self._age_order = np.argsort(ages, kind="stable")
+        self._age_sorted = ages[self._age_order]
+        dates = data[date_column].to_numpy()
+        self._date_order = np.argsort(dates, kind="stable")
+        self._date_sorted = dates[self._date_order]
+
+    def labels(self, column: str) -> List:
+        """Distinct values of ``column`` (``"year"``/``"month"`` for order dates), sorted."""
+        return list(self._columns[column].labels)
+
+    def age_range(self) -> Tuple[int, int]:
+        if not self.n:
+            return 0, 0
+        return int(self._age_sorted[0]), int(self._age_sorted[-1])
+
+    def date_range(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        if not self.n:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(self._date_sorted[0]), pd.Timestamp(self._date_sorted[-1])
+
+    def _range_bits(self, order: np.ndarray, values: np.ndarray, low, high) -> Optional[np.ndarray]:
+        start = np.searchsorted(values, low, side="left")
+        stop = np.searchsorted(values, high, side="right")
+        if start == 0 and stop == self.n:
+            return None
+        hits = np.zeros(self.n, dtype=bool)
+        hits[order[start:stop]] = True
+        return np.packbits(hits)
+
+    def _age_bits(self, low, high) -> Optional[np.ndarray]:
+        return self._range_bits(self._age_order, self._age_sorted, low, high)
+
+    def _date_bits(self, low, high) -> Optional[np.ndarray]:
+        # Whole days: the high end includes every order placed on that day
+        low = np.datetime64(pd.Timestamp(low).normalize())
+        high = np.datetime64(pd.Timestamp(high).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1))
+        return self._range_bits(self._date_order, self._date_sorted, low, high)
+
+    def select(self, filters: Dict[str, Sequence], year: Optional[int] = None,
+               age: Optional[Tuple[int, int]] = None, dates: Optional[Tuple] = None) -> np.ndarray:
+        """Row positions matching every filter, in ascending order.
+
+        ``filters`` maps an indexed column to its selected values; ``year``
+        restricts the order year, ``age`` is an inclusive (low, high) range
+        and ``dates`` an inclusive (first day, last day) range.
+        """
+        masks = [self._columns[column].select(selected) for column, selected in filters.items()]
+        if year is not None:
+            masks.append(self._columns[YEAR].select([year]))
+        if age is not None:
+            masks.append(self._age_bits(*age))
+        if dates is not None:
+            masks.append(self._date_bits(*dates))
+        masks = [m for m in masks if m is not None]
+        if not masks:
+            return np.arange(self.n)
+        return np.flatnonzero(np.unpackbits(np.bitwise_and.reduce(masks), count=self.n))
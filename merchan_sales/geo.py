@@ -0,0 +1,59 @@
+"""Server-side aggregation for the map layers.
+
+Maps get one point per Order Location or per lat/lon grid cell, carrying
+the summed sales and the order count, so the payload sent to the browser
+scales with the number of places and not with the number of orders.
+Coordinates are returned as float64: the resident float32 columns are not
+JSON serializable for ``st.map``.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+ORDERS = "Orders"
+
+# Cell size at zoom 0 in degrees; it halves with every zoom level
+BASE_CELL_DEGREES = 45.0
+
+
+def cell_degrees(zoom: float) -> float:
+    """Grid cell size for a map zoom level."""
+    return BASE_CELL_DEGREES / (2 ** max(zoom, 0))
+
+
+def location_points(data: pd.DataFrame, location: str = "Order Location", lat: str = "Latitude",
+                    lon: str = "Longitude", value: str = "Total Sales") -> pd.DataFrame:
+    """One point per location at its mean coordinates, with summed ``value`` and order count."""
+    grouped = data.groupby(location, observed=True)
+    points = grouped.agg(**{lat: (lat, "mean"), lon: (lon, "mean"), value: (value, "sum")})
+    points[ORDERS] = grouped.size()
+    return points.astype({lat: np.float64, lon: np.float64}).reset_index()
+
+
+def grid_points(data: pd.DataFrame, zoom: float, location: str = "Order Location", lat: str = "Latitude",
+                lon: str = "Longitude", value: str = "Total Sales") -> pd.DataFrame:
+    """One point per lat/lon grid cell at the cell's order centroid.
+
+    Points are labelled like location points, by the cell's busiest location
+    and how many others it merges, so the same map renders either kind.
+    """
+    cell = cell_degrees(zoom)
+    keys = [np.floor(data[lat].to_numpy() / cell).astype(np.int32),
+            np.floor(data[lon].to_numpy() / cell).astype(np.int32)]
+    grouped = data.groupby(keys)
+    points = grouped.agg(**{lat: (lat, "mean"), lon: (lon, "mean"), value: (value, "sum")})
+    points[ORDERS] = grouped.size()
+    counts = data.groupby(keys + [data[location].astype(str)]).size()
+    busiest = counts.sort_values(ascending=False).reset_index(level=2).groupby(level=[0, 1]).agg(
+        label=(location, "first"), places=(location, "size"))
+    others = (busiest["places"] - 1).map(lambda n: f" +{n}" if n else "")
+    points.insert(0, location, busiest["label"] + others)
+    return points.astype({lat: np.float64, lon: np.float64}).reset_index(drop=True)
+
+
+def geo_points(data: pd.DataFrame, zoom: Optional[float] = None, **columns) -> pd.DataFrame:
+    """Location points, or grid points at ``zoom`` when a zoom level is given."""
+    if zoom is None:
+        return location_points(data, **columns)
+    return grid_points(data, zoom, **columns)
@@ -0,0 +1,154 @@
+"""Pre-aggregated KPI cube for the dashboard KPI row.
+
+The cube is built in one grouped pass per dataset version and is keyed by
+order month x international flag. Headline metrics and the share of the last
+complete month are then answered from the cube in O(months) instead of
+scanning every row.
+Appended rows are folded in with ``update_kpi_cube`` without a rebuild.
+Distinct orders and quantiles come from sketches kept per cell and merged
+on query (see ``merchan_sales.sketches``).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from db.ingest import DATA_COLUMN
+from merchan_sales.sketches import HyperLogLog, TDigest, hash_ids, merge_digests, merge_hll
+
+# Cube measure name -> source column
+MEASURES = {
+    "sales": "Total Sales",
+    "shipping": "Shipping Charges",
+    "quantity": "Quantity",
+    "rating_sum": "Rating",
+}
+
+# Columns with a quantile digest per cube cell
+QUANTILE_COLUMNS = ["Sales Price", "Total Sales", "Buyer Age", "Rating"]
+
+
+@dataclass(frozen=True)
+class KpiCube:
+    """Monthly KPI aggregates for one dataset version."""
+    version: str
+    # Index (month, international); columns: sales, shipping, quantity, rating_sum, rating_count
+    cells: pd.DataFrame
+    # (month, international) -> HyperLogLog of order ids
+    orders: Dict[Tuple[pd.Period, bool], HyperLogLog] = field(repr=False)
+    # (month, international) -> column -> t-digest of its values
+    digests: Dict[Tuple[pd.Period, bool], Dict[str, TDigest]] = field(default_factory=dict, repr=False)
+    # Last order day covered by the cube
+    end: Optional[pd.Timestamp] = None
+
+    @property
+    def months(self) -> List[pd.Period]:
+        return sorted(self.cells.index.get_level_values("month").unique())
+
+    def last_complete_month(self, end: Optional[pd.Timestamp] = None) -> Optional[pd.Period]:
+        """Latest month whose days all lie on or before ``end`` (default: the cube's last order day).
+
+        A trailing month the data only covers in part is skipped, so its few
+        days do not stand in for a whole month.
+        """
+        end = self.end if end is None else pd.Timestamp(end).normalize()
+        if end is None or pd.isna(end):
+            return self.months[-1] if self.months else None
+        month = end.to_period("M")
+        return month if end >= month.end_time.normalize() else month - 1
+
+    def _keys(self, months=None, international: Optional[bool] = None) -> list:
+        return [key for key in self.orders
+                if (months is None or key[0] in months)
+                and (international is None or key[1] == international)]
+
+    def distinct_orders(self, months=None, international: Optional[bool] = None) -> HyperLogLog:
+        """Merged order-id sketch of the given months and international flag."""
+        return merge_hll(self.orders[key] for key in self._keys(months, international))
+
+    def digest(self, column: str, months=None, international: Optional[bool] = None) -> TDigest:
+        """Merged quantile digest of ``column`` for the given months and international flag."""
+        return merge_digests(self.digests[key][column] for key in self._keys(months, international))
+
+    def totals(self, months=None, international: Optional[bool] = None) -> dict:
+        """Sum the cube cells for the given months and international flag."""
+        keys = self._keys(months, international)
+        cells = self.cells.loc[keys] if keys else self.cells.iloc[:0]
+        sums = cells.sum()
+        rating_count = sums.get("rating_count", 0)
+        return {
+            "sales": sums.get("sales", 0),
+            "shipping": sums.get("shipping", 0),
+            "quantity": sums.get("quantity", 0),
+            "rating": sums.get("rating_sum", 0) / rating_count if rating_count else float("nan"),
+            "orders": merge_hll(self.orders[key] for key in keys).estimate(),
+        }
+
+
+def build_kpi_cube(data: pd.DataFrame, version: str = None) -> KpiCube:
+    """Aggregate ``data`` into a month x international KPI cube."""
+    month = data[DATA_COLUMN].dt.to_period("M").rename("month")
+    international = (data["International Shipping"] == "Yes").rename("international")
+    frame = data[list(MEASURES.values())].rename(columns={v: k for k, v in MEASURES.items()})
+    grouped = frame.groupby([month, international], observed=True)
+    cells = grouped.sum()
+    cells["rating_count"] = grouped["rating_sum"].count()
+
+    hashes = hash_ids(data["Order ID"].to_numpy())
+    columns = {column: data[column].to_numpy() for column in QUANTILE_COLUMNS}
+    orders, digests = {}, {}
+    for key, idx in grouped.indices.items():
+        orders[key] = HyperLogLog()
+        orders[key].add_hashes(hashes[idx])
+        digests[key] = {column: TDigest.of(values[idx]) for column, values in columns.items()}
+    days = data[DATA_COLUMN].dropna()
+    end = days.max().normalize() if len(days) else None
+    return KpiCube(version=version or data.attrs.get("version", ""), cells=cells, orders=orders, digests=digests,
+                   end=end)
+
+
+def update_kpi_cube(cube: KpiCube, delta: pd.DataFrame, version: str = None) -> KpiCube:
+    """Fold appended rows into ``cube``; only the months present in ``delta`` change."""
+    version = version or delta.attrs.get("version", "")
+    if delta.empty:
+        return KpiCube(version=version, cells=cube.cells, orders=cube.orders, digests=cube.digests, end=cube.end)
+    delta_cube = build_kpi_cube(delta, version)
+    cells = cube.cells.add(delta_cube.cells, fill_value=0).sort_index()
+    orders, digests = dict(cube.orders), dict(cube.digests)
+    for key, sketch in delta_cube.orders.items():
+        orders[key] = orders[key].merge(sketch) if key in orders else sketch
+        if key in digests:
+            digests[key] = {column: digest.merge(delta_cube.digests[key][column])
+                            for column, digest in digests[key].items()}
+        else:
+            digests[key] = delta_cube.digests[key]
+    end = max(filter(pd.notna, [cube.end, delta_cube.end]), default=None)
+    return KpiCube(version=version, cells=cells, orders=orders, digests=digests, end=end)
+
+
+def headline_kpis(cube: KpiCube, end: Optional[pd.Timestamp] = None) -> List[Tuple[str, float, float, float]]:
+    """Return (label, value, last-month share in %, relative error) for the KPI row.
+
+    Last month is the last complete month up to ``end``, the dataset's last
+    order day (default: the cube's own). The error is 0 for exact sums and
+    the sketch standard error for estimates.
+    """
+    month = cube.last_complete_month(end)
+    last_month = [month] if month is not None else []
+    overall = cube.totals()
+    recent = cube.totals(months=last_month)
+    intl = cube.totals(international=True)
+    intl_recent = cube.totals(months=last_month, international=True)
+
+    def share(part, whole):
+        return (part / whole) * 100 if whole else float("nan")
+
+    order_error = cube.distinct_orders().relative_error
+    return [
+        ("Total Sales", overall["sales"], share(recent["sales"], overall["sales"]), 0.0),
+        ("Total International Sales", intl["sales"], share(intl_recent["sales"], intl["sales"]), 0.0),
+        ("Total Shipping Charges", overall["shipping"], share(recent["shipping"], overall["shipping"]), 0.0),
+        ("Total Order IDs", overall["orders"], share(recent["orders"], overall["orders"]), order_error),
+        ("Total Quantity", overall["quantity"], share(recent["quantity"], overall["quantity"]), 0.0),
+        ("Average Rating", overall["rating"], share(recent["rating"], overall["rating"]), 0.0),
+    ]
@@ -0,0 +1,68 @@
+"""Memory report of the in-memory sales table.
+
+Compares the legacy layout (``pd.read_csv`` with default dtypes: Python
+strings for text, decimal-comma coordinates and 64-bit numbers) with the
+compact one the dashboards keep resident: dictionary-encoded categories,
+narrowed integers, float32 coordinates and the Review column served from
+the interned review index on demand.
+
+    python -m merchan_sales.memory [path]
+"""
+from typing import Optional
+
+import pandas as pd
+
+from db.ingest import CACHE_DIR, DATA_URL, LAZY_COLUMNS, RESIDENT_COLUMNS, load_sales
+from db.reviews import build_review_index
+
+
+def column_bytes(data: pd.DataFrame) -> pd.Series:
+    """Deep memory usage per column in bytes."""
+    return data.memory_usage(deep=True, index=False)
+
+
+def memory_report(path: str = DATA_URL, cache_dir: str = CACHE_DIR,
+                  legacy_rows: Optional[int] = None) -> pd.DataFrame:
+    """Bytes per column of the legacy and the compact layout, with a total row.
+
+    With ``legacy_rows`` only that many rows are parsed in the legacy layout
+    and its bytes are scaled up to the full row count, so large exports can
+    be reported without holding the legacy table.
+    """
+    legacy = pd.read_csv(path, nrows=legacy_rows)
+    compact = load_sales(path, cache_dir, RESIDENT_COLUMNS)
+    reviews = build_review_index(path, cache_dir)
+
+    report = pd.DataFrame({
+        "legacy dtype": legacy.dtypes.astype(str),
+        "legacy bytes": column_bytes(legacy) * (len(compact) / max(len(legacy), 1)),
+        "compact dtype": compact.dtypes.astype(str),
+        "compact bytes": column_bytes(compact),
+    })
+    for column in LAZY_COLUMNS:
+        report.loc[column, "compact dtype"] = "lazy"
+        report.loc[column, "compact bytes"] = 0
+    # Loaded on demand: interned texts plus one int32 code per row
+    report["on demand bytes"] = 0
+    report.loc["Review", "on demand bytes"] = (reviews.codes.nbytes
+                                               + int(pd.Series(reviews.texts).memory_usage(deep=True)))
+    report = report.reindex(legacy.columns.union(compact.columns, sort=False))
+    report.loc["total"] = report.sum(numeric_only=True)
+    report.loc["per row"] = report.loc["total"] / max(len(compact), 1)
+    report["ratio"] = report["legacy bytes"] / report["compact bytes"].where(report["compact bytes"] > 0)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the legacy and compact memory layouts.")
+    parser.add_argument("path", nargs="?", default=DATA_URL)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--legacy-rows", type=int, help="parse only this many rows in the legacy layout")
+    args = parser.parse_args()
+
+    report = memory_report(args.path, args.cache_dir, args.legacy_rows)
+    print(report.to_string(float_format=lambda x: f"{x:,.1f}"))
+    total = report.loc["total"]
+    print(f"\nResident: {total['legacy bytes'] / total['compact bytes']:.1f}x smaller than the legacy layout")
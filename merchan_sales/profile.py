@@ -0,0 +1,257 @@
+"""Column profiles for the "Profiling" panels.
+
+A profile holds mergeable statistics per column: null counts, min/max,
+mean and variance (merged with Chan's formula), exact quartiles plus a
+quantile digest for numeric columns (the digest only answers once parts are
+merged), value counts for categorical columns and a distinct-count
+sketch for free text. Profiles are computed in one vectorized pass per
+column, stored as JSON next to each Parquet part of the columnar cache and
+merged across parts, so an appended delta only profiles its own rows.
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import CACHE_DIR, DATA_URL, part_paths, refresh_cache
+from merchan_sales.cache import get_cache, selection_version
+from merchan_sales.sketches import HyperLogLog, TDigest
+
+# Categories shown per column in the summary
+TOP_K = 5
+
+# Most frequent values kept per part for free-text columns
+TEXT_TOP = 1000
+
+# Bumped when the stored statistics change shape, so older sidecars are recomputed
+PROFILE_FORMAT = 4
+
+SUMMARY_COLUMNS = ["count", "nulls", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+QUARTILES = [0.25, 0.5, 0.75]
+
+
+@dataclass(frozen=True)
+class NumericStats:
+    count: int
+    nulls: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+    digest: TDigest = field(repr=False)
+    # Exact QUARTILES of one part; merged stats fall back to the digest
+    quartiles: Optional[Tuple[float, float, float]] = None
+
+    def merge(self, other: "NumericStats") -> "NumericStats":
+        # A side without values keeps the other's exact quartiles
+        if not other.count:
+            return replace(self, nulls=self.nulls + other.nulls)
+        if not self.count:
+            return replace(other, nulls=self.nulls + other.nulls)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return NumericStats(
+            count=count,
+            nulls=self.nulls + other.nulls,
+            mean=self.mean + delta * other.count / count,
+            m2=self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            min=min(self.min, other.min),
+            max=max(self.max, other.max),
+            digest=self.digest.merge(other.digest),
+        )
+
+    def row(self) -> dict:
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+        q25, q50, q75 = self.quartiles if self.quartiles is not None else self.digest.quantile(QUARTILES)
+        return {"count": self.count, "nulls": self.nulls, "mean": self.mean, "std": std,
+                "min": self.min, "25%": q25, "50%": q50, "75%": q75, "max": self.max}
+
+
+@dataclass(frozen=True)
+class DateStats:
+    count: int
+    nulls: int
+    min: Optional[pd.Timestamp]
+    max: Optional[pd.Timestamp]
+
+    def merge(self, other: "DateStats") -> "DateStats":
+        return DateStats(self.count + other.count, self.nulls + other.nulls,
+                         min(filter(pd.notna, [self.min, other.min]), default=None),
+                         max(filter(pd.notna, [self.max, other.max]), default=None))
+
+    def row(self) -> dict:
+        return {"count": self.count, "nulls": self.nulls, "min": self.min, "max": self.max}
+
+
+@dataclass(frozen=True)
+class CategoryStats:
+    count: int
+    nulls: int
+    # Value -> rows; complete for categorical columns, the heaviest TEXT_TOP per part for text
+    counts: pd.Series = field(repr=False)
+    # Distinct-value sketch; only kept for free text, where counts are truncated
+    distinct: Optional[HyperLogLog] = field(default=None, repr=False)
+
+    def merge(self, other: "CategoryStats") -> "CategoryStats":
+        counts = self.counts.add(other.counts, fill_value=0)
+        distinct = self.distinct.merge(other.distinct) if self.distinct is not None else None
+        return CategoryStats(self.count + other.count, self.nulls + other.nulls, counts, distinct)
+
+    def row(self) -> dict:
+        unique = self.distinct.estimate() if self.distinct is not None else int((self.counts > 0).sum())
+        top = self.counts.nlargest(TOP_K)
+        return {"count": self.count, "nulls": self.nulls, "unique": round(unique),
+                "top": ", ".join(map(str, top.index)), "freq": int(top.iloc[0]) if len(top) else 0}
+
+
+ColumnStats = Union[NumericStats, DateStats, CategoryStats]
+Profile = Dict[str, ColumnStats]
+
+
+def profile_column(values: pd.Series) -> ColumnStats:
+    """Statistics of one column in a single vectorized pass."""
+    nulls = int(values.isna().sum())
+    present = values.dropna()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return DateStats(len(present), nulls, present.min() if len(present) else None,
+                         present.max() if len(present) else None)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        array = present.to_numpy(dtype=np.float64)
+        if not len(array):
+            return NumericStats(0, nulls, 0.0, 0.0, np.inf, -np.inf, TDigest())
+        mean = float(array.mean())
+        return NumericStats(len(array), nulls, mean, float(((array - mean) ** 2).sum()),
+                            float(array.min()), float(array.max()), TDigest.of(array),
+                            tuple(np.quantile(array, QUARTILES).tolist()))
+    counts = present.value_counts(sort=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        counts.index = counts.index.astype(str)
+        return CategoryStats(len(present), nulls, counts[counts > 0])
+    distinct = HyperLogLog()
+    distinct.add_hashes(pd.util.hash_pandas_object(present, index=False).to_numpy())
+    return CategoryStats(len(present), nulls, counts.iloc[:TEXT_TOP], distinct)
+
+
+def profile_frame(data: pd.DataFrame) -> Profile:
+    """Profile every column of ``data``."""
+    return {column: profile_column(data[column]) for column in data.columns}
+
+
+def merge_profiles(profiles: List[Profile]) -> Profile:
+    """Merge the profiles of disjoint row sets with the same columns."""
+    merged = dict(profiles[0])
+    for profile in profiles[1:]:
+        for column, stats in profile.items():
+            merged[column] = merged[column].merge(stats) if column in merged else stats
+    return merged
+
+
+def _label(value) -> Optional[str]:
+    # Dates print as days, numbers without a trailing ".0"
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat() if value != value.normalize() else value.strftime("%Y-%m-%d")
+    return f"{value:.10g}"
+
+
+def summary(profile: Profile) -> pd.DataFrame:
+    """One row per column, in the spirit of ``DataFrame.describe(include="all")``.
+
+    Dates and numbers share the min/max columns, so those hold text: one type
+    per column keeps the table Arrow-serializable for ``st.write``.
+    """
+    rows = {column: stats.row() for column, stats in profile.items()}
+    table = pd.DataFrame.from_dict(rows, orient="index").reindex(columns=SUMMARY_COLUMNS)
+    for column in ("min", "max"):
+        table[column] = table[column].map(_label).astype(object)
+    return table
+
+
+def _array(values: np.ndarray) -> dict:
+    return {"dtype": values.dtype.str, "data": base64.b64encode(np.ascontiguousarray(values).tobytes()).decode()}
+
+
+def _from_array(saved: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(saved["data"]), dtype=np.dtype(saved["dtype"])).copy()
+
+
+def _encode(stats: ColumnStats) -> dict:
+    # Plain JSON types only: sidecars live in a writable cache dir and must not be unpickled
+    if isinstance(stats, NumericStats):
+        digest = stats.digest
+        return {"kind": "numeric", "count": stats.count, "nulls": stats.nulls, "mean": stats.mean,
+                "m2": stats.m2, "min": stats.min, "max": stats.max, "quartiles": stats.quartiles,
+                "digest": {"compression": digest.compression, "min": digest.min, "max": digest.max,
+                           "means": _array(digest.means), "weights": _array(digest.weights),
+                           "points": _array(digest.points)}}
+    if isinstance(stats, DateStats):
+        return {"kind": "date", "count": stats.count, "nulls": stats.nulls,
+                "min": None if stats.min is None else stats.min.isoformat(),
+                "max": None if stats.max is None else stats.max.isoformat()}
+    distinct = stats.distinct
+    return {"kind": "category", "count": stats.count, "nulls": stats.nulls,
+            "labels": stats.counts.index.tolist(), "counts": stats.counts.tolist(),
+            "distinct": None if distinct is None else {"precision": distinct.precision,
+                                                       "registers": _array(distinct.registers)}}
+
+
+def _decode(saved: dict) -> ColumnStats:
+    if saved["kind"] == "numeric":
+        digest = saved["digest"]
+        return NumericStats(saved["count"], saved["nulls"], saved["mean"], saved["m2"], saved["min"], saved["max"],
+                            TDigest(digest["compression"], _from_array(digest["means"]),
+                                    _from_array(digest["weights"]), digest["min"], digest["max"],
+                                    _from_array(digest["points"])),
+                            None if saved["quartiles"] is None else tuple(saved["quartiles"]))
+    if saved["kind"] == "date":
+        return DateStats(saved["count"], saved["nulls"],
+                         None if saved["min"] is None else pd.Timestamp(saved["min"]),
+                         None if saved["max"] is None else pd.Timestamp(saved["max"]))
+    distinct = saved["distinct"]
+    return CategoryStats(saved["count"], saved["nulls"], pd.Series(saved["counts"], index=saved["labels"],
+                                                                   dtype=np.int64),
+                         None if distinct is None else HyperLogLog(distinct["precision"],
+                                                                   _from_array(distinct["registers"])))
+
+
+def part_profile(part_path: str) -> Profile:
+    """Profile of one Parquet part, read from its JSON sidecar while the part is unchanged."""
+    sidecar = f"{part_path}.profile.json"
+    stat = os.stat(part_path)
+    stamp = [PROFILE_FORMAT, stat.st_mtime_ns, stat.st_size]
+    try:
+        with open(sidecar) as f:
+            saved = json.load(f)
+        if saved["stamp"] == stamp:
+            return {column: _decode(stats) for column, stats in saved["columns"].items()}
+    except (OSError, KeyError, TypeError, ValueError):
+        pass
+    profile = profile_frame(pd.read_parquet(part_path))
+    tmp = f"{sidecar}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"stamp": stamp, "columns": {column: _encode(stats) for column, stats in profile.items()}}, f)
+    os.replace(tmp, sidecar)
+    return profile
+
+
+def dataset_profile(path: str = DATA_URL, cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """Summary of the whole dataset, merged from the per-part profiles."""
+    _, version = refresh_cache(path, cache_dir)
+    return get_cache().get_or_compute(
+        version, "profile", None,
+        lambda: summary(merge_profiles([part_profile(p) for p in part_paths(path, cache_dir)])))
+
+
+def profile_summary(data: pd.DataFrame) -> pd.DataFrame:
+    """Summary of ``data``, cached per dataset version and selected rows."""
+    version = selection_version(data)
+    if version is None:
+        return summary(profile_frame(data))
+    return get_cache().get_or_compute(version, "profile", {"columns": list(data.columns)},
+                                      lambda: summary(profile_frame(data)))
@@ -0,0 +1,196 @@
+"""Headless report export for many filter sets at once.
+
+The dataset is loaded once and every variant's KPIs and chart tables are
+computed in this process through the compute layer, so the loaded frame,
+the filter index, the DuckDB table and the cached aggregates are shared by
+all variants. Only the small tables are sent to a process pool, where the
+app.py figures are built and written as HTML, PNG or JSON.
+
+    python -m merchan_sales.report --by locations,categories --format html,json
+"""
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from html import escape
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import CACHE_DIR, SOURCE
+from merchan_sales import charts
+from merchan_sales.compute import breakdown, geo, kpis, rollup, time_series
+from merchan_sales.dataset import SPEC_COLUMNS, Dataset, FilterSpec
+
+OUTPUT_DIR = "reports"
+FORMATS = ("html", "json", "png")
+
+# Table id -> how it is computed for a selection
+TABLES = {
+    "sales_over_time": lambda ds, spec, granularity: time_series(ds, granularity, spec),
+    "category": lambda ds, spec, granularity: breakdown(ds, "category", spec),
+    "shipping": lambda ds, spec, granularity: breakdown(ds, "shipping", spec),
+    "product": lambda ds, spec, granularity: rollup(ds, "product", spec),
+    "location": lambda ds, spec, granularity: rollup(ds, "location", spec),
+    "age_gender": lambda ds, spec, granularity: breakdown(ds, "age_gender", spec),
+    "map": lambda ds, spec, granularity: geo(ds, spec),
+}
+
+# Chart id -> (table it is drawn from, figure builder); the charts of app.py
+CHARTS = {
+    "sales_over_time": ("sales_over_time", charts.sales_over_time_figure),
+    "category": ("category", charts.category_figure),
+    "shipping": ("shipping", charts.shipping_figure),
+    "product": ("product", charts.product_figure),
+    "location": ("location", charts.location_figure),
+    "price": ("product", charts.price_figure),
+    "age_gender": ("age_gender", charts.age_gender_figure),
+    "map": ("map", charts.map_figure),
+}
+
+
+def slug(name: str) -> str:
+    """File-name safe form of a variant name."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "report"
+
+
+def variants_by(ds: Dataset, fields: Sequence[str], include_all: bool = True) -> List[Tuple[str, FilterSpec]]:
+    """One variant per value of each FilterSpec field in ``fields`` (e.g. "locations")."""
+    variants = [("all", FilterSpec())] if include_all else []
+    for name in fields:
+        if name not in SPEC_COLUMNS:
+            raise KeyError(f"Unknown filter field: {name!r}")
+        for label in ds.index.labels(SPEC_COLUMNS[name]):
+            variants.append((f"{name}-{label}", FilterSpec.make(**{name: [label]})))
+    return variants
+
+
+def variants_from_file(path: str) -> List[Tuple[str, FilterSpec]]:
+    """Variants listed in a JSON file as ``[{"name": ..., "filters": {field: values}}]``."""
+    with open(path) as f:
+        return [(entry["name"], FilterSpec.make(**entry.get("filters", {}))) for entry in json.load(f)]
+
+
+def compute_variant(ds: Dataset, name: str, spec: FilterSpec, granularity: str = "month") -> dict:
+    """KPIs and chart tables of one variant, ready to be rendered elsewhere."""
+    return {
+        "name": name,
+        "filters": {k: v for k, v in asdict(spec).items() if v is not None},
+        "version": ds.version,
+        "kpis": [kpi._asdict() for kpi in kpis(ds, spec)],
+        "tables": {table: compute(ds, spec, granularity) for table, compute in TABLES.items()},
+    }
+
+
+def _json_default(value):
+    # NumPy scalars (KPI values) stay numbers; dates and the rest are written as text
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def _html(report: dict, figures: dict, errors: Dict[str, str]) -> str:
+    title = f"Sales report: {report['name']}"
+    parts = [f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{escape(title)}</title></head><body>",
+             f"<h1>{escape(title)}</h1>",
+             f"<p>Dataset version {escape(str(report['version']))}; "
+             f"filters {escape(json.dumps(report['filters'], default=str))}</p>",
+             pd.DataFrame(report["kpis"]).to_html(index=False, float_format=lambda x: f"{x:,.2f}")]
+    for i, figure in enumerate(figures.values()):
+        # plotly.js is loaded once per page, from the CDN, to keep hundreds of reports small
+        parts.append(figure.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+    for chart, error in errors.items():
+        parts.append(f"<p>{escape(chart)} could not be drawn: {escape(error)}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def render_report(report: dict, output_dir: str, formats: Sequence[str]) -> List[str]:
+    """Build the figures of one computed variant and write its files; runs in a worker process."""
+    figures, errors = {}, {}
+    for chart, (table, build) in CHARTS.items():
+        try:
+            figures[chart] = build(report["tables"][table])
+        except Exception as error:
+            # An empty selection leaves some charts without data; the rest are still written
+            errors[chart] = str(error)
+
+    base = os.path.join(output_dir, slug(report["name"]))
+    written = []
+    if "json" in formats:
+        payload = {key: report[key] for key in ("name", "filters", "version", "kpis")}
+        payload["tables"] = {name: table.to_dict(orient="records") for name, table in report["tables"].items()}
+        payload["errors"] = errors
+        with open(f"{base}.json", "w") as f:
+            json.dump(payload, f, default=_json_default)
+        written.append(f"{base}.json")
+    if "html" in formats:
+        with open(f"{base}.html", "w", encoding="utf-8") as f:
+            f.write(_html(report, figures, errors))
+        written.append(f"{base}.html")
+    if "png" in formats:
+        os.makedirs(base, exist_ok=True)
+        for chart, figure in figures.items():
+            # Static images need the kaleido package
+            figure.write_image(os.path.join(base, f"{chart}.png"))
+            written.append(os.path.join(base, f"{chart}.png"))
+    return written
+
+
+def export_reports(ds: Dataset, variants: Iterable[Tuple[str, FilterSpec]], output_dir: str = OUTPUT_DIR,
+                   formats: Sequence[str] = ("html", "json"), workers: Optional[int] = None,
+                   granularity: str = "month") -> List[str]:
+    """Compute every variant here and render them in a process pool; returns the written paths.
+
+    Computing the next variant overlaps with rendering the previous ones.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if ds.version is None:
+        ds.refresh()
+    # Spawned workers: forking would copy the DuckDB connection and thread pools of this process
+    context = multiprocessing.get_context("spawn")
+    written = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(render_report, compute_variant(ds, name, spec, granularity), output_dir, formats)
+                   for name, spec in variants]
+        for future in as_completed(futures):
+            written.extend(future.result())
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib.util
+    import time
+
+    from merchan_sales import timeseries
+
+    parser = argparse.ArgumentParser(description="Export dashboard reports for many filter sets.")
+    parser.add_argument("--source", default=SOURCE, help="base CSV export or partitioned store")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--by", default="", help=f"comma-separated FilterSpec fields, one report per value "
+                                                 f"({', '.join(SPEC_COLUMNS)})")
+    parser.add_argument("--variants", help="JSON file of named filter sets")
+    parser.add_argument("--no-all", action="store_true", help="skip the unfiltered report")
+    parser.add_argument("--format", default="html,json", help=f"comma-separated, from {', '.join(FORMATS)}")
+    parser.add_argument("--granularity", default="month", choices=list(timeseries.GRANULARITIES))
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, help="render processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    formats = [f for f in args.format.split(",") if f]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    if "png" in formats and importlib.util.find_spec("kaleido") is None:
+        parser.error("PNG export needs the kaleido package")
+
+    start = time.perf_counter()
+    dataset = Dataset(args.source, args.cache_dir)
+    dataset.refresh()
+    variants = variants_by(dataset, [f for f in args.by.split(",") if f], include_all=not args.no_all)
+    if args.variants:
+        variants += variants_from_file(args.variants)
+    paths = export_reports(dataset, variants, args.output, formats, args.workers, args.granularity)
+    print(f"{len(variants)} reports, {len(paths)} files in {args.output} ({time.perf_counter() - start:.1f}s)")
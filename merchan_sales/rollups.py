@@ -0,0 +1,68 @@
+"""Per-product and per-location rollup tables shared by the charts.
+
+Each rollup is one grouped pass over the rows that keeps additive state
+(sums, counts, min/max) per key, so appended rows are folded in without a
+rebuild. The wide table read by the charts (totals, mean/min/max price,
+orders, average rating) is derived from that state on demand.
+"""
+from typing import Dict
+
+import pandas as pd
+
+# Rollup name -> grouping column
+ROLLUPS = {
+    "product": "Product ID",
+    "location": "Order Location",
+}
+
+# State column -> (source column, aggregation); every row is one order line
+_STATE = {
+    "Total Sales": ("Total Sales", "sum"),
+    "Quantity": ("Quantity", "sum"),
+    "Total Shipping Charges": ("Shipping Charges", "sum"),
+    "price_sum": ("Sales Price", "sum"),
+    "Min Price": ("Sales Price", "min"),
+    "Max Price": ("Sales Price", "max"),
+    "Orders": ("Sales Price", "size"),
+    "rating_sum": ("Rating", "sum"),
+    "rating_count": ("Rating", "count"),
+}
+
+_EXTREMES = {"Min Price": "min", "Max Price": "max"}
+
+
+def build_rollup(data: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Additive rollup state of ``data`` per value of ``column``."""
+    state = data.groupby(column, observed=True).agg(**_STATE)
+    # Deltas carry their own category dictionaries; key the state by plain labels
+    state.index = state.index.astype(str)
+    return state
+
+
+def merge_rollup(state: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Fold the rollup state of appended rows into ``state``."""
+    sums = [c for c in state.columns if c not in _EXTREMES]
+    merged = state[sums].add(delta[sums], fill_value=0)
+    for name, how in _EXTREMES.items():
+        merged[name] = pd.concat([state[name], delta[name]], axis=1).agg(how, axis=1)
+    return merged[state.columns].sort_index()
+
+
+def build_rollups(data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """State of every rollup, one grouped pass each."""
+    return {name: build_rollup(data, column) for name, column in ROLLUPS.items()}
+
+
+def update_rollups(rollups: Dict[str, pd.DataFrame], delta: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Fold appended rows into every rollup; unchanged keys keep their state."""
+    if delta.empty:
+        return rollups
+    return {name: merge_rollup(rollups[name], build_rollup(delta, ROLLUPS[name])) for name in rollups}
+
+
+def rollup_table(state: pd.DataFrame, name: str) -> pd.DataFrame:
+    """The wide table of a rollup, keyed by its grouping column."""
+    table = state[["Total Sales", "Quantity", "Total Shipping Charges", "Min Price", "Max Price", "Orders"]].copy()
+    table.insert(3, "Sales Price", state["price_sum"] / state["Orders"])
+    table["Rating"] = state["rating_sum"] / state["rating_count"].where(state["rating_count"] > 0)
+    return table.rename_axis(ROLLUPS[name]).reset_index()
@@ -0,0 +1,65 @@
+"""Concurrent computation of dashboard charts.
+
+Chart jobs run in a process-wide thread pool; pandas and DuckDB release
+the GIL in their kernels, so independent charts overlap on multi-core
+hosts. Results are yielded in completion order for the page to render as
+they arrive, and a job that misses its deadline is reported as timed out
+while it keeps running, so its cached result is ready on the next rerun.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+
+# Seconds a chart may take before its fallback is shown; override with MERCHAN_CHART_TIMEOUT
+DEFAULT_TIMEOUT = 10.0
+
+
+class ChartResult(NamedTuple):
+    name: str
+    value: Any
+    # None on success, otherwise the raised exception or a TimeoutError
+    error: Optional[BaseException]
+    seconds: float
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide chart pool (MERCHAN_CHART_WORKERS threads, 8 by default)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.environ.get("MERCHAN_CHART_WORKERS", min(8, os.cpu_count() or 1)))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart")
+        return _executor
+
+
+def default_timeout() -> float:
+    return float(os.environ.get("MERCHAN_CHART_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def run_charts(jobs: Dict[str, Callable[[], Any]], timeout: Optional[float] = None) -> Iterator[ChartResult]:
+    """Run every job concurrently and yield its result as soon as it completes.
+
+    Jobs still running ``timeout`` seconds after submission are yielded with
+    a ``TimeoutError``.
+    """
+    timeout = default_timeout() if timeout is None else timeout
+    started = time.perf_counter()
+    deadline = started + timeout
+    executor = get_executor()
+    pending: Dict[Future, str] = {executor.submit(job): name for name, job in jobs.items()}
+    while pending:
+        done, _ = wait(pending, timeout=max(deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            name = pending.pop(future)
+            error = future.exception()
+            yield ChartResult(name, None if error else future.result(), error, time.perf_counter() - started)
+    for name in pending.values():
+        yield ChartResult(name, None, TimeoutError(f"{name} took longer than {timeout:g}s"), timeout)
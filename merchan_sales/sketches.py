@@ -0,0 +1,204 @@
+"""Mergeable sketches for distinct counts and quantiles.
+
+``HyperLogLog`` estimates the number of distinct Order IDs in a few KiB and
+``TDigest`` answers approximate quantiles of a numeric column. Both are built
+per partition (e.g. per cube cell) and merged at query time, so a selection
+of partitions is answered without touching the rows. Each sketch reports
+its own error bound for display next to the estimate.
+"""
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+# 2**12 registers: 4 KiB per sketch, ~1.6% standard error
+HLL_PRECISION = 12
+
+# Centroid budget of a t-digest; about compression / 2 centroids are kept
+DIGEST_COMPRESSION = 200
+
+
+def hash_ids(values) -> np.ndarray:
+    """Hash integer ids to uniformly spread uint64 values (splitmix64)."""
+    x = np.asarray(values).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes."""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    @classmethod
+    def of(cls, ids, precision: int = HLL_PRECISION) -> "HyperLogLog":
+        """Sketch of the distinct values of an integer id array."""
+        sketch = cls(precision)
+        sketch.add_hashes(hash_ids(ids))
+        return sketch
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Fold uint64 hashes into the registers."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes << np.uint64(p)
+        # Rank = position of the first set bit in the remaining 64 - p bits
+        with np.errstate(divide="ignore"):
+            # Values just below 2**64 round up in float64; clip so they still rank 1
+            leading = np.maximum(63 - np.floor(np.log2(rest.astype(np.float64))), 0)
+        rank = np.where(rest == 0, 64 - p + 1, leading + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, *others: "HyperLogLog") -> "HyperLogLog":
+        """Union with sketches of the same precision."""
+        registers = self.registers.copy()
+        for other in others:
+            np.maximum(registers, other.registers, out=registers)
+        return HyperLogLog(self.precision, registers)
+
+    def estimate(self) -> float:
+        """Estimated number of distinct values."""
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return m * np.log(m / zeros)
+        return float(raw)
+
+    @property
+    def nbytes(self) -> int:
+        return self.registers.nbytes
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of ``estimate`` relative to the true count."""
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+def merge_hll(sketches: Iterable[HyperLogLog], precision: int = HLL_PRECISION) -> HyperLogLog:
+    """Union of any number of sketches; empty when there are none."""
+    sketches = list(sketches)
+    if not sketches:
+        return HyperLogLog(precision)
+    return sketches[0].merge(*sketches[1:])
+
+
+class TDigest:
+    """Merging t-digest: weighted centroids, dense at the tails.
+
+    A centroid that holds a single repeated value is a point mass: every rank
+    it covers answers that value, so columns with few distinct values (prices,
+    ratings, quantities) keep exact quantiles.
+    """
+
+    def __init__(self, compression: int = DIGEST_COMPRESSION, means: Optional[np.ndarray] = None,
+                 weights: Optional[np.ndarray] = None, minimum: float = np.inf, maximum: float = -np.inf,
+                 points: Optional[np.ndarray] = None):
+        self.compression = compression
+        self.means = np.empty(0) if means is None else means
+        self.weights = np.empty(0) if weights is None else weights
+        self.min = minimum
+        self.max = maximum
+        # Per centroid: True when every value merged into it is the same
+        self.points = np.zeros(len(self.means), dtype=bool) if points is None else points
+
+    @classmethod
+    def of(cls, values, compression: int = DIGEST_COMPRESSION) -> "TDigest":
+        """Digest of the non-null values of a numeric array."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls(compression)
+        # Collapse repeats first: most sales columns hold few distinct values
+        means, counts = np.unique(values, return_counts=True)
+        return cls(compression, means, counts.astype(np.float64), means[0], means[-1],
+                   np.ones(len(means), dtype=bool))._compress()
+
+    def _scale(self, q: np.ndarray) -> np.ndarray:
+        # k1 scale function: centroids span at most one unit of k, so the tails stay fine-grained
+        return self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+    def _compress(self) -> "TDigest":
+        order = np.argsort(self.means, kind="stable")
+        means, weights, points = self.means[order], self.weights[order], self.points[order]
+        # Point masses of the same value (e.g. from different parts) collapse before sizing
+        same = np.flatnonzero(np.r_[True, ~(points[1:] & points[:-1] & (means[1:] == means[:-1]))])
+        means, points = means[same], points[same]
+        weights = np.add.reduceat(weights, same)
+        upper = np.cumsum(weights)
+        total = upper[-1]
+        k = np.floor(self._scale((upper - weights / 2) / total))
+        # A centroid already wider than one unit of k is kept apart, so a heavy value stays a point mass
+        wide = self._scale(upper / total) - self._scale((upper - weights) / total) > 1
+        starts = np.flatnonzero(np.r_[True, (k[1:] != k[:-1]) | wide[1:] | wide[:-1]])
+        ends = np.r_[starts[1:], len(means)] - 1
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        merged_points = np.logical_and.reduceat(points, starts) & (means[starts] == means[ends])
+        # Centroids of one value keep it exactly rather than its floating-point weighted mean
+        merged_means[merged_points] = means[starts][merged_points]
+        return TDigest(self.compression, merged_means, merged_weights, self.min, self.max, merged_points)
+
+    def merge(self, *others: "TDigest") -> "TDigest":
+        """Digest of the union of the digested values."""
+        digests = [self, *others]
+        digest = TDigest(self.compression,
+                         np.concatenate([d.means for d in digests]),
+                         np.concatenate([d.weights for d in digests]),
+                         min(d.min for d in digests), max(d.max for d in digests),
+                         np.concatenate([d.points for d in digests]))
+        return digest._compress() if len(digest.means) else digest
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    @property
+    def nbytes(self) -> int:
+        return self.means.nbytes + self.weights.nbytes + self.points.nbytes
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(self.means, self.weights) / self.count) if self.count else float("nan")
+
+    def quantile(self, q: Sequence[float]) -> np.ndarray:
+        """Approximate values at the quantiles ``q`` (0..1)."""
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        upper = np.cumsum(self.weights)
+        lower, middle = upper - self.weights, upper - self.weights / 2
+        # Two knots per centroid: the ends of its rank span for a point mass, else its middle twice
+        knots = np.c_[np.where(self.points, lower, middle), np.where(self.points, upper, middle)].ravel()
+        ranks = np.r_[0.0, knots, self.count]
+        values = np.r_[self.min, np.repeat(self.means, 2), self.max]
+        return np.interp(q * self.count, ranks, values)
+
+    def rank_error(self, q: Sequence[float]) -> np.ndarray:
+        """Rank uncertainty at ``q`` as a fraction of the count: half the weight of the centroid there.
+
+        Point masses are exact, so they add no uncertainty.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        upper = np.cumsum(self.weights)
+        position = np.minimum(np.searchsorted(upper, q * self.count), len(upper) - 1)
+        return np.where(self.points[position], 0.0, self.weights[position] / 2 / self.count)
+
+
+def merge_digests(digests: Iterable[TDigest], compression: int = DIGEST_COMPRESSION) -> TDigest:
+    """Union of any number of digests; empty when there are none."""
+    digests = list(digests)
+    if not digests:
+        return TDigest(compression)
+    return digests[0].merge(*digests[1:])
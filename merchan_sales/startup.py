@@ -0,0 +1,56 @@
+"""Cold-start timing for the dashboard entry points.
+
+Pages mark the end of each startup phase (imports, data load, first
+render). Only the first run in a process is recorded, since later reruns
+reuse the imported modules and the loaded dataset. For a per-module import
+breakdown run the page under ``python -X importtime``.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_start: Optional[float] = None
+_last: Optional[float] = None
+_phases: Dict[str, float] = OrderedDict()
+_finished = False
+
+
+def start(t0: Optional[float] = None):
+    """Start the clock (``t0`` from ``time.perf_counter()``); only the first call counts."""
+    global _start, _last
+    with _lock:
+        if _start is None:
+            _start = _last = time.perf_counter() if t0 is None else t0
+
+
+def mark(phase: str):
+    """Record the time spent since the previous mark under ``phase``."""
+    global _last
+    with _lock:
+        if _finished or _start is None or phase in _phases:
+            return
+        now = time.perf_counter()
+        _phases[phase] = now - _last
+        _last = now
+
+
+def finish() -> Dict[str, float]:
+    """Close the first run and log the report; later calls return it unchanged."""
+    global _finished
+    with _lock:
+        if not _finished and _start is not None:
+            _finished = True
+            _phases["total"] = _last - _start
+            logger.info("startup: %s", ", ".join(f"{k}={v:.3f}s" for k, v in _phases.items()))
+        return dict(_phases)
+
+
+def report() -> Dict[str, float]:
+    """Seconds per startup phase recorded so far."""
+    with _lock:
+        return dict(_phases)
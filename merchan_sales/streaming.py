@@ -0,0 +1,166 @@
+"""Streaming aggregation of the sales export under a fixed memory cap.
+
+Workers that cannot hold the whole dataset read the CSV in bounded chunks
+and fold each chunk into running accumulators: sums, counts, means, min/max,
+per-dimension totals, the KPI cube and a distinct-order sketch. Every
+number is exact over the full file except the distinct order count, which
+is a HyperLogLog estimate. Peak memory is set by ``MERCHAN_STREAM_MB``.
+With ``MERCHAN_STREAMING=1`` the summary page (streamlit.py) renders its
+totals from one streamed pass instead of loading the rows.
+
+    python -m merchan_sales.streaming data/merchandise-sales.csv --memory-mb 64
+    MERCHAN_STREAMING=1 streamlit run streamlit.py
+"""
+import os
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import DATA_COLUMN, DATA_URL, file_hash, iter_sales_csv
+from merchan_sales.kpis import KpiCube, build_kpi_cube, update_kpi_cube
+from merchan_sales.sketches import HyperLogLog, hash_ids
+
+# Default memory cap of the chunk pipeline in MiB; override with MERCHAN_STREAM_MB
+DEFAULT_MEMORY_MB = 64
+
+# Rows parsed to estimate the in-memory size of a row
+PROBE_ROWS = 1000
+
+# A chunk is held as raw text and parsed frame at once; budget for both plus the fold
+CHUNK_OVERHEAD = 3
+
+NUMERIC_COLUMNS = ["Buyer Age", "Sales Price", "Shipping Charges", "Quantity", "Total Sales", "Rating"]
+
+# Dimension name -> column totalled per value
+DIMENSIONS = {
+    "category": "Product Category",
+    "product": "Product ID",
+    "location": "Order Location",
+    "gender": "Buyer Gender",
+    "shipping": "International Shipping",
+}
+DIMENSION_MEASURES = ["Total Sales", "Quantity", "Shipping Charges"]
+
+
+def streaming_enabled() -> bool:
+    """True when ``MERCHAN_STREAMING`` switches the dashboards to the bounded-memory mode."""
+    return os.environ.get("MERCHAN_STREAMING", "").lower() in ("1", "true", "yes")
+
+
+def memory_budget() -> int:
+    """Configured memory cap of the chunk pipeline in bytes."""
+    return int(os.environ.get("MERCHAN_STREAM_MB", DEFAULT_MEMORY_MB)) << 20
+
+
+def chunk_rows(path: str = DATA_URL, max_bytes: Optional[int] = None) -> int:
+    """Rows per chunk that keep the pipeline under ``max_bytes``."""
+    max_bytes = max_bytes or memory_budget()
+    probe = next(iter_sales_csv(path, PROBE_ROWS), None)
+    if probe is None or probe.empty:
+        return PROBE_ROWS
+    row_bytes = probe.memory_usage(deep=True).sum() / len(probe)
+    return max(PROBE_ROWS, int(max_bytes / (row_bytes * CHUNK_OVERHEAD)))
+
+
+def stream_sales(path: str = DATA_URL, max_bytes: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield the typed sales rows of ``path`` in chunks sized for ``max_bytes``."""
+    yield from iter_sales_csv(path, chunk_rows(path, max_bytes))
+
+
+class SalesAccumulator:
+    """Running aggregates of the sales rows folded in so far."""
+
+    def __init__(self, version: str = ""):
+        self.version = version
+        self.rows = 0
+        self.sums = pd.Series(0.0, index=NUMERIC_COLUMNS)
+        self.counts = pd.Series(0, index=NUMERIC_COLUMNS)
+        self.mins = pd.Series(np.inf, index=NUMERIC_COLUMNS)
+        self.maxs = pd.Series(-np.inf, index=NUMERIC_COLUMNS)
+        self.first_date: Optional[pd.Timestamp] = None
+        self.last_date: Optional[pd.Timestamp] = None
+        # Dimension name -> per-value totals (DIMENSION_MEASURES plus Rows)
+        self.totals: Dict[str, pd.DataFrame] = {}
+        self.orders = HyperLogLog()
+        self.cube: Optional[KpiCube] = None
+
+    def add(self, chunk: pd.DataFrame):
+        """Fold one chunk into the accumulators."""
+        if chunk.empty:
+            return
+        self.rows += len(chunk)
+        numeric = chunk[NUMERIC_COLUMNS]
+        self.sums += numeric.sum()
+        self.counts += numeric.count()
+        self.mins = np.minimum(self.mins, numeric.min())
+        self.maxs = np.maximum(self.maxs, numeric.max())
+        dates = chunk[DATA_COLUMN]
+        if self.first_date is None or dates.min() < self.first_date:
+            self.first_date = dates.min()
+        if self.last_date is None or dates.max() > self.last_date:
+            self.last_date = dates.max()
+
+        for name, column in DIMENSIONS.items():
+            grouped = chunk.groupby(column, observed=True)
+            part = grouped[DIMENSION_MEASURES].sum()
+            part["Rows"] = grouped.size()
+            # Chunks carry their own category dictionaries; key the totals by plain labels
+            part.index = part.index.astype(str)
+            previous = self.totals.get(name)
+            self.totals[name] = part if previous is None else previous.add(part, fill_value=0)
+
+        self.orders.add_hashes(hash_ids(chunk["Order ID"].to_numpy()))
+        if self.cube is None:
+            self.cube = build_kpi_cube(chunk, self.version)
+        else:
+            self.cube = update_kpi_cube(self.cube, chunk, self.version)
+
+    @property
+    def means(self) -> pd.Series:
+        return self.sums / self.counts.where(self.counts > 0)
+
+    def monthly(self, measure: str = "sales") -> pd.Series:
+        """Per-month totals of a KPI cube measure, indexed by the first day of the month."""
+        if self.cube is None:
+            return pd.Series(dtype=float)
+        monthly = self.cube.cells[measure].groupby(level="month").sum()
+        return monthly.set_axis(monthly.index.to_timestamp())
+
+    def distinct_orders(self) -> float:
+        """Estimated number of distinct Order IDs."""
+        return self.orders.estimate()
+
+    def summary(self) -> pd.DataFrame:
+        """count / mean / min / max / sum per numeric column."""
+        return pd.DataFrame({"count": self.counts, "mean": self.means, "min": self.mins,
+                             "max": self.maxs, "sum": self.sums})
+
+
+def aggregate(path: str = DATA_URL, max_bytes: Optional[int] = None) -> SalesAccumulator:
+    """Stream ``path`` through a ``SalesAccumulator`` within ``max_bytes`` of memory.
+
+    The accumulator version matches the base version of the Parquet cache.
+    """
+    accumulator = SalesAccumulator(version=file_hash(path)[:16])
+    for chunk in stream_sales(path, max_bytes):
+        accumulator.add(chunk)
+    return accumulator
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from merchan_sales.kpis import headline_kpis
+
+    parser = argparse.ArgumentParser(description="Aggregate a sales export in bounded memory.")
+    parser.add_argument("path", nargs="?", default=DATA_URL)
+    parser.add_argument("--memory-mb", type=int, help=f"memory cap (default {DEFAULT_MEMORY_MB} MiB)")
+    args = parser.parse_args()
+
+    result = aggregate(args.path, args.memory_mb << 20 if args.memory_mb else None)
+    print(f"{result.rows:,} rows, {result.first_date:%Y-%m-%d} to {result.last_date:%Y-%m-%d}, "
+          f"~{result.distinct_orders():,.0f} orders")
+    print(result.summary().to_string())
+    for label, value, delta, _ in headline_kpis(result.cube):
+        print(f"{label:<28} {value:>16,.2f}  last month {delta:.1f}%")
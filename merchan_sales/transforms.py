@@ -0,0 +1,39 @@
+"""Derived frames shared by the dashboard charts.
+
+Each transform is computed once per dataset version and served from the
+process-wide derived cache to every session afterwards.
+"""
+from typing import Optional
+
+import pandas as pd
+
+from db.partitions import DateLike, sales_by_range
+from db.queries import Filters, sales_by
+from merchan_sales.cache import cached_transform, get_cache
+from merchan_sales.geo import geo_points
+
+
+@cached_transform("coordinates")
+def coordinates(data: pd.DataFrame) -> pd.DataFrame:
+    """Columns needed by the sales map, with coordinates as floats."""
+    return data[["Order Location", "Latitude", "Longitude", "Total Sales"]]
+
+
+@cached_transform("map_points")
+def map_points(data: pd.DataFrame, zoom: Optional[float] = None) -> pd.DataFrame:
+    """Aggregated map points per location (or per grid cell at ``zoom``)."""
+    return geo_points(coordinates(data), zoom=zoom)
+
+
+def breakdown(version: str, dimension: str, filters: Optional[Filters] = None) -> pd.DataFrame:
+    """DuckDB breakdown by ``dimension``, cached per dataset version and filters."""
+    return get_cache().get_or_compute(version, "sales_by", {"dimension": dimension, "filters": filters},
+                                      lambda: sales_by(dimension, filters))
+
+
+def breakdown_range(version: str, dimension: str, start: DateLike, end: DateLike, store_dir: str,
+                    filters: Optional[Filters] = None) -> pd.DataFrame:
+    """``breakdown`` over only the store partitions that can hold orders from ``start`` to ``end``."""
+    return get_cache().get_or_compute(version, "sales_by_range",
+                                      {"dimension": dimension, "range": (start, end), "filters": filters},
+                                      lambda: sales_by_range(dimension, start, end, filters, store_dir))
@@ -0,0 +1,54 @@
+"""Paged access to raw rows for the "Show raw data" tables.
+
+Pages are cut from a row selection after an optional sort, and only the
+visible rows of the projected columns are copied, so the browser receives
+one page however large the frame is. Sort orders are computed once per
+dataset version and column and shared by every page and session.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from merchan_sales.cache import get_cache, selection_version
+
+PAGE_SIZE = 100
+
+# Free-text column left out of pages unless asked for
+REVIEW = "review"
+
+
+def page_columns(data: pd.DataFrame, include_review: bool = False) -> List[str]:
+    """Columns shown by default: everything except the review text."""
+    return [c for c in data.columns if include_review or str(c).lower() != REVIEW]
+
+
+def sort_order(data: pd.DataFrame, column: str, descending: bool = False) -> np.ndarray:
+    """Row positions of ``data`` ordered by ``column``, cached per version."""
+    def compute():
+        order = np.argsort(data[column].to_numpy(), kind="stable")
+        return order[::-1].copy() if descending else order
+
+    version = selection_version(data)
+    if version is None:
+        return compute()
+    return get_cache().get_or_compute(version, "sort_order", {"column": column, "descending": descending}, compute)
+
+
+def page_rows(data: pd.DataFrame, rows: Optional[np.ndarray] = None, columns: Optional[Sequence[str]] = None,
+              sort: Optional[str] = None, descending: bool = False, page: int = 0,
+              page_size: int = PAGE_SIZE) -> Tuple[pd.DataFrame, int]:
+    """Return one page of the selected ``rows`` (all rows by default) and the total row count."""
+    columns = list(columns) if columns is not None else page_columns(data)
+    if sort is not None:
+        order = sort_order(data, sort, descending)
+        if rows is not None:
+            # Keep the cached global order, restricted to the selection
+            selected = np.zeros(len(data), dtype=bool)
+            selected[rows] = True
+            order = order[selected[order]]
+    else:
+        order = np.arange(len(data)) if rows is None else np.asarray(rows)
+    start = max(page, 0) * page_size
+    positions = order[start:start + page_size]
+    return data.iloc[positions, data.columns.get_indexer(columns)], len(order)
@@ -0,0 +1,184 @@
+"""Cumulative daily rollups for date-range KPIs and period comparisons.
+
+Additive measures are summed per order day over a dense calendar and kept
+as prefix sums, overall and per value of a few dimensions. The totals of
+any date range are the difference of two rows located by day offset, so a
+window KPI or a week-over-week / year-over-year comparison costs the same
+however many rows the dataset holds. Appended rows are folded in by adding
+their daily sums and re-accumulating, which is linear in days, not rows.
+"""
+import datetime
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from db.ingest import DATA_COLUMN
+
+Day = Union[str, datetime.date, pd.Timestamp]
+
+# Window measure -> (source column, aggregation); every row is one order line
+MEASURES = {
+    "sales": ("Total Sales", "sum"),
+    "shipping": ("Shipping Charges", "sum"),
+    "quantity": ("Quantity", "sum"),
+    "lines": ("Total Sales", "size"),
+    "rating_sum": ("Rating", "sum"),
+    "rating_count": ("Rating", "count"),
+}
+
+# Dimension name -> column with prefix sums per value
+DIMENSIONS = {
+    "category": "Product Category",
+    "location": "Order Location",
+    "international": "International Shipping",
+}
+
+# KPI label -> window measure; the rating is derived from its sum and count
+KPIS = {
+    "Total Sales": "sales",
+    "Total Shipping Charges": "shipping",
+    "Total Quantity": "quantity",
+    "Order Lines": "lines",
+    "Average Rating": "rating",
+}
+
+# Comparison name -> shift of the reference window; None is the equally long window right before
+PERIODS = {
+    "previous": None,
+    "wow": pd.DateOffset(weeks=1),
+    "mom": pd.DateOffset(months=1),
+    "yoy": pd.DateOffset(years=1),
+}
+
+_DAY = pd.Timedelta(days=1)
+
+
+def _daily_sums(data: pd.DataFrame) -> Dict[Optional[str], pd.DataFrame]:
+    # Per-day sums overall (key None) and per dimension, with (measure, value) columns
+    day = data[DATA_COLUMN].dt.normalize().rename("day")
+    sums = {None: data.groupby(day).agg(**MEASURES)}
+    for name, column in DIMENSIONS.items():
+        table = data.groupby([day, column], observed=True).agg(**MEASURES).unstack(fill_value=0)
+        # Deltas carry their own category dictionaries; key the columns by plain labels.
+        # Built from the levels so an empty selection still gets a two-level index
+        table.columns = pd.MultiIndex.from_arrays(
+            [table.columns.get_level_values(0), table.columns.get_level_values(1).astype(str)], names=[None, None])
+        sums[name] = table
+    return sums
+
+
+def _accumulate(sums: Dict[Optional[str], pd.DataFrame], start: pd.Timestamp,
+                end: pd.Timestamp) -> Dict[Optional[str], pd.DataFrame]:
+    # Prefix sums over the dense calendar; row i holds the days before start + i
+    calendar = pd.date_range(start, end, freq="D")
+    cumulative = {}
+    for name, daily in sums.items():
+        values = daily.reindex(calendar).fillna(0).to_numpy(dtype=np.int64)
+        prefix = np.vstack([np.zeros((1, values.shape[1]), dtype=np.int64), values.cumsum(axis=0)])
+        cumulative[name] = pd.DataFrame(prefix, columns=daily.columns)
+    return cumulative
+
+
+@dataclass(frozen=True)
+class DailyRollup:
+    """Prefix sums of the window measures per order day for one dataset version."""
+    version: str
+    # First day of the calendar
+    start: pd.Timestamp
+    # None (overall) or dimension name -> prefix sums with one row more than days
+    cumulative: Dict[Optional[str], pd.DataFrame] = field(repr=False)
+
+    @property
+    def days(self) -> int:
+        return len(self.cumulative[None]) - 1
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """Last day of the calendar."""
+        return self.start + (self.days - 1) * _DAY
+
+    def _row(self, day: Day) -> int:
+        # Prefix row before ``day``, clipped to the calendar
+        offset = (pd.Timestamp(day).normalize() - self.start).days
+        return min(max(offset, 0), self.days)
+
+    def _bounds(self, start: Day, end: Day) -> Tuple[int, int]:
+        low = self._row(start)
+        return low, max(self._row(pd.Timestamp(end) + _DAY), low)
+
+    def window(self, start: Day, end: Day) -> pd.Series:
+        """Sums of every measure over the days ``start`` to ``end``, inclusive."""
+        frame = self.cumulative[None]
+        low, high = self._bounds(start, end)
+        return frame.iloc[high] - frame.iloc[low]
+
+    def breakdown(self, start: Day, end: Day, dimension: str) -> pd.DataFrame:
+        """Window sums per value of ``dimension``, one row per value."""
+        frame = self.cumulative[dimension]
+        low, high = self._bounds(start, end)
+        return (frame.iloc[high] - frame.iloc[low]).unstack(0).rename_axis(DIMENSIONS[dimension])
+
+    def daily(self, start: Day, end: Day, measure: str) -> pd.Series:
+        """Per-day values of ``measure`` between ``start`` and ``end``."""
+        low, high = self._bounds(start, end)
+        values = np.diff(self.cumulative[None][measure].to_numpy()[low:high + 1])
+        return pd.Series(values, index=pd.date_range(self.start + low * _DAY, periods=len(values), freq="D"),
+                         name=measure).rename_axis(DATA_COLUMN)
+
+    def daily_sums(self) -> Dict[Optional[str], pd.DataFrame]:
+        """Per-day sums recovered from the prefix sums, indexed by day."""
+        calendar = pd.date_range(self.start, periods=self.days, freq="D")
+        return {name: pd.DataFrame(np.diff(frame.to_numpy(), axis=0), index=calendar, columns=frame.columns)
+                for name, frame in self.cumulative.items()}
+
+
+def build_daily_rollup(data: pd.DataFrame, version: str = None) -> DailyRollup:
+    """Prefix sums of ``data`` per order day, overall and per dimension."""
+    version = version or data.attrs.get("version", "")
+    days = data[DATA_COLUMN].dropna()
+    if days.empty:
+        start = end = pd.Timestamp.today().normalize()
+    else:
+        start, end = days.min().normalize(), days.max().normalize()
+    return DailyRollup(version, start, _accumulate(_daily_sums(data), start, end))
+
+
+def update_daily_rollup(rollup: DailyRollup, delta: pd.DataFrame, version: str = None) -> DailyRollup:
+    """Fold appended rows into ``rollup``; the calendar grows to cover their days."""
+    version = version or delta.attrs.get("version", "")
+    days = delta[DATA_COLUMN].dropna()
+    if days.empty:
+        return replace(rollup, version=version)
+    delta_sums = _daily_sums(delta)
+    merged = {name: daily.add(delta_sums[name], fill_value=0) for name, daily in rollup.daily_sums().items()}
+    start = min(rollup.start, days.min().normalize())
+    end = max(rollup.end, days.max().normalize())
+    return DailyRollup(version, start, _accumulate(merged, start, end))
+
+
+def reference_window(start: Day, end: Day, period: str = "previous") -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """The window ``start``..``end`` is compared against for ``period`` (see ``PERIODS``)."""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    shift = PERIODS[period]
+    if shift is None:
+        length = end - start + _DAY
+        return start - length, start - _DAY
+    return start - shift, end - shift
+
+
+def window_kpis(sums: pd.Series) -> Dict[str, float]:
+    """KPI label -> value of one window's measure sums."""
+    rating = sums["rating_sum"] / sums["rating_count"] if sums["rating_count"] else float("nan")
+    values = {**sums.to_dict(), "rating": rating}
+    return {label: values[measure] for label, measure in KPIS.items()}
+
+
+def compare(rollup: DailyRollup, start: Day, end: Day, period: str = "previous") -> pd.DataFrame:
+    """KPIs of a window next to its reference window, with the change in percent."""
+    reference = reference_window(start, end, period)
+    current = pd.Series(window_kpis(rollup.window(start, end)), name="Current")
+    previous = pd.Series(window_kpis(rollup.window(*reference)), name="Previous")
+    change = ((current - previous) / previous.where(previous != 0) * 100).rename("Change %")
+    return pd.concat([current, previous, change], axis=1)
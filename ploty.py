@@ -1,22 +1,19 @@
 import streamlit as st  
-import pandas as pd
-import plotly.express as px
 from typing import List, Tuple
+import pandas as pd
+from db.ingest import DATA_COLUMN, SOURCE
+from db.queries import PAGE_COLUMNS
+from merchan_sales import Dataset, FilterSpec, date_bounds, geo, profile, raw_page, totals
+from merchan_sales.figures import cached_figure
 
-# Define constants for data column and data URL
-DATA_COLUMN = "order date"
-DATA_URL = "data/merchandise-sales.csv"
+# Copy-on-write lets every session share the cached frames as views
+pd.set_option("mode.copy_on_write", True)
 
 @st.cache_resource
-def load_data(nrows):
-    data = pd.read_csv(DATA_URL, nrows=nrows)
-    lower = lambda x: x.lower()
-    data.rename(lower, axis='columns', inplace=True)
-    data[DATA_COLUMN] = pd.to_datetime(data[DATA_COLUMN])
-    data.rename(columns={'order location': 'location', 'product id': 'product', 'product category':'category', 'buyer gender':'gender','buyer age':'age'}, inplace=True)
-    data['latitude'] = data['latitude'].str.replace(',', '.').astype(float)
-    data['longitude'] = data['longitude'].str.replace(',', '.').astype(float)
-    return data
+def load_dataset():
+    # One dataset handle shared by all sessions
+    # The full dataset: truncating rows would silently skew every number
+    return Dataset(SOURCE)
 
 def set_page_config():
     st.set_page_config(
@@ -27,12 +24,14 @@ def set_page_config():
     )
     st.markdown("<style> footer {visibility: hidden;} </style>", unsafe_allow_html=True)
 
-def calculate_kpis(df):
-    total_sales = df["total sales"].sum()
-    total_international_sales = df[df["international shipping"] == "Yes"]["total sales"].sum()
-    total_national_sales = df[df["international shipping"] == "No"]["total sales"].sum()
-    total_international_shipping = df[df["international shipping"] == "Yes"]["international shipping"].count()
-    total_national_shipping = df[df["international shipping"] == "No"]["international shipping"].count()
+def calculate_kpis(ds):
+    # Every total in one cached pass per dataset version
+    summary = totals(ds)
+    total_sales = summary.sales
+    total_international_sales = summary.international_sales
+    total_national_sales = summary.national_sales
+    total_international_shipping = summary.international_orders
+    total_national_shipping = summary.national_orders
     kpis = [
         (f"${total_sales:,.2f}", "5%"),
         (f"${total_international_sales:,.2f}", "-4%"),
@@ -54,56 +53,84 @@ def display_kpi_metrics(kpis: List[Tuple[str, str]], kpi_names: List[str]):
     for i, (col, (kpi_name, (kpi_value, delta))) in enumerate(zip(st.columns(5), zip(kpi_names, kpis))):
         col.metric(label=kpi_name, value=kpi_value, delta=delta)
 
-def display_sidebar_filters(df):
+def display_sidebar_filters(ds):
     st.sidebar.title("Filters")
     info_sidebar = st.sidebar.empty()
     st.sidebar.subheader("Table")
     table = st.sidebar.empty()
-    year_filter = st.sidebar.slider("Year", 2023, 2024, 2024)
-    age_filter = st.sidebar.slider("Age", 18, 35)
-    labelsprod = df['product'].unique().tolist()
-    labelscat = df["category"].unique().tolist()
-    labelsgend = df["gender"].unique().tolist()
-    labels = df.location.unique().tolist()
+    index = ds.index
+    # Any order window within the data instead of a fixed list of years
+    first_day, last_day = date_bounds(ds)
+    date_filter = st.sidebar.date_input("Order dates", (first_day.date(), last_day.date()),
+                                        min_value=first_day.date(), max_value=last_day.date())
+    age_min, age_max = index.age_range()
+    age_filter = st.sidebar.slider("Age", age_min, age_max, (age_min, age_max))
+    labelsprod = index.labels("Product ID")
+    labelscat = index.labels("Product Category")
+    labelsgend = index.labels("Buyer Gender")
+    labels = index.labels("Order Location")
     label_prod = st.sidebar.multiselect("Product", labelsprod, default=labelsprod)
     label_cat = st.sidebar.multiselect("Category", labelscat, default=labelscat)
     label_gen = st.sidebar.multiselect("Gender", labelsgend, default=labelsgend)
     label_filter = st.sidebar.multiselect("Location", labels, default=labels)
-    filtered_df = df[(df[DATA_COLUMN].dt.year == year_filter) & 
-                     (df["product"].isin(label_prod)) & 
-                     (df["location"].isin(label_filter))& 
-                     (df["category"].isin(label_cat))& 
-                     (df["gender"].isin(label_gen))]
-    info_sidebar.info("{} Data loaded.".format(filtered_df.shape[0], year_filter))
-    table.dataframe(filtered_df)
-    return filtered_df
+    # Resolve the selection from the precomputed bitmaps; the rows themselves are not copied
+    spec = FilterSpec.make(products=label_prod, locations=label_filter, categories=label_cat, genders=label_gen,
+                           ages=age_filter, dates=(date_filter[0], date_filter[-1]) if date_filter else None)
+    rows = ds.rows(spec)
+    info_sidebar.info("{} Data loaded.".format(len(rows)))
+    # Send one page of the selection, and only while the table is shown
+    if table.checkbox("Show table"):
+        page_number = st.sidebar.number_input("Table page", min_value=1, value=1)
+        st.sidebar.dataframe(raw_page(ds, spec, page_number=page_number - 1)[0])
+    return spec, rows
 
-def display_main_content(filtered_df):
+def display_main_content(ds, spec, rows):
     st.title("Merchandise Sales")
     st.markdown("### Data Sample")
-    st.write(filtered_df.head())
+    st.write(raw_page(ds, spec, page_size=5)[0])
     st.markdown("### Profiling")
-    st.write(filtered_df.describe())
+    # Cached per dataset version and filter signature
+    st.write(profile(ds, spec))
     st.markdown("### All data")
-    st.markdown(f'''
-                Merchant Sales Data for ***{",".join(filtered_df["location"].unique())}*** 
-                in the year of ***{filtered_df[DATA_COLUMN].dt.year.unique()[0]}***.
-                ''')
+    # One point per location with summed sales, shared by the summary and the map
+    points = geo(ds, spec)
+    if len(rows):
+        dates = ds.data[DATA_COLUMN].to_numpy()[rows]
+        st.markdown(f'''
+                    Merchant Sales Data for ***{",".join(points["Order Location"].astype(str))}*** 
+                    from ***{pd.Timestamp(dates.min()):%d/%m/%Y}*** to ***{pd.Timestamp(dates.max()):%d/%m/%Y}***.
+                    ''')
+    else:
+        st.markdown("No orders match the selected filters.")
     if st.checkbox("Show Raw Data"):
-        st.write(filtered_df)
+        # Sorted and paged by DuckDB, one page per rerun
+        r1, r2, r3 = st.columns(3)
+        sort = r1.selectbox("Sort by", [None, *PAGE_COLUMNS])
+        descending = r2.checkbox("Descending")
+        page_number = r3.number_input("Page", min_value=1, value=1)
+        page, total = raw_page(ds, spec, sort=sort, descending=descending, page_number=page_number - 1)
+        st.caption(f"{total:,} rows")
+        st.dataframe(page)
     st.subheader("Sales Map")  
-    fig = px.scatter_geo(filtered_df, lat="latitude", lon="longitude", color="total sales", 
-                         hover_name="location", size="total sales", 
-                         projection="natural earth", title="Qty of Sales by Location")
+    def map_figure():
+        # Plotly is only imported when the map is built, not on every page load
+        import plotly.express as px
+        return px.scatter_geo(points, lat="Latitude", lon="Longitude", color="Total Sales", 
+                              hover_name="Order Location", size="Total Sales", hover_data=["Orders"],
+                              projection="natural earth", title="Qty of Sales by Location")
+    # Built once per selection and shared across reruns and sessions
+    fig = cached_figure(f"{ds.version}/{spec.signature()}", "ploty.map", map_figure)
     st.plotly_chart(fig)
 
 def main():
     set_page_config()
-    df = load_data(5000)
-    kpis, kpi_names = calculate_kpis(df)
+    # Advances incrementally when new deltas were appended
+    ds = load_dataset()
+    ds.refresh()
+    kpis, kpi_names = calculate_kpis(ds)
     display_kpi_metrics(kpis, kpi_names)
-    filtered_df = display_sidebar_filters(df)
-    display_main_content(filtered_df)
+    spec, rows = display_sidebar_filters(ds)
+    display_main_content(ds, spec, rows)
 
 if __name__ == "__main__":
     main()
@@ -1,42 +1,31 @@
-import pydeck
 import streamlit as st  
 import pandas as pd
-import pydeck as pdk
-
-# Define constants for data column and data URL
-DATA_COLUMN = "order date"
-DATA_URL = "data/merchandise-sales.csv"
-
-# Function to load data with caching to improve performance
-#@st.cache
-def load_data(nrows):
-    # Read the CSV file
-    data = pd.read_csv(DATA_URL, nrows=nrows)
-    # Convert column names to lowercase
-    lower = lambda x: x.lower()
-    data.rename(lower, axis='columns', inplace=True)
-    # Convert the order date column to datetime
-    data[DATA_COLUMN] = pd.to_datetime(data[DATA_COLUMN])
-    # Rename 'order location' column to 'location'
-    data.rename(columns={'order location': 'location', 'product id': 'product', 'product category':'category', 'buyer gender':'gender','buyer age':'age'}, inplace=True)
-    # Convert latitude and longitude columns to float
-    # Replace commas with dots in latitude and longitude columns
-    data['latitude'] = data['latitude'].str.replace(',', '.').astype(float)
-    data['longitude'] = data['longitude'].str.replace(',', '.').astype(float)
-    return data
-
-# Load data with a limit of 1000 rows
-df = load_data(5000)
+from db.ingest import SOURCE
+from merchan_sales import Dataset, FilterSpec, date_bounds, geo, profile, raw_page
+
+# Copy-on-write lets every session share the cached frames as views
+pd.set_option("mode.copy_on_write", True)
+
+# One dataset handle shared by all sessions
+@st.cache_resource
+def load_dataset():
+    return Dataset(SOURCE)
+
+# Load the full data; advances incrementally when new deltas were appended
+ds = load_dataset()
+ds.refresh()
+# Filter bitmaps of the current version, built once per dataset version
+index = ds.index
 # Get unique locations for the filter
-labels = df.location.unique().tolist()
+labels = index.labels("Order Location")
 
 # Get unique products for the filter
-labelsprod = df['product'].unique().tolist()
+labelsprod = index.labels("Product ID")
 
 # Get unique products for the filter
-labelsgend = df["gender"].unique().tolist()
+labelsgend = index.labels("Buyer Gender")
 
-labelscat = df["category"].unique().tolist()
+labelscat = index.labels("Product Category")
 
 
 
@@ -50,12 +39,17 @@ info_sidebar = st.sidebar.empty()
 st.sidebar.subheader("Table")
 table = st.sidebar.empty()
 
-# Year filter
-st.sidebar.title("Year")
-year_filter = st.sidebar.slider("Year", 2023, 2024, 2024)
+# Order date filter, bounded by the dates in the data
+st.sidebar.title("Order Dates")
+first_day, last_day = date_bounds(ds)
+date_filter = st.sidebar.date_input("Order dates", (first_day.date(), last_day.date()),
+                                    min_value=first_day.date(), max_value=last_day.date())
+# Whole range while the picker is cleared, single day while only the start is picked
+start_day, end_day = (date_filter[0], date_filter[-1]) if date_filter else (first_day, last_day)
 
 st.sidebar.title("Buyer Age")
-age_filter = st.sidebar.slider("Age", 18, 35)
+age_min, age_max = index.age_range()
+age_filter = st.sidebar.slider("Age", age_min, age_max, (age_min, age_max))
 
 # Display quantity of total sales
 #st.subheader(f"Qty Sales: ${qty_total_sales:}")
@@ -76,17 +70,13 @@ label_cat = st.sidebar.multiselect("Category", labelscat, default=labelscat)
 
 label_gen = st.sidebar.multiselect("Gender", labelsgend, default=labelsgend)
 
-# Filter the dataframe based on the selected year, products, and locations
-filtered_df = df[(df[DATA_COLUMN].dt.year == year_filter) & 
-                 (df["product"].isin(label_prod)) & 
-                 (df["location"].isin(label_filter))& 
-                 (df["category"].isin(label_cat))& 
-                 (df["gender"].isin(label_gen))]
+# Filter the dataframe based on the selected dates, age, products, and locations
+# The selection is resolved from the precomputed bitmaps; no rows are copied here
+spec = FilterSpec.make(products=label_prod, locations=label_filter, categories=label_cat, genders=label_gen,
+                       ages=age_filter, dates=(start_day, end_day))
 
 # Display the number of rows loaded after filtering
-info_sidebar.info("{} Data loaded.".format(filtered_df.shape[0], year_filter))
-# Display the filtered dataframe in the sidebar
-table.dataframe(filtered_df)
+info_sidebar.info("{} Data loaded.".format(len(ds.rows(spec))))
 
 
 
@@ -97,24 +87,34 @@ st.sidebar.markdown("##Key Performance Indicators")
 # Main section of the app
 st.title("Merchandise Sales")
 st.markdown("### Data Sample")
-# Display the first few rows of the filtered dataframe
-st.write(filtered_df.head())
+# Display the first few rows of the selection
+st.write(raw_page(ds, spec, page_size=5)[0])
 st.markdown("### Profiling")
-st.write(filtered_df.describe())
+# Cached per dataset version and filter signature
+st.write(profile(ds, spec))
 
 
 
-# Option to show raw data of the filtered dataframe
+# Option to show raw data of the selection
 st.markdown("### All data")
 st.markdown(f'''
             Merchant Sales Data for ***{",".join(label_filter)}*** 
-            in the year of ***{year_filter}***.
+            from ***{start_day:%d/%m/%Y}*** to ***{end_day:%d/%m/%Y}***.
             ''')
 if table.checkbox("Show Raw Data"):
-    st.write(filtered_df)
+    # Fetch one page of the selected rows instead of the whole frame
+    page_number = st.number_input("Page", min_value=1, value=1)
+    page, total = raw_page(ds, spec, page_number=page_number - 1)
+    st.caption(f"{total:,} rows")
+    st.write(page)
 
 #map
 st.subheader("Sales Map")  
+# One weighted point per location instead of one per order
+points = geo(ds, spec)
+
+# pydeck is only imported once the map is drawn
+import pydeck as pdk
 
 st.pydeck_chart(pdk.Deck(
     map_style='mapbox://styles/mapbox/light-v9',
@@ -127,8 +127,12 @@ st.pydeck_chart(pdk.Deck(
     layers=[
         pdk.Layer(
             'HexagonLayer',
-            data=filtered_df,
-            get_position='[longitude, latitude]',
+            data=points,
+            get_position='[Longitude, Latitude]',
+            get_elevation_weight='Orders',
+            elevation_aggregation='SUM',
+            get_color_weight='Orders',
+            color_aggregation='SUM',
             radius=1000,
             get_fill_color=[255, 140, 0, 140],
             get_line_color=[0, 0, 0],
@@ -144,4 +148,4 @@ st.pydeck_chart(pdk.Deck(
 
 
 st.subheader("Sales Map 2")  
-st.map(filtered_df)
+st.map(points, latitude="Latitude", longitude="Longitude")
@@ -1,90 +1,122 @@
+import os
 import streamlit as st
 import pandas as pd
-import numpy as np
+from db.ingest import DATA_COLUMN, SOURCE, is_store
+from merchan_sales import (Dataset, FilterSpec, daily_values, date_bounds, geo, month_histogram, profile, raw_page,
+                           rollup, streamed_totals, time_series, totals)
+from merchan_sales.streaming import aggregate, memory_budget, streaming_enabled
 
-# Define constants for data column and URL
-DATA_COLUMN = "order date"
-DATA_URL = "data/merchandise-sales.csv"
+# Copy-on-write lets every session share the cached frames as views
+pd.set_option("mode.copy_on_write", True)
 
 # Function to load data with caching
-#@st.cache
-def load_data(nrows):
-    # Read CSV file
-    data = pd.read_csv('data/merchandise-sales.csv', nrows=nrows)
-    # Convert column names to lowercase
-    lower = lambda x: x.lower()
-    data.rename(lower, axis='columns', inplace=True)
-    # Convert order date column to datetime
-    data[DATA_COLUMN] = pd.to_datetime(data["order date"])
-    return data
+@st.cache_resource
+def load_dataset():
+    # One dataset handle shared by all sessions
+    return Dataset(SOURCE)
+
+# Function to stream the export once per file change
+@st.cache_resource
+def load_aggregate(mtime, size):
+    # Chunked pass under MERCHAN_STREAM_MB; no rows stay resident
+    return aggregate(SOURCE)
+
+# Bounded-memory mode (MERCHAN_STREAMING=1): totals from one streamed pass over the CSV export
+if streaming_enabled() and not is_store(SOURCE):
+    stat = os.stat(SOURCE)
+    streamed = load_aggregate(stat.st_mtime_ns, stat.st_size)
+    summary = streamed_totals(streamed)
+    st.title(f"Data streamed: {streamed.rows} rows")
+    st.caption(f"Read from {SOURCE} in chunks within {memory_budget() >> 20} MiB")
+    # Display the column summary of the streamed pass
+    st.subheader("Profiling")
+    st.write(streamed.summary())
+    st.subheader("KPIs: Key Performance Indicators")
+    st.subheader(f"Total Sales: ${summary.sales:}")
+    st.subheader("Total Sales Over the Months")
+    st.line_chart(streamed.monthly("sales"))
+    st.subheader(f"Shipping Charges: ${summary.shipping:}")
+    st.subheader(f"Qty Sales: ${summary.orders:}")
+    st.subheader(f"Total International Sales: ${summary.international_sales:}")
+    st.subheader(f"Qty International Sales: {summary.international_orders}")
+    st.subheader(f"Total National Sales: ${summary.national_sales:}")
+    st.subheader(f"Qty National Sales: {summary.national_orders}")
+    st.subheader(f"Qty Products Sold: {summary.quantity:}")
+    st.subheader(f"Average Rating: {summary.rating_mean:.2f}")
+    st.subheader(f"Qty Rating: {summary.rating_count:}")
+    st.subheader("Most and Least Popular Products")
+    st.bar_chart(streamed.totals["product"]["Total Sales"].sort_values(ascending=True))
+    # Row-level sections (raw data, maps) need the loaded dataset
+    st.stop()
 
 # Display subheader
 st.subheader("Data Sample")
 # Display title
 data_load = st.title("Weather Station Summary")
 # Display loading text
-data_load.text(f"Loading data from {DATA_URL}")
-# Load data
-data = load_data(10000)
+data_load.text(f"Loading data from {SOURCE}")
+# Load data; advances incrementally when new deltas were appended
+ds = load_dataset()
+ds.refresh()
+data = ds.data
 # Clear loading text
 data_load.empty()
 # Display data loaded message
 data_load.title(f"Data loaded: {data.shape[0]} rows")
 # Display subheader for profiling
 st.subheader("Profiling")
-# Display data description
-st.write(data.describe())
+# Display the column profile, computed once per dataset version
+st.write(profile(ds))
 # Display first few rows of data
 data_load.write(data.head())
 
+# Calculate every total in one cached pass per dataset version
+summary = totals(ds)
+international = FilterSpec.make(shipping=["Yes"])
+
 # Display subheader for KPIs
 st.subheader("KPIs: Key Performance Indicators")
 
-# Calculate total sales
-total_sales = data["total sales"].sum()
 # Display total sales
-st.subheader(f"Total Sales: ${total_sales:}")
+st.subheader(f"Total Sales: ${summary.sales:}")
 
 # Display subheader for total sales over the months
 st.subheader("Total Sales Over the Months")
 # Calculate total sales per month
-total_sales_per_month = data.groupby(data["order date"].dt.to_period("M"))["total sales"].sum()
-total_sales_per_month.index = total_sales_per_month.index.to_timestamp()
+total_sales_per_month = time_series(ds, "month").set_index(DATA_COLUMN)["Total Sales"]
 # Display line chart for total sales per month
 st.line_chart(total_sales_per_month)
 
-# Calculate shipping charges
-shipping_charges = data["shipping charges"].sum()
 # Display shipping charges
-st.subheader(f"Shipping Charges: ${shipping_charges:}")
-
-# Display subheader for shipping charges over the year 2024
-st.subheader("Shipping Charges Over the Year 2024")
-# Calculate shipping charges for 2024
-shipping_charges_2024 = data[data["order date"].dt.year == 2024].groupby(data["order date"].dt.to_period("M"))["shipping charges"].sum()
-shipping_charges_2024.index = shipping_charges_2024.index.to_timestamp()
-# Display line chart for shipping charges in 2024
-st.line_chart(shipping_charges_2024)
-
-# Calculate quantity of total sales
-qty_total_sales = data["total sales"].count()
+st.subheader(f"Shipping Charges: ${summary.shipping:}")
+
+# Pick the shipping window; defaults to the last year of orders
+first_day, last_day = date_bounds(ds)
+default_start = max(first_day, last_day - pd.Timedelta(days=364))
+shipping_range = st.date_input("Shipping charges between", (default_start.date(), last_day.date()),
+                               min_value=first_day.date(), max_value=last_day.date())
+shipping_start, shipping_end = (shipping_range[0], shipping_range[-1]) if shipping_range else (first_day, last_day)
+# Display subheader for shipping charges over the selected window
+st.subheader(f"Shipping Charges from {shipping_start:%d/%m/%Y} to {shipping_end:%d/%m/%Y}")
+# Sum the daily shipping charges per month, read from the prefix sums
+shipping_charges = daily_values(ds, shipping_start, shipping_end, "shipping").resample("MS").sum()
+# Display line chart for shipping charges in the window
+st.line_chart(shipping_charges)
+
 # Display quantity of total sales
-st.subheader(f"Qty Sales: ${qty_total_sales:}")
+st.subheader(f"Qty Sales: ${summary.orders:}")
 
-# Calculate total international sales
-total_international_sales = data[data["international shipping"] == "Yes"]["total sales"].sum()
 # Display total international sales
-st.subheader(f"Total International Sales: ${total_international_sales:}")
+st.subheader(f"Total International Sales: ${summary.international_sales:}")
 
 # Display subheader for total international sales over the months
 st.subheader("Total International Sales Over the Months")
 # Calculate total international sales per month
-total_international_sales_per_month = data[data["international shipping"] == "Yes"].groupby(data["order date"].dt.to_period("Y"))["total sales"].sum()
-total_international_sales_per_month.index = total_international_sales_per_month.index.to_timestamp()
+total_international_sales_per_month = time_series(ds, "year", international).set_index(DATA_COLUMN)["Total Sales"]
 
 # Display data editor for total international sales per month
 st.data_editor(
-    total_international_sales_per_month.reset_index().rename(columns={"order date": "Month", "total sales": "Sales"}),
+    total_international_sales_per_month.reset_index().rename(columns={DATA_COLUMN: "Month", "Total Sales": "Sales"}),
     column_config={
         "Sales": st.column_config.LineChartColumn(
             "Total International Sales (Monthly)",
@@ -96,54 +128,46 @@ st.data_editor(
     hide_index=True,
 )
 
-# Calculate quantity of international sales
-total_national_shipping = data[data["international shipping"] == "Yes"]["international shipping"].count()
 # Display quantity of international sales
-st.subheader(f"Qty International Sales: {total_national_shipping}")
+st.subheader(f"Qty International Sales: {summary.international_orders}")
 
-# Calculate total national sales
-total_national_sales = data[data["international shipping"] == "No"]["total sales"].sum()
 # Display total national sales
-st.subheader(f"Total National Sales: ${total_national_sales:}")
+st.subheader(f"Total National Sales: ${summary.national_sales:}")
 
-# Calculate quantity of national sales
-total_national_shipping = data[data["international shipping"] == "No"]["international shipping"].count()
 # Display quantity of national sales
-st.subheader(f"Qty National Sales: {total_national_shipping}")
+st.subheader(f"Qty National Sales: {summary.national_orders}")
 
-# Calculate quantity of products sold
-qty_sales = data["quantity"].sum()
 # Display quantity of products sold
-st.subheader(f"Qty Products Sold: {qty_sales:}")
+st.subheader(f"Qty Products Sold: {summary.quantity:}")
 
-# Calculate average rating
-average_rating = data["rating"].mean()
 # Display average rating
-st.subheader(f"Average Rating: {average_rating:.2f}")
+st.subheader(f"Average Rating: {summary.rating_mean:.2f}")
 
-# Calculate quantity of ratings
-qty_average_rating = data["rating"].count()
 # Display quantity of ratings
-st.subheader(f"Qty Rating: {qty_average_rating:}")
+st.subheader(f"Qty Rating: {summary.rating_count:}")
 
 # Checkbox to show raw data
 if st.checkbox("Show raw data"):
     st.subheader("Raw data")
-    st.write(data)
+    # Fetch only the requested page, without the review text
+    page_number = st.number_input("Page", min_value=1, value=1)
+    raw, total = raw_page(ds, page_number=page_number - 1)
+    st.caption(f"{total:,} rows")
+    st.dataframe(raw)
 
 # Display subheader for data visualization
 st.subheader("Data Visualization")
 # Display histogram
 st.write("Histogram")
 # Calculate histogram values for order date month
-hist_values = np.histogram(data["order date"].dt.month, bins=12, range=(1, 13))[0]
+hist_values = month_histogram(ds)
 # Display bar chart for histogram values
 st.bar_chart(hist_values)
 
 # Display subheader for most and least popular products
 st.subheader("Most and Least Popular Products")
 # Group by product id and sum the total sales
-product_sales = data.groupby("product id")["total sales"].sum()
+product_sales = rollup(ds, "product").set_index("Product ID")["Total Sales"]
 # Sort the product sales in descending order
 sorted_product_sales = product_sales.sort_values(ascending=True)
 # Display the horizontal bar chart
@@ -151,18 +175,15 @@ st.bar_chart(sorted_product_sales)
 
 # Slider to filter data by month
 month_filter = st.slider("Month", 1, 12, 7)
-# Filter data by selected month
-filtered_data = data[data[DATA_COLUMN].dt.month == month_filter]
+# Aggregate the map points of the selected month
+points = geo(ds, FilterSpec.make(months=[month_filter]))
 
 # Display subheader for map
 st.subheader("Map for month {}:".format(month_filter))
 # Check if latitude and longitude columns exist
-if 'latitude' in filtered_data.columns and 'longitude' in filtered_data.columns:
-    # Convert latitude and longitude columns to float
-    filtered_data['latitude'] = filtered_data['latitude'].str.replace(',', '').astype(float)
-    filtered_data['longitude'] = filtered_data['longitude'].str.replace(',', '').astype(float)
-    # Display map
-    st.map(filtered_data)
+if 'Latitude' in points.columns and 'Longitude' in points.columns:
+    # Display map with one point per location instead of one per order
+    st.map(points, latitude="Latitude", longitude="Longitude")
 else:
     # Display message if no latitude and longitude data available
     st.write("No latitude and longitude data available for mapping.")
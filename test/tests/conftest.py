@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+# The bundled sample export
+SAMPLE = os.path.join(REPO, "data", "merchandise-sales.csv")
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+@pytest.fixture
+def dataset(cache_dir):
+    """A Dataset over the sample export with a private cache, DuckDB and derived cache."""
+    from db import pool
+    from merchan_sales.cache import get_cache
+    from merchan_sales.dataset import Dataset
+
+    pool.configure()
+    get_cache().invalidate()
+    ds = Dataset(SAMPLE, cache_dir)
+    ds.refresh()
+    yield ds
+    get_cache().invalidate()
+    pool.shutdown()
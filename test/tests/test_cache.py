@@ -0,0 +1,56 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from merchan_sales.cache import DerivedCache, share, size_of
+from merchan_sales.sketches import HyperLogLog, TDigest
+
+
+def test_size_of_measures_cubes_and_rollups(dataset):
+    for value in (dataset.cube, dataset.daily):
+        assert size_of(value) > len(pickle.dumps(value)) / 2
+
+
+def test_size_of_sketches_and_containers():
+    digest = TDigest.of(np.arange(10_000))
+    assert size_of(HyperLogLog()) >= 4096
+    assert size_of({"a": digest, "b": [digest]}) >= digest.nbytes
+    # The same object reached twice is counted once
+    assert size_of([digest, digest]) < 2 * digest.nbytes
+
+
+def test_cache_stays_within_budget(dataset):
+    budget = 3 * size_of(dataset.cube)
+    cache = DerivedCache(max_bytes=budget)
+    for i in range(10):
+        cache.get_or_compute(f"v{i}", "kpi_cube", None, lambda: dataset.cube)
+    stats = cache.stats()
+    assert stats["bytes"] <= budget
+    assert 0 < stats["entries"] < 10
+
+
+def test_cache_serves_hits_and_invalidates_versions():
+    cache = DerivedCache()
+    frame = pd.DataFrame({"a": range(100)})
+    calls = []
+    compute = lambda: calls.append(1) or frame
+    cache.get_or_compute("v1", "t", {"x": 1}, compute)
+    cache.get_or_compute("v1", "t", {"x": 1}, compute)
+    cache.get_or_compute("v1/abc", "t", {"x": 1}, compute)
+    assert len(calls) == 2
+    cache.invalidate("v1")
+    assert cache.stats()["entries"] == 0
+
+
+def test_share_copies_unless_copy_on_write():
+    frame = pd.DataFrame({"a": range(10)})
+    with pd.option_context("mode.copy_on_write", False):
+        shared = share(frame)
+        shared.loc[0, "a"] = -1
+        assert frame.loc[0, "a"] == 0
+    with pd.option_context("mode.copy_on_write", True):
+        shared = share(frame)
+        assert np.shares_memory(shared["a"].to_numpy(), frame["a"].to_numpy())
+        shared.loc[0, "a"] = -1
+        assert frame.loc[0, "a"] == 0
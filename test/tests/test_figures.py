@@ -0,0 +1,41 @@
+import json
+
+import plotly.graph_objects as go
+
+from merchan_sales.figures import FigureCache
+
+
+def _build(calls):
+    def build():
+        calls.append(1)
+        return go.Figure(go.Bar(x=["a", "b"], y=[1, 2]), layout={"title": {"text": "Sales"}})
+    return build
+
+
+def test_cache_builds_once_and_hands_out_copies():
+    cache = FigureCache()
+    calls = []
+    first = cache.get_or_build("v1", "bar", _build(calls))
+    first.update_layout(title_text="Changed")
+    second = cache.get_or_build("v1", "bar", _build(calls))
+    assert len(calls) == 1
+    assert first is not second
+    assert second.layout.title.text == "Sales"
+    assert json.loads(second.to_json()) == json.loads(_build([])().to_json())
+    cache.get_or_build("v1", "bar", _build(calls), signature="filtered")
+    cache.get_or_build("v1", "bar", _build(calls), theme="dark")
+    assert len(calls) == 3
+
+
+def test_specs_persist_across_caches(tmp_path):
+    directory = str(tmp_path / "figures")
+    calls = []
+    spec = FigureCache(directory=directory).get_spec("v1/abc", "bar", _build(calls))
+    assert FigureCache(directory=directory).get_spec("v1/abc", "bar", _build(calls)) == spec
+    assert len(calls) == 1
+    assert not [p for p in (tmp_path / "figures").rglob("*") if p.suffix == ".tmp"]
+
+    cache = FigureCache(directory=directory)
+    cache.invalidate("v1")
+    cache.get_spec("v1/abc", "bar", _build(calls))
+    assert len(calls) == 2
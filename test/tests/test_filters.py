@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from merchan_sales.dataset import FilterSpec
+from merchan_sales.filters import FilterIndex
+
+COLUMNS = ["Product Category", "Order Location", "Buyer Gender"]
+
+
+def _index(data):
+    return FilterIndex(data, COLUMNS, "Order Date", "Buyer Age")
+
+
+def test_select_matches_pandas_masks(dataset):
+    data = dataset.data
+    index = _index(data)
+    categories = index.labels("Product Category")[:2]
+    locations = index.labels("Order Location")[::3]
+    cases = [
+        ({"Product Category": categories}, {}),
+        ({"Product Category": categories, "Order Location": locations}, {"age": (20, 27)}),
+        ({"Buyer Gender": index.labels("Buyer Gender")[:1]}, {"dates": ("2024-02-10", "2024-05-31")}),
+        ({}, {"year": 2024, "age": (30, 30)}),
+    ]
+    for filters, ranges in cases:
+        mask = np.ones(len(data), dtype=bool)
+        for column, values in filters.items():
+            mask &= data[column].isin(values).to_numpy()
+        if "age" in ranges:
+            mask &= data["Buyer Age"].between(*ranges["age"]).to_numpy()
+        if "dates" in ranges:
+            mask &= data["Order Date"].between(*map(pd.Timestamp, ranges["dates"])).to_numpy()
+        if "year" in ranges:
+            mask &= (data["Order Date"].dt.year == ranges["year"]).to_numpy()
+        np.testing.assert_array_equal(index.select(filters, **ranges), np.flatnonzero(mask))
+
+
+def test_select_edges(dataset):
+    index = _index(dataset.data)
+    everything = np.arange(len(dataset.data))
+    np.testing.assert_array_equal(index.select({}), everything)
+    np.testing.assert_array_equal(index.select({"Order Location": index.labels("Order Location")}), everything)
+    assert len(index.select({"Order Location": []})) == 0
+    assert len(index.select({"Order Location": ["Nowhere"]})) == 0
+    low, high = index.age_range()
+    np.testing.assert_array_equal(index.select({}, age=(low, high)), everything)
+
+
+def test_dataset_frame_is_copied_once_per_selection(dataset):
+    spec = FilterSpec.make(locations=dataset.index.labels("Order Location")[:2])
+    with pd.option_context("mode.copy_on_write", True):
+        first = dataset.frame(spec)
+        second = dataset.frame(spec)
+    np.testing.assert_array_equal(first.index, dataset.rows(spec))
+    assert np.shares_memory(first["Total Sales"].to_numpy(), second["Total Sales"].to_numpy())
+    assert first.attrs["version"] == second.attrs["version"] == f"{dataset.version}/{spec.signature()}"
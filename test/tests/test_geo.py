@@ -0,0 +1,13 @@
+import json
+
+import numpy as np
+
+from merchan_sales.geo import geo_points
+
+
+def test_map_points_are_json_serializable(dataset):
+    for zoom in (None, 0, 4):
+        points = geo_points(dataset.data, zoom=zoom)
+        assert (points[["Latitude", "Longitude"]].dtypes == np.float64).all()
+        json.dumps(points[["Latitude", "Longitude"]].to_dict(orient="records"))
+        assert points["Orders"].sum() == len(dataset.data)
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from db.ingest import append_delta, dataset_version, load_sales, part_paths
+from merchan_sales.memory import memory_report
+
+from .conftest import SAMPLE
+
+
+def _delta_csv(tmp_path):
+    raw = pd.read_csv(SAMPLE, dtype=str)
+    new = raw.iloc[5:8].assign(**{"Order ID": lambda d: (d["Order ID"].astype(int) + 10 ** 6).astype(str)})
+    # Five rows already stored, three new ones and a repeat of a new one
+    delta = pd.concat([raw.iloc[:5], new, new.iloc[:1]])
+    path = tmp_path / "delta.csv"
+    delta.to_csv(path, index=False)
+    return str(path), new
+
+
+def test_append_dedupes_against_store_and_itself(cache_dir, tmp_path):
+    base = load_sales(SAMPLE, cache_dir)
+    delta_path, new = _delta_csv(tmp_path)
+
+    rows, version = append_delta(delta_path, SAMPLE, cache_dir)
+    assert sorted(rows["Order ID"]) == sorted(new["Order ID"].astype(int))
+    assert version == dataset_version(SAMPLE, cache_dir) != base.attrs["version"]
+    assert len(part_paths(SAMPLE, cache_dir)) == 2
+    data = load_sales(SAMPLE, cache_dir)
+    assert len(data) == len(base) + 3
+    assert not data.duplicated(["Order ID", "Product ID"]).any()
+
+    # Appending the same export again adds nothing and keeps the version
+    rows, again = append_delta(delta_path, SAMPLE, cache_dir)
+    assert rows.empty and again == version
+    assert len(part_paths(SAMPLE, cache_dir)) == 2
+
+
+def test_dataset_folds_appended_rows_in(dataset, tmp_path):
+    from merchan_sales.kpis import build_kpi_cube
+    from merchan_sales.rollups import build_rollups
+
+    delta_path, _ = _delta_csv(tmp_path)
+    append_delta(delta_path, dataset.path, dataset.cache_dir)
+    assert dataset.refresh()
+    data = load_sales(dataset.path, dataset.cache_dir)
+    assert len(dataset.data) == len(data)
+    rebuilt = build_rollups(data)
+    for name, state in dataset.rollups.items():
+        pd.testing.assert_frame_equal(state, rebuilt[name].sort_index(), check_dtype=False)
+    pd.testing.assert_frame_equal(dataset.cube.cells, build_kpi_cube(data).cells, check_dtype=False)
+
+
+def test_memory_report_scales_a_legacy_sample(cache_dir):
+    full = memory_report(SAMPLE, cache_dir)
+    sampled = memory_report(SAMPLE, cache_dir, legacy_rows=2000)
+    assert sampled.loc["per row", "compact bytes"] == full.loc["per row", "compact bytes"]
+    assert abs(sampled.loc["total", "legacy bytes"] / full.loc["total", "legacy bytes"] - 1) < 0.05
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from merchan_sales.compute import kpis
+from merchan_sales.dataset import FilterSpec
+from merchan_sales.kpis import build_kpi_cube, headline_kpis, update_kpi_cube
+
+
+def _orders(days, sales):
+    days = pd.to_datetime(days)
+    return pd.DataFrame({
+        "Order ID": np.arange(len(days)), "Order Date": days, "International Shipping": "No",
+        "Total Sales": sales, "Shipping Charges": 0, "Quantity": 1, "Rating": 4,
+        "Sales Price": sales, "Buyer Age": 30,
+    })
+
+
+def test_partial_trailing_month_is_skipped():
+    october = pd.date_range("2024-10-01", "2024-10-31")
+    data = _orders([*october, "2024-11-01", "2024-11-04"], [10] * 31 + [5, 5])
+    cube = build_kpi_cube(data, "v1")
+    assert cube.last_complete_month() == pd.Period("2024-10")
+    sales = dict((label, delta) for label, _, delta, _ in headline_kpis(cube))["Total Sales"]
+    assert sales == 310 / 320 * 100
+    # A cube ending on the last day of its month counts that month
+    assert build_kpi_cube(data.iloc[:31]).last_complete_month() == pd.Period("2024-10")
+    # Appended rows that complete November move the window
+    rest = _orders(pd.date_range("2024-11-05", "2024-11-30"), [1] * 26)
+    assert update_kpi_cube(cube, rest, "v2").last_complete_month() == pd.Period("2024-11")
+
+
+def test_selection_months_follow_the_dataset_end(dataset):
+    totals = dataset.data["Total Sales"].sum()
+    october = dataset.data[dataset.data["Order Date"].dt.to_period("M") == pd.Period("2024-10")]
+    assert np.isclose(kpis(dataset)[0].delta, october["Total Sales"].sum() / totals * 100)
+    # A picked date range ends the months early: April 15 leaves March as the last complete month
+    spec = FilterSpec.make(dates=("2024-01-01", "2024-04-15"))
+    selected = dataset.frame(spec)
+    march = selected[selected["Order Date"].dt.to_period("M") == pd.Period("2024-03")]
+    assert np.isclose(kpis(dataset, spec)[0].delta, march["Total Sales"].sum() / selected["Total Sales"].sum() * 100)
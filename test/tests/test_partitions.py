@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from db.ingest import _write_json, dataset_version, is_store, part_paths, refresh_cache
+from db.partitions import MANIFEST, ingest, partitions, prune
+from db.reviews import build_review_index
+from merchan_sales.compute import breakdown, kpis
+from merchan_sales.dataset import Dataset, FilterSpec
+
+from .conftest import SAMPLE
+
+
+def test_store_is_a_dataset_source(dataset, tmp_path):
+    store = str(tmp_path / "store")
+    _, version = ingest(SAMPLE, store, workers=1)
+    assert is_store(store)
+    assert dataset_version(store) == version
+    assert len(part_paths(store)) == len(partitions(store))
+
+    spec = FilterSpec.make(dates=("2024-03-01", "2024-04-15"))
+    expected = breakdown(dataset, "category", spec), kpis(dataset, spec)
+    ds = Dataset(store, str(tmp_path / "store-cache"))
+    ds.refresh()
+    assert len(ds.data) == len(dataset.data)
+    assert ds.partitioned and not dataset.partitioned
+    assert breakdown(ds, "category", spec).equals(expected[0])
+    assert kpis(ds, spec) == expected[1]
+    assert len(prune(store, *spec.dates)) < len(partitions(store))
+
+
+def test_reingest_swaps_partitions_after_the_manifest(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    shutil.copy(SAMPLE, exports / "sales.csv")
+    store = str(tmp_path / "store")
+    ingest(str(exports), store, workers=1)
+    old = part_paths(store)
+    assert all(os.path.exists(f"{p}.reviews.npz") for p in old)
+
+    pd.read_csv(SAMPLE, nrows=100).to_csv(exports / "sales.csv", index=False)
+    ingest(str(exports), store, workers=1)
+    new = part_paths(store)
+    assert not set(old) & set(new)
+    assert not any(os.path.exists(p) or os.path.exists(f"{p}.reviews.npz") for p in old)
+    assert len(build_review_index(store).codes) == 100
+
+
+def test_empty_store_fails_clearly(tmp_path):
+    store = tmp_path / "store"
+    store.mkdir()
+    _write_json(str(store / MANIFEST), {"sources": {}, "version": "empty"})
+    with pytest.raises(FileNotFoundError, match="no partitions"):
+        refresh_cache(str(store))
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+from .conftest import REPO, SAMPLE
+
+# One dashboard worker: refresh the shared dataset, query DuckDB and report what it saw
+WORKER = """
+import json, sys
+from db.queries import count_rows
+from db.snapshot import attach
+from merchan_sales.dataset import Dataset
+ds = Dataset(sys.argv[1], sys.argv[2])
+ds.refresh()
+print(json.dumps({"version": ds.version, "rows": len(ds.data), "count": count_rows(),
+                  "attached": attach(sys.argv[1], sys.argv[2], ds.version) is not None}))
+"""
+
+
+def _start(cache_dir):
+    return subprocess.Popen([sys.executable, "-c", WORKER, SAMPLE, cache_dir], cwd=REPO,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def _result(worker):
+    out, err = worker.communicate(timeout=120)
+    assert worker.returncode == 0, err
+    return json.loads(out.splitlines()[-1])
+
+
+def test_two_workers_share_the_cache(cache_dir):
+    # Both start before either has published the snapshot
+    first, second = [_result(w) for w in [_start(cache_dir), _start(cache_dir)]]
+    assert first == second
+    assert first["rows"] == first["count"] > 0
+    assert first["attached"]
+    # A worker started later maps the published snapshot
+    assert _result(_start(cache_dir)) == first
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from db.ingest import part_paths, read_sales_csv
+from db.reviews import build_review_index, part_index
+from merchan_sales.profile import dataset_profile, merge_profiles, part_profile, profile_frame, summary
+
+from .conftest import SAMPLE
+
+NUMERIC = ["Shipping Charges", "Rating", "Quantity", "Sales Price", "Total Sales"]
+QUARTILES = ["25%", "50%", "75%"]
+
+
+def test_profile_quartiles_are_exact(cache_dir):
+    data = read_sales_csv(SAMPLE)
+    expected = data[NUMERIC].quantile([0.25, 0.5, 0.75]).T.to_numpy()
+    table = dataset_profile(SAMPLE, cache_dir)
+    np.testing.assert_array_equal(table.loc[NUMERIC, QUARTILES].to_numpy(dtype=float), expected)
+    # Merged parts answer from the digests, which keep the repeated sales values exact
+    merged = summary(merge_profiles([profile_frame(part) for part in (data.iloc[:2000], data.iloc[2000:5000], data.iloc[5000:])]))
+    np.testing.assert_array_equal(merged.loc[NUMERIC[:4], QUARTILES].to_numpy(dtype=float), expected[:4])
+
+
+def test_summary_is_arrow_serializable(cache_dir):
+    table = dataset_profile(SAMPLE, cache_dir)
+    pa.Table.from_pandas(table)
+    assert table.loc["Order Date", "min"] == "2023-11-05"
+    assert table.loc["Buyer Age", "max"] == "35"
+
+
+def test_sidecars_round_trip_without_pickle(cache_dir):
+    data = read_sales_csv(SAMPLE)
+    dataset_profile(SAMPLE, cache_dir)
+    part = part_paths(SAMPLE, cache_dir)[0]
+    table = summary(part_profile(part))
+    with open(f"{part}.profile.json") as f:
+        json.load(f)
+    # A second read comes from the sidecar and merges like a fresh profile
+    pd.testing.assert_frame_equal(summary(part_profile(part)), table)
+    two = summary(merge_profiles([part_profile(part), profile_frame(data.iloc[:100])]))
+    fresh = summary(merge_profiles([profile_frame(pd.read_parquet(part)), profile_frame(data.iloc[:100])]))
+    pd.testing.assert_frame_equal(two, fresh)
+
+    built = build_review_index(SAMPLE, cache_dir)
+    with np.load(f"{part}.reviews.npz", allow_pickle=False) as saved:
+        assert all(saved[name].dtype != object for name in saved.files)
+    loaded = part_index(part)
+    assert loaded.texts.tolist() == built.texts.tolist()
+    np.testing.assert_array_equal(loaded.codes, built.codes)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from db.queries import ROW_ID, page, where_clause
+from merchan_sales.compute import breakdown, raw_page
+from merchan_sales.dataset import FilterSpec
+
+
+def test_review_search_joins_row_ids(dataset):
+    spec = FilterSpec.make(reviews=["good"], categories=["Clothing"])
+    filters = dataset.query_filters(spec)
+    _, params = where_clause(filters)
+    # One parameter per category value, none per matching review
+    assert params == ["Clothing"]
+    rows = dataset.rows(spec)
+    assert 0 < len(rows) < len(filters[ROW_ID])
+
+    table, total = raw_page(dataset, spec, page_size=len(rows), include_review=True)
+    assert total == len(rows)
+    assert table.column("Order ID").to_pylist() == dataset.data["Order ID"].iloc[rows].tolist()
+    assert all("good" in review.lower() for review in table.column("Review").to_pylist())
+
+    expected = dataset.frame(spec).groupby("Shipping Charges")["Total Sales"].sum()
+    result = breakdown(dataset, "shipping", spec).set_index("Shipping Charges")["Total Sales"]
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+def test_raw_page_sorts_and_pages_like_pandas(dataset):
+    spec = FilterSpec.make(locations=["Sydney", "Toronto"])
+    rows = dataset.rows(spec)
+    expected = (dataset.data.iloc[rows].reset_index(drop=True)
+                .sort_values("Total Sales", ascending=False, kind="stable"))
+    columns = ["Order ID", "Total Sales"]
+    pages = [raw_page(dataset, spec, columns, sort="Total Sales", descending=True, page_number=n, page_size=50)
+             for n in range(-(-len(rows) // 50) + 1)]
+    assert all(total == len(rows) for _, total in pages)
+    assert pages[0][0].column_names == columns
+    # Ties keep row order, so consecutive pages neither repeat nor skip rows
+    ids = [i for table, _ in pages for i in table.column("Order ID").to_pylist()]
+    assert ids == expected["Order ID"].tolist()
+    assert pages[-1][0].num_rows == 0
+
+
+def test_page_rejects_unknown_columns(dataset):
+    with pytest.raises(KeyError):
+        page(columns=["Order ID; DROP TABLE sales"])
+    with pytest.raises(KeyError):
+        page(sort="nope")
@@ -0,0 +1,31 @@
+import json
+
+from merchan_sales.compute import kpis
+from merchan_sales.dataset import FilterSpec
+from merchan_sales.report import compute_variant, export_reports, render_report, slug, variants_by
+
+
+def test_export_writes_every_variant(dataset, tmp_path):
+    variants = variants_by(dataset, ["genders"])
+    assert variants[0] == ("all", FilterSpec())
+    assert len(variants) == 1 + len(dataset.index.labels("Buyer Gender"))
+    written = export_reports(dataset, variants, str(tmp_path), formats=("html", "json"), workers=1)
+    assert len(written) == 2 * len(variants)
+
+    name, spec = variants[1]
+    with open(tmp_path / f"{slug(name)}.json") as f:
+        report = json.load(f)
+    assert report["version"] == dataset.version
+    assert report["errors"] == {}
+    assert [tuple(k.values()) for k in report["kpis"]] == [tuple(k) for k in kpis(dataset, spec)]
+    assert sum(row["Total Sales"] for row in report["tables"]["category"]) == \
+        dataset.frame(spec)["Total Sales"].sum()
+    assert "plotly" in (tmp_path / f"{slug(name)}.html").read_text()
+
+
+def test_empty_selection_still_writes_a_report(dataset, tmp_path):
+    report = compute_variant(dataset, "nowhere/at all", FilterSpec.make(locations=["Nowhere"]))
+    written = render_report(report, str(tmp_path), ["json"])
+    assert written == [str(tmp_path / "nowhere_at_all.json")]
+    with open(written[0]) as f:
+        assert json.load(f)["name"] == "nowhere/at all"
@@ -0,0 +1,49 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from merchan_sales import scheduler
+from merchan_sales.scheduler import run_charts
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Enough threads for the jobs to overlap, whatever the core count of the host
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(scheduler, "_executor", executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_results_arrive_in_completion_order(pool):
+    release = threading.Event()
+
+    def broken():
+        raise ValueError("no data")
+
+    jobs = {"slow": lambda: release.wait(5) and "slow", "fast": lambda: "fast", "broken": broken}
+    results = run_charts(jobs, timeout=5)
+    first = [next(results), next(results)]
+    release.set()
+    results = first + list(results)
+    assert {r.name for r in first} == {"fast", "broken"}
+    assert results[-1].name == "slow" and results[-1].value == "slow" and results[-1].error is None
+    broken_result = next(r for r in results if r.name == "broken")
+    assert isinstance(broken_result.error, ValueError) and broken_result.value is None
+
+
+def test_late_jobs_time_out_and_keep_running(pool):
+    finished = threading.Event()
+
+    def late():
+        time.sleep(0.3)
+        finished.set()
+        return "late"
+
+    results = {r.name: r for r in run_charts({"late": late, "quick": lambda: 1}, timeout=0.1)}
+    assert results["quick"].value == 1
+    assert isinstance(results["late"].error, TimeoutError)
+    # The job is not cancelled; its cached result is ready for the next rerun
+    assert finished.wait(5)
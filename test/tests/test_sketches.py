@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from merchan_sales.sketches import TDigest, merge_digests
+
+from .conftest import SAMPLE
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def test_digest_keeps_repeated_values_exact():
+    values = np.r_[np.zeros(60), np.full(40, 100.0)]
+    digest = TDigest.of(values)
+    np.testing.assert_array_equal(digest.quantile(QUANTILES), np.quantile(values, QUANTILES))
+    merged = merge_digests(TDigest.of(part) for part in np.array_split(values, 3))
+    np.testing.assert_array_equal(merged.quantile(QUANTILES), np.quantile(values, QUANTILES))
+    assert len(merged.means) == 2
+
+
+def test_digest_quantiles_of_sales_columns():
+    data = pd.read_csv(SAMPLE)
+    for column in ["Shipping Charges", "Rating", "Quantity", "Sales Price"]:
+        values = data[column].to_numpy(dtype=np.float64)
+        merged = merge_digests(TDigest.of(part) for part in np.array_split(values, 4))
+        np.testing.assert_allclose(merged.quantile([0.25, 0.5, 0.75]), np.quantile(values, [0.25, 0.5, 0.75]),
+                                   err_msg=column)
+
+
+def test_digest_of_continuous_values():
+    values = np.random.default_rng(0).normal(size=50_000)
+    digest = merge_digests(TDigest.of(part) for part in np.array_split(values, 8))
+    estimate = digest.quantile(QUANTILES)
+    ranks = np.searchsorted(np.sort(values), estimate) / len(values)
+    assert np.max(np.abs(ranks - QUANTILES)) < 0.005
+    assert len(digest.means) <= digest.compression
+
+
+def test_cube_percentiles_merge_cells_exactly(dataset):
+    from merchan_sales.compute import percentiles
+
+    table = percentiles(dataset)
+    exact = dataset.data[table.index].quantile([0.25, 0.5, 0.75]).T
+    for column in ["Sales Price", "Buyer Age", "Rating"]:
+        np.testing.assert_array_equal(table.loc[column, ["25%", "50%", "75%"]].to_numpy(dtype=float),
+                                      exact.loc[column].to_numpy(), err_msg=column)
+    assert table["Rank Error"].max() < 0.02
+
+
+def test_hll_estimates_within_its_error():
+    from merchan_sales.sketches import HyperLogLog, merge_hll
+
+    for n in (100, 10_000, 300_000):
+        sketch = HyperLogLog.of(np.arange(n))
+        assert abs(sketch.estimate() - n) <= 3 * sketch.relative_error * n + 1
+    # Overlapping halves merge to the union, not the sum
+    ids = np.arange(200_000)
+    merged = merge_hll([HyperLogLog.of(ids[:120_000]), HyperLogLog.of(ids[80_000:])])
+    assert abs(merged.estimate() - len(ids)) <= 3 * merged.relative_error * len(ids)
+    assert merge_hll([]).estimate() == 0
@@ -0,0 +1,19 @@
+from merchan_sales.compute import streamed_totals, time_series, totals
+from merchan_sales.streaming import aggregate, streaming_enabled
+
+from .conftest import SAMPLE
+
+
+def test_streamed_totals_match_the_loaded_dataset(dataset):
+    # A small cap forces several chunks
+    result = aggregate(SAMPLE, max_bytes=1 << 20)
+    assert streamed_totals(result) == totals(dataset)
+    monthly = time_series(dataset, "month").set_index("Order Date")["Total Sales"]
+    assert result.monthly("sales").to_dict() == monthly.to_dict()
+
+
+def test_streaming_switch(monkeypatch):
+    monkeypatch.delenv("MERCHAN_STREAMING", raising=False)
+    assert not streaming_enabled()
+    monkeypatch.setenv("MERCHAN_STREAMING", "1")
+    assert streaming_enabled()
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from merchan_sales.compute import time_series
+from merchan_sales.timeseries import GRANULARITIES, change_labels, sales_over_time
+
+FREQUENCIES = {"day": "D", "week": "W-SUN", "month": "M", "quarter": "Q", "year": "Y"}
+
+
+@pytest.mark.parametrize("granularity", list(GRANULARITIES))
+def test_periods_match_pandas_groupby(dataset, granularity):
+    data = dataset.data
+    expected = data.groupby(data["Order Date"].dt.to_period(FREQUENCIES[granularity]))["Total Sales"].sum()
+    series = time_series(dataset, granularity)
+    present = series[series["Total Sales"] != 0]
+    assert present["Order Date"].tolist() == expected.index.start_time.tolist()
+    assert present["Total Sales"].tolist() == expected.tolist()
+    # Periods without orders are kept as zeros, so the change compares neighbours
+    assert series["Order Date"].is_monotonic_increasing
+
+
+def test_change_against_previous_period():
+    data = pd.DataFrame({"Order Date": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-03-01", "2024-05-01"]),
+                         "Total Sales": [100, 150, 75, 50]})
+    series = sales_over_time(data, granularity="month")
+    assert series["Label"].tolist() == ["Jan 24", "Feb 24", "Mar 24", "Apr 24", "May 24"]
+    np.testing.assert_allclose(series["Change"], [np.nan, 50.0, -50.0, -100.0, np.nan])
+    assert series["Change Class"].tolist() == ["na", "up", "down", "down", "na"]
+    assert series["Change Text"].iloc[0] == "N/A"
+    with pytest.raises(KeyError):
+        sales_over_time(data, granularity="decade")
+
+
+def test_change_labels():
+    labels = change_labels(np.array([12.345, -3.0, 0.0, np.nan]))
+    assert labels.tolist() == ["<span style='color:green'>12.35%</span>", "<span style='color:red'>-3.00%</span>",
+                               "<span style='color:red'>0.00%</span>", "N/A"]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from merchan_sales.compute import compare_windows, daily_values, rollup, window
+from merchan_sales.dataset import FilterSpec
+from merchan_sales.rollups import build_rollup, merge_rollup
+
+START, END = "2024-03-01", "2024-03-31"
+
+
+def test_windows_of_an_empty_selection(dataset):
+    spec = FilterSpec.make(locations=[])
+    assert len(dataset.rows(spec)) == 0
+    assert window(dataset, START, END, spec)["sales"].iloc[0] == 0
+    assert window(dataset, START, END, spec, dimension="category").empty
+    assert daily_values(dataset, START, END, spec=spec).sum() == 0
+    table = compare_windows(dataset, START, END, "mom", spec)
+    assert (table[["Current", "Previous"]].drop("Average Rating") == 0).all().all()
+    assert np.isnan(table.loc["Average Rating", "Current"])
+
+
+def _between(data, start, end):
+    return data[data["Order Date"].between(pd.Timestamp(start), pd.Timestamp(end))]
+
+
+def test_window_sums_match_the_rows(dataset):
+    rows = _between(dataset.data, START, END)
+    sums = window(dataset, START, END).iloc[0]
+    assert sums["sales"] == rows["Total Sales"].sum()
+    assert sums["lines"] == len(rows)
+    by_category = window(dataset, START, END, dimension="category")["sales"]
+    expected = rows.groupby("Product Category", observed=True)["Total Sales"].sum()
+    np.testing.assert_array_equal(by_category.loc[expected.index.astype(str)].to_numpy(), expected.to_numpy())
+    daily = daily_values(dataset, START, END)
+    assert len(daily) == 31 and daily.sum() == sums["sales"]
+
+    spec = FilterSpec.make(categories=["Clothing"])
+    selected = _between(dataset.frame(spec), START, END)
+    assert window(dataset, START, END, spec)["sales"].iloc[0] == selected["Total Sales"].sum()
+
+
+def test_compare_windows_against_the_previous_period(dataset):
+    table = compare_windows(dataset, START, END, "mom")
+    current, previous = _between(dataset.data, START, END), _between(dataset.data, "2024-02-01", "2024-02-29")
+    assert table.loc["Total Sales", "Current"] == current["Total Sales"].sum()
+    assert table.loc["Total Sales", "Previous"] == previous["Total Sales"].sum()
+    assert table.loc["Order Lines", "Previous"] == len(previous)
+    change = (current["Total Sales"].sum() / previous["Total Sales"].sum() - 1) * 100
+    assert np.isclose(table.loc["Total Sales", "Change %"], change)
+    np.testing.assert_allclose(table.loc["Average Rating", "Current"], current["Rating"].mean())
+
+
+def test_rollups_match_groupby_and_merge(dataset):
+    data = dataset.data
+    table = rollup(dataset, "location").set_index("Order Location")
+    grouped = data.groupby("Order Location", observed=True)
+    expected = grouped.agg(sales=("Total Sales", "sum"), low=("Sales Price", "min"),
+                           price=("Sales Price", "mean"), rating=("Rating", "mean"))
+    expected.index = expected.index.astype(str)
+    table = table.loc[expected.index]
+    np.testing.assert_array_equal(table["Total Sales"].to_numpy(), expected["sales"].to_numpy())
+    np.testing.assert_array_equal(table["Min Price"].to_numpy(), expected["low"].to_numpy())
+    np.testing.assert_allclose(table["Sales Price"].to_numpy(), expected["price"].to_numpy())
+    np.testing.assert_allclose(table["Rating"].to_numpy(), expected["rating"].to_numpy())
+    assert table["Orders"].sum() == len(data)
+
+    # Folding the second half into the first half's state equals one pass over everything
+    half = len(data) // 2
+    merged = merge_rollup(build_rollup(data.iloc[:half], "Product ID"), build_rollup(data.iloc[half:], "Product ID"))
+    pd.testing.assert_frame_equal(merged, build_rollup(data, "Product ID").sort_index(), check_dtype=False)